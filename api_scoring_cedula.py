@@ -11,10 +11,17 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from google.cloud import aiplatform
 import os
+import numpy as np
 import pandas as pd
-from typing import Optional
+from typing import List, Optional, Union
 from datetime import datetime
 
+from score_bands import RISK_LEVEL, ATTENTION_LEVEL, HYBRID_CATEGORY
+from client_snapshot import ClientSnapshot, ensure_snapshot
+from prediction_client import AsyncPredictionClient, PredictionBatcher, load_local_model, backend_from_env, predict_isolated
+from prediction_snapshot import PredictionSnapshot, FEATURE_ORDER, prepare_instance, feature_fingerprint
+from stage_timing import timed_stage, enable_from_env, get_recorder
+
 app = FastAPI(
     title="PLATAM Scoring API - Por Cédula",
     description="Scoring completo v2.2: Busca por cédula/NIT y retorna evaluación 360° con demografía",
@@ -32,6 +39,21 @@ ENDPOINT_ID = "7891061911641391104"  # NUEVO: Modelo v2.2 con demografía (sin i
 # Ruta al CSV con datos
 CSV_PATH = "SCORES_V2_ANALISIS_COMPLETO.csv"  # NUEVO: Archivo con 39 columnas (28 originales + 11 demográficas)
 
+# Predicciones precalculadas (generar_predicciones_ml_bigquery.py): se usan
+# mientras las features del cliente no cambien. Vacío = siempre Vertex
+PREDICTIONS_CSV_PATH = os.getenv("PLATAM_PREDICTION_SNAPSHOT", "PREDICCIONES_ML_V2.2.csv")
+
+# Backend del modelo: "vertex" (endpoint remoto) o "local" (model.pkl,
+# scaler.pkl y feature_names.json en PLATAM_MODEL_DIR, en el mismo proceso,
+# con Vertex como respaldo si no carga o falla)
+ML_BACKEND = backend_from_env()
+
+# Máximo de cédulas por request en POST /predict/batch
+MAX_BATCH_CEDULAS = int(os.getenv("PLATAM_PREDICT_BATCH_MAX", 1000))
+
+# Tiempos por etapa (opt-in con PLATAM_STAGE_TIMING=1, ver GET /metrics/stages)
+enable_from_env()
+
 # ================== DATOS EN MEMORIA ==================
 
 # Cargar CSV al iniciar la API
@@ -41,22 +63,28 @@ print("="*80)
 print(f"\n📂 Cargando datos desde: {CSV_PATH}")
 
 try:
-    # Cargar CSV
-    df_clientes = pd.read_csv(CSV_PATH)
-
-    # Limpiar nombres de columnas (por si hay BOM)
-    df_clientes.columns = df_clientes.columns.str.strip()
+    # Snapshot columnar del CSV (memory-mapped, de solo lectura): los workers
+    # de uvicorn comparten una sola copia física; se arma desde el CSV si
+    # falta o está desactualizado. Incluye el índice cédula -> fila
+    clientes = ClientSnapshot(ensure_snapshot(CSV_PATH))
 
-    # Convertir cédula a string para búsqueda
-    df_clientes['cedula'] = df_clientes['cedula'].astype(str)
-
-    print(f"✅ Cargados {len(df_clientes)} clientes")
-    print(f"📊 Columnas disponibles: {len(df_clientes.columns)}")
-    print(f"\n📋 Primeras cédulas: {df_clientes['cedula'].head(3).tolist()}")
+    print(f"✅ Cargados {len(clientes)} clientes")
+    print(f"📊 Columnas disponibles: {len(clientes.columns)}")
+    print(f"\n📋 Primeras cédulas: {clientes.column('cedula')[:3].tolist()}")
 
 except Exception as e:
     print(f"❌ Error al cargar CSV: {e}")
-    df_clientes = None
+    clientes = None
+
+predicciones = None
+if PREDICTIONS_CSV_PATH and os.path.exists(PREDICTIONS_CSV_PATH):
+    try:
+        predicciones = PredictionSnapshot.from_csv(PREDICTIONS_CSV_PATH)
+        print(f"✅ Predicciones precalculadas: {len(predicciones)} ({PREDICTIONS_CSV_PATH})")
+        if len(predicciones) == 0:
+            print("⚠️  Sin feature_fingerprint: regenerar con generar_predicciones_ml_bigquery.py")
+    except Exception as e:
+        print(f"❌ Error al cargar predicciones precalculadas: {e}")
 
 # Conectar con Vertex AI
 print(f"\n🌐 Conectando con Vertex AI...")
@@ -70,13 +98,27 @@ except Exception as e:
     print(f"❌ Error al conectar con Vertex AI: {e}")
     endpoint = None
 
+# Modelo local (si ML_BACKEND=local)
+local_model = None
+if ML_BACKEND == 'local':
+    print(f"\n🧠 Cargando modelo local...")
+    local_model = load_local_model(expected_features=FEATURE_ORDER)
+    print("✅ Modelo local cargado" if local_model else "⚠️  Modelo local no disponible: se usa Vertex AI")
+
+# Llamadas a Vertex en un pool acotado: no bloquean el event loop.
+# Los requests que llegan juntos (ventana de pocos ms) van en un solo predict
+ml_client = AsyncPredictionClient(endpoint, local_model=local_model)
+ml_batcher = PredictionBatcher(ml_client)
+
 print("\n" + "="*80)
 print("✅ API LISTA PARA RECIBIR REQUESTS")
 print("="*80)
 print("📍 Endpoints disponibles:")
 print("   • GET  /health")
 print("   • POST /predict")
+print("   • POST /predict/batch")
 print("   • GET  /stats")
+print("   • GET  /metrics/stages")
 print("\n🌐 Docs interactivas: http://localhost:8000/docs")
 print("="*80 + "\n")
 
@@ -120,26 +162,44 @@ class CompleteResponse(BaseModel):
     ml_prediction: MLPrediction
     recommendation: Recommendation
 
+class BatchRequest(BaseModel):
+    cedulas: List[str]
+
+class BatchItem(BaseModel):
+    cedula: str
+    found: bool
+    result: Optional[CompleteResponse] = None
+    error: Optional[str] = None  # Cédula no encontrada o fallo del modelo
+
+class BatchResponse(BaseModel):
+    timestamp: str
+    total: int
+    encontrados: int
+    no_encontrados: int
+    results: List[BatchItem]  # En el orden de las cédulas del request
+
 # ================== FUNCIONES AUXILIARES ==================
 
+@timed_stage('api.client_lookup')
 def get_client_by_cedula(cedula: str) -> Optional[dict]:
     """Busca cliente por cédula en el CSV cargado"""
-    if df_clientes is None:
+    if clientes is None:
         raise HTTPException(status_code=503, detail="Datos no cargados")
 
-    # Buscar por cédula (convertir a string)
-    cedula_str = str(cedula).strip()
-    cliente = df_clientes[df_clientes['cedula'] == cedula_str]
+    # Buscar por cédula normalizada en el índice (primera coincidencia como dict)
+    return clientes.get(cedula)
 
-    if cliente.empty:
+def get_precomputed_prediction(client_data: dict, instance: List[float]) -> Optional[tuple]:
+    """Predicción precalculada para exactamente estas features (None si no hay)"""
+    if predicciones is None:
         return None
+    return predicciones.lookup(client_data['cedula'], feature_fingerprint(instance))
 
-    # Retornar primera coincidencia como dict
-    return cliente.iloc[0].to_dict()
-
-def get_ml_prediction(client_data: dict) -> tuple:
+@timed_stage('api.ml_prediction')
+async def get_ml_prediction(client_data: dict) -> tuple:
     """
-    Obtiene predicción del modelo ML en Vertex AI
+    Obtiene predicción del modelo ML: precalculada si las features del cliente
+    no cambiaron, si no del backend configurado (modelo local o Vertex AI)
 
     MODELO v2.2: 22 features (15 originales + 7 demográficas confiables)
     - REMOVIDO: days_past_due_mean, days_past_due_max (causaban data leakage)
@@ -148,88 +208,57 @@ def get_ml_prediction(client_data: dict) -> tuple:
                 creditos_vigentes, creditos_mora, hist_neg_12m
     """
 
-    # Features en el orden correcto para el modelo v2.2 (22 features)
-    feature_order = [
-        # 15 features originales (sin days_past_due)
-        'platam_score', 'experian_score_normalized',
-        'score_payment_performance', 'score_payment_plan', 'score_deterioration',
-        'payment_count', 'months_as_client',
-        'pct_early', 'pct_late',
-        'peso_platam_usado', 'peso_hcpn_usado',
-        'tiene_plan_activo', 'tiene_plan_default', 'tiene_plan_pendiente', 'num_planes',
-
-        # 7 features demográficas CONFIABLES (sin income features)
-        'genero_encoded', 'edad', 'ciudad_encoded',
-        'cuota_mensual', 'creditos_vigentes', 'creditos_mora', 'hist_neg_12m'
-    ]
-
-    # Preparar instancia (manejar NaN y defaults)
-    instance = []
-    for feature in feature_order:
-        value = client_data.get(feature, 0)
-
-        # Defaults especiales para features demográficas
-        if pd.isna(value) or value is None:
-            if feature == 'edad':
-                value = 35  # Default edad promedio
-            elif feature == 'genero_encoded':
-                value = 0
-            elif feature == 'ciudad_encoded':
-                value = 0
-            else:
-                value = 0
-
-        # Convertir booleanos a enteros
-        if isinstance(value, bool):
-            value = int(value)
-
-        instance.append(float(value))
-
-    # Llamar a Vertex AI
-    prediction = endpoint.predict(instances=[instance])
-
-    prob_no_default = prediction.predictions[0][0]
-    prob_default = prediction.predictions[0][1]
+    # Features en el orden del modelo v2.2 (NaN -> default, booleanos -> 0/1)
+    instance = prepare_instance(client_data)
+
+    cached = get_precomputed_prediction(client_data, instance)
+    if cached is not None:
+        return cached
+
+    # Modelo local, o Vertex AI (micro-batch con otros requests, sin bloquear el event loop)
+    probabilities = await ml_batcher.predict_one(instance)
+
+    prob_no_default = probabilities[0]
+    prob_default = probabilities[1]
 
     return prob_default, prob_no_default
 
+@timed_stage('api.ml_prediction_batch', rows=lambda clients: len(clients))
+async def get_ml_predictions(clients: List[dict]) -> List[Union[tuple, Exception]]:
+    """
+    get_ml_prediction para varios clientes: los que no tienen predicción
+    precalculada van al modelo en un solo predict (modelo local o Vertex AI,
+    sin pasar por el micro-batch). Si falla, se reintenta por mitades: cada
+    cliente recibe su (prob_default, prob_no_default) o la excepción de su
+    propia instancia
+    """
+    instances = [prepare_instance(client_data) for client_data in clients]
+    results = [get_precomputed_prediction(client_data, instance)
+               for client_data, instance in zip(clients, instances)]
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    predictions = await predict_isolated(ml_client, [instances[i] for i in pending])
+    for i, probabilities in zip(pending, predictions):
+        if isinstance(probabilities, Exception):
+            results[i] = probabilities
+        else:
+            results[i] = (probabilities[1], probabilities[0])
+
+    return results
+
 def calculate_risk_level(prob_default: float) -> str:
     """Categoriza el nivel de riesgo"""
-    if prob_default < 0.10:
-        return "Muy Bajo"
-    elif prob_default < 0.20:
-        return "Bajo"
-    elif prob_default < 0.40:
-        return "Medio"
-    elif prob_default < 0.60:
-        return "Alto"
-    else:
-        return "Muy Alto"
+    return RISK_LEVEL(prob_default)
 
 def get_attention_level(prob_default: float) -> str:
     """Determina el nivel de atención según probabilidad de default"""
-    if prob_default >= 0.60:
-        return "Alerta crítica"
-    elif prob_default >= 0.40:
-        return "Seguimiento cercano"
-    elif prob_default >= 0.20:
-        return "Atención moderada"
-    else:
-        return "Monitoreo normal"
+    return ATTENTION_LEVEL(prob_default)
 
 def categorize_hybrid_score(score: float) -> str:
     """Categoriza el score híbrido"""
-    if score >= 750:
-        return "Excelente"
-    elif score >= 650:
-        return "Bueno"
-    elif score >= 550:
-        return "Medio"
-    elif score >= 450:
-        return "Regular"
-    else:
-        return "Bajo"
+    return HYBRID_CATEGORY(score)
 
+@timed_stage('api.recommendation')
 def generate_recommendation(client_data: dict, ml_data: dict) -> dict:
     """Genera recomendación de seguimiento y cobranza combinando scoring + ML"""
 
@@ -325,6 +354,51 @@ def generate_recommendation(client_data: dict, ml_data: dict) -> dict:
         'flags': flags
     }
 
+def build_complete_response(client_data: dict, prob_default: float, prob_no_default: float) -> CompleteResponse:
+    """Evaluación completa de un cliente a partir de su fila y la predicción ML"""
+
+    # 1. Datos de scoring
+    scoring_data = {
+        'platam_score': float(client_data.get('platam_score', 0)),
+        'experian_score': float(client_data.get('experian_score_normalized', 0)),
+        'hybrid_score': float(client_data.get('hybrid_score', 0)),
+        'hybrid_category': categorize_hybrid_score(client_data.get('hybrid_score', 0)),
+        'peso_platam': float(client_data.get('peso_platam_usado', 0)),
+        'peso_experian': float(client_data.get('peso_hcpn_usado', 0))
+    }
+
+    ml_data = {
+        'probability_default': prob_default,
+        'probability_no_default': prob_no_default,
+        'risk_level': calculate_risk_level(prob_default),
+        'attention_level': get_attention_level(prob_default)
+    }
+
+    # 2. Generar recomendación
+    recommendation = generate_recommendation(client_data, ml_data)
+
+    # 3. Información del cliente
+    client_name = client_data.get('client_name', 'N/A')
+    if pd.isna(client_name):
+        client_name = 'N/A'
+
+    client_info = {
+        'cedula': str(client_data['cedula']),
+        'client_name': str(client_name),
+        'months_as_client': int(client_data.get('months_as_client', 0) if not pd.isna(client_data.get('months_as_client', 0)) else 0),
+        'payment_count': int(client_data.get('payment_count', 0) if not pd.isna(client_data.get('payment_count', 0)) else 0),
+        'has_payment_history': bool(client_data.get('has_payment_history', False))
+    }
+
+    # 4. Construir respuesta
+    return CompleteResponse(
+        client_info=ClientInfo(**client_info),
+        timestamp=datetime.now().isoformat(),
+        scoring=ScoringData(**scoring_data),
+        ml_prediction=MLPrediction(**ml_data),
+        recommendation=Recommendation(**recommendation)
+    )
+
 # ================== ENDPOINTS ==================
 
 @app.get("/")
@@ -333,11 +407,13 @@ def root():
         "service": "PLATAM Scoring API",
         "version": "1.0 - Búsqueda por Cédula",
         "status": "online",
-        "clientes_cargados": len(df_clientes) if df_clientes is not None else 0,
+        "clientes_cargados": len(clientes) if clientes is not None else 0,
         "endpoints": {
             "health": "/health",
             "predict": "/predict (POST)",
+            "predict_batch": "/predict/batch (POST)",
             "stats": "/stats",
+            "metrics": "/metrics/stages",
             "docs": "/docs"
         }
     }
@@ -346,26 +422,40 @@ def root():
 def health():
     return {
         "status": "healthy",
-        "data_loaded": df_clientes is not None,
+        "data_loaded": clientes is not None,
         "vertex_ai": "connected" if endpoint else "disconnected",
+        "ml_backend": ml_client.backend,
         "model": "platam-scoring-v2.2-demographics-no-income",
         "model_features": 22,
-        "clientes": len(df_clientes) if df_clientes is not None else 0
+        "clientes": len(clientes) if clientes is not None else 0,
+        "predicciones_precalculadas": predicciones.stats() if predicciones is not None else None
     }
 
 @app.get("/stats")
 def stats():
     """Estadísticas de los datos cargados"""
-    if df_clientes is None:
+    if clientes is None:
         raise HTTPException(status_code=503, detail="Datos no cargados")
 
+    hybrid_score = clientes.column('hybrid_score')
     return {
-        "total_clientes": len(df_clientes),
-        "score_promedio": float(df_clientes['hybrid_score'].mean()),
-        "score_min": float(df_clientes['hybrid_score'].min()),
-        "score_max": float(df_clientes['hybrid_score'].max()),
-        "clientes_con_historial": int(df_clientes['has_payment_history'].sum()),
-        "meses_promedio": float(df_clientes['months_as_client'].mean())
+        "total_clientes": len(clientes),
+        "score_promedio": float(np.nanmean(hybrid_score)),
+        "score_min": float(np.nanmin(hybrid_score)),
+        "score_max": float(np.nanmax(hybrid_score)),
+        "clientes_con_historial": int(clientes.column('has_payment_history').sum()),
+        "meses_promedio": float(np.nanmean(clientes.column('months_as_client')))
+    }
+
+@app.get("/metrics/stages")
+def stage_metrics():
+    """Tiempos por etapa desde el arranque (requiere PLATAM_STAGE_TIMING=1)"""
+    recorder = get_recorder()
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Medición de etapas desactivada (PLATAM_STAGE_TIMING=1)")
+    return {
+        "started_at": recorder.started_at.isoformat(timespec='seconds'),
+        "stages": recorder.to_dict()
     }
 
 @app.post("/predict", response_model=CompleteResponse)
@@ -383,49 +473,60 @@ async def predict_by_cedula(request: ClientRequest):
                 detail=f"Cliente con cédula {request.cedula} no encontrado"
             )
 
-        # 2. Extraer datos de scoring
-        scoring_data = {
-            'platam_score': float(client_data.get('platam_score', 0)),
-            'experian_score': float(client_data.get('experian_score_normalized', 0)),
-            'hybrid_score': float(client_data.get('hybrid_score', 0)),
-            'hybrid_category': categorize_hybrid_score(client_data.get('hybrid_score', 0)),
-            'peso_platam': float(client_data.get('peso_platam_usado', 0)),
-            'peso_experian': float(client_data.get('peso_hcpn_usado', 0))
-        }
-
-        # 3. Obtener predicción ML
-        prob_default, prob_no_default = get_ml_prediction(client_data)
+        # 2. Obtener predicción ML
+        prob_default, prob_no_default = await get_ml_prediction(client_data)
 
-        ml_data = {
-            'probability_default': prob_default,
-            'probability_no_default': prob_no_default,
-            'risk_level': calculate_risk_level(prob_default),
-            'attention_level': get_attention_level(prob_default)
-        }
+        # 3. Scoring, recomendación e información del cliente
+        return build_complete_response(client_data, prob_default, prob_no_default)
 
-        # 4. Generar recomendación
-        recommendation = generate_recommendation(client_data, ml_data)
-
-        # 5. Información del cliente
-        client_name = client_data.get('client_name', 'N/A')
-        if pd.isna(client_name):
-            client_name = 'N/A'
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
-        client_info = {
-            'cedula': str(client_data['cedula']),
-            'client_name': str(client_name),
-            'months_as_client': int(client_data.get('months_as_client', 0) if not pd.isna(client_data.get('months_as_client', 0)) else 0),
-            'payment_count': int(client_data.get('payment_count', 0) if not pd.isna(client_data.get('payment_count', 0)) else 0),
-            'has_payment_history': bool(client_data.get('has_payment_history', False))
-        }
+@app.post("/predict/batch", response_model=BatchResponse)
+async def predict_batch(request: BatchRequest):
+    """
+    Evaluación completa de varias cédulas en un request: una sola llamada al
+    modelo para todos los clientes encontrados; las cédulas no encontradas o
+    cuya predicción falla vuelven con su error, sin fallar el resto
+    """
+    if len(request.cedulas) > MAX_BATCH_CEDULAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {MAX_BATCH_CEDULAS} cédulas por request ({len(request.cedulas)} recibidas)"
+        )
 
-        # 6. Construir respuesta
-        return CompleteResponse(
-            client_info=ClientInfo(**client_info),
+    try:
+        # 1. Buscar clientes por cédula
+        clients = [get_client_by_cedula(cedula) for cedula in request.cedulas]
+        found = [i for i, client_data in enumerate(clients) if client_data]
+
+        # 2. Predicción ML de todos los encontrados
+        predictions = await get_ml_predictions([clients[i] for i in found])
+
+        # 3. Respuesta por cédula, en el orden del request
+        results = [
+            BatchItem(cedula=cedula, found=False, error=f"Cliente con cédula {cedula} no encontrado")
+            for cedula in request.cedulas
+        ]
+        for i, prediction in zip(found, predictions):
+            if isinstance(prediction, Exception):
+                results[i] = BatchItem(cedula=request.cedulas[i], found=True, error=f"Error del modelo: {str(prediction)}")
+                continue
+            try:
+                prob_default, prob_no_default = prediction
+                result = build_complete_response(clients[i], prob_default, prob_no_default)
+                results[i] = BatchItem(cedula=request.cedulas[i], found=True, result=result)
+            except Exception as e:
+                results[i] = BatchItem(cedula=request.cedulas[i], found=True, error=f"Error: {str(e)}")
+
+        return BatchResponse(
             timestamp=datetime.now().isoformat(),
-            scoring=ScoringData(**scoring_data),
-            ml_prediction=MLPrediction(**ml_data),
-            recommendation=Recommendation(**recommendation)
+            total=len(request.cedulas),
+            encontrados=len(found),
+            no_encontrados=len(request.cedulas) - len(found),
+            results=results
         )
 
     except HTTPException:
@@ -16,6 +16,11 @@ import pandas as pd
 from typing import Optional, Dict
 from datetime import datetime
 
+from score_bands import RISK_LEVEL
+from stage_timing import timed_stage, enable_from_env, get_recorder
+from prediction_client import AsyncPredictionClient, PredictionBatcher
+from prediction_snapshot import prepare_instance
+
 app = FastAPI(
     title="PLATAM Scoring API",
     description="API completa: Scoring Híbrido + Probabilidad de Default ML",
@@ -33,6 +38,14 @@ endpoint = aiplatform.Endpoint(
     endpoint_name=f"projects/741488896424/locations/{REGION}/endpoints/{ENDPOINT_ID}"
 )
 
+# Llamadas a Vertex en un pool acotado: no bloquean el event loop.
+# Los requests que llegan juntos (ventana de pocos ms) van en un solo predict
+vertex_client = AsyncPredictionClient(endpoint)
+ml_batcher = PredictionBatcher(vertex_client)
+
+# Tiempos por etapa (opt-in con PLATAM_STAGE_TIMING=1, ver GET /metrics/stages)
+enable_from_env()
+
 # ================== MODELOS DE DATOS ==================
 
 class ClientRequest(BaseModel):
@@ -68,6 +81,7 @@ class CompleteResponse(BaseModel):
 
 # ================== FUNCIONES AUXILIARES ==================
 
+@timed_stage('api.client_lookup')
 def get_client_data(client_id: str) -> Dict:
     """
     REEMPLAZA ESTO con tu consulta real a BigQuery/PostgreSQL/etc
@@ -110,6 +124,7 @@ def get_client_data(client_id: str) -> Dict:
         'num_planes': 0
     }
 
+@timed_stage('api.hybrid_score')
 def calculate_hybrid_score(platam_score: int, experian_score: int,
                           peso_platam: float, peso_experian: float) -> tuple:
     """
@@ -140,7 +155,8 @@ def calculate_hybrid_score(platam_score: int, experian_score: int,
 
     return hybrid_score, category
 
-def get_ml_prediction(client_data: Dict) -> tuple:
+@timed_stage('api.ml_prediction')
+async def get_ml_prediction(client_data: Dict) -> tuple:
     """
     Obtiene la predicción del modelo ML en Vertex AI
     Retorna: (prob_default, prob_no_default)
@@ -156,28 +172,20 @@ def get_ml_prediction(client_data: Dict) -> tuple:
         'tiene_plan_activo', 'tiene_plan_default', 'tiene_plan_pendiente', 'num_planes'
     ]
 
-    instance = [[client_data[f] for f in feature_order]]
+    # Floats, con los valores faltantes reemplazados (un NaN haría fallar el request)
+    instance = prepare_instance(client_data, feature_order)
 
-    # Llamar a Vertex AI
-    prediction = endpoint.predict(instances=instance)
+    # Llamar a Vertex AI (micro-batch con otros requests, sin bloquear el event loop)
+    probabilities = await ml_batcher.predict_one(instance)
 
-    prob_no_default = prediction.predictions[0][0]
-    prob_default = prediction.predictions[0][1]
+    prob_no_default = probabilities[0]
+    prob_default = probabilities[1]
 
     return prob_default, prob_no_default
 
 def calculate_risk_level(prob_default: float) -> str:
     """Categoriza el nivel de riesgo según la probabilidad"""
-    if prob_default < 0.10:
-        return "Muy Bajo"
-    elif prob_default < 0.20:
-        return "Bajo"
-    elif prob_default < 0.40:
-        return "Medio"
-    elif prob_default < 0.60:
-        return "Alto"
-    else:
-        return "Muy Alto"
+    return RISK_LEVEL(prob_default)
 
 def get_ml_decision(prob_default: float) -> str:
     """Decisión basada solo en el modelo ML"""
@@ -188,6 +196,7 @@ def get_ml_decision(prob_default: float) -> str:
     else:
         return "APROBAR"
 
+@timed_stage('api.recommendation')
 def generate_recommendation(scoring_data: Dict, ml_data: Dict) -> Dict:
     """
     Combina scoring híbrido + ML para dar recomendación final
@@ -283,6 +292,7 @@ def root():
         "endpoints": {
             "health": "/health",
             "predict": "/predict (POST)",
+            "metrics": "/metrics/stages",
             "docs": "/docs"
         }
     }
@@ -295,6 +305,17 @@ def health():
         "model": "platam-custom-final"
     }
 
+@app.get("/metrics/stages")
+def stage_metrics():
+    """Tiempos por etapa desde el arranque (requiere PLATAM_STAGE_TIMING=1)"""
+    recorder = get_recorder()
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Medición de etapas desactivada (PLATAM_STAGE_TIMING=1)")
+    return {
+        "started_at": recorder.started_at.isoformat(timespec='seconds'),
+        "stages": recorder.to_dict()
+    }
+
 @app.post("/predict", response_model=CompleteResponse)
 async def predict_complete(request: ClientRequest):
     """
@@ -330,7 +351,7 @@ async def predict_complete(request: ClientRequest):
         }
 
         # 3. Obtener predicción ML
-        prob_default, prob_no_default = get_ml_prediction(client_data)
+        prob_default, prob_no_default = await get_ml_prediction(client_data)
 
         risk_level = calculate_risk_level(prob_default)
         ml_decision = get_ml_decision(prob_default)
@@ -389,7 +410,7 @@ async def predict_ml_only(request: ClientRequest):
     """Solo predicción ML (sin scoring)"""
     client_data = get_client_data(request.client_id)
 
-    prob_default, prob_no_default = get_ml_prediction(client_data)
+    prob_default, prob_no_default = await get_ml_prediction(client_data)
     risk_level = calculate_risk_level(prob_default)
     ml_decision = get_ml_decision(prob_default)
 
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+PLATAM Cédula Index
+===================
+
+Hash index from normalized cédula / NIT to row position, built once when a
+client table loads, so the scoring APIs find a client with one dict lookup
+instead of a boolean-mask scan of the whole DataFrame per request.
+
+    index = CedulaIndex(df_clientes)
+    index.get('1.006.157.869')   -> row dict of cédula 1006157869 (or None)
+
+Both the stored cédulas and the requested one go through normalize_cedula,
+the rules of scripts/01_clean_bnpl_data.py. When a cédula appears more than
+once, the first row wins, as the old df[df['cedula'] == x].iloc[0] did.
+Loaders turn the cédula column into text with cedulas_as_text, not
+astype(str), so a float column (cédulas with gaps) keeps its digits.
+
+Autor: PLATAM Data Team
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+from scoring_core import is_missing
+
+# Separators dropped from a cédula / NIT (normalize_cedula), and the suffix
+# str() leaves on a cédula read as float ('1006157869.0')
+_SEPARATORS = r'[.\- ]'
+_FLOAT_SUFFIX = r'\.0$'
+# str() of a missing value (astype(str) of NaN / None)
+_MISSING_TEXT = ('nan', 'None')
+
+
+def normalize_cedula(cedula) -> Optional[str]:
+    """
+    Cédula / NIT as a plain digit string: strips spaces, removes dots,
+    dashes and inner spaces (None if missing or empty). Numbers keep their
+    digits: a cédula read as float (1006157869.0, or its text
+    '1006157869.0') is 1006157869, and the text 'nan' is missing.
+    """
+    if is_missing(cedula):
+        return None
+
+    if isinstance(cedula, (float, np.floating)) and float(cedula).is_integer():
+        cedula = int(cedula)
+
+    cedula_str = re.sub(_FLOAT_SUFFIX, '', str(cedula).strip())
+    if cedula_str in _MISSING_TEXT:
+        return None
+    cedula_str = cedula_str.replace('.', '').replace('-', '').replace(' ', '')
+    return cedula_str if cedula_str else None
+
+
+def normalize_cedulas(cedulas: pd.Series) -> pd.Series:
+    """normalize_cedula over a whole column (vectorized for text and integer columns)"""
+    if pd.api.types.infer_dtype(cedulas, skipna=True) not in ('string', 'integer', 'empty'):
+        return cedulas.map(normalize_cedula)
+
+    text = cedulas.astype(str).str.strip().str.replace(_FLOAT_SUFFIX, '', regex=True)
+    normalized = text.str.replace(_SEPARATORS, '', regex=True)
+    return normalized.mask(cedulas.isna() | text.isin(_MISSING_TEXT) | (normalized == ''))
+
+
+def cedulas_as_text(cedulas: pd.Series) -> pd.Series:
+    """
+    Cédula column as text for loaders and responses, in place of
+    astype(str): whole floats lose the '.0' read_csv adds to a column with
+    gaps (1006157869.0 -> '1006157869') and missing cédulas stay missing
+    instead of becoming 'nan'
+    """
+    text = cedulas.map(
+        lambda cedula: str(int(cedula))
+        if isinstance(cedula, (float, np.floating)) and float(cedula).is_integer()
+        else str(cedula)
+    )
+    return text.mask(cedulas.isna())
+
+
+class CedulaIndex:
+    """Normalized cédula -> row position of a client table (first row of each cédula)"""
+
+    def __init__(self, df: pd.DataFrame, column: str = 'cedula'):
+        self.df = df
+        keys = normalize_cedulas(df[column])
+        first = (~keys.duplicated() & keys.notna()).to_numpy()
+        self.positions = dict(zip(keys.to_numpy()[first], np.flatnonzero(first).tolist()))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, cedula) -> bool:
+        return self.position(cedula) is not None
+
+    def position(self, cedula) -> Optional[int]:
+        """Row position of a cédula (None if it is not in the table)"""
+        return self.positions.get(normalize_cedula(cedula))
+
+    def get(self, cedula) -> Optional[dict]:
+        """Row of a cédula as a dict, like df.iloc[i].to_dict() (None if not found)"""
+        position = self.position(cedula)
+        if position is None:
+            return None
+        return self.df.iloc[position].to_dict()
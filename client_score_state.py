@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+PLATAM Incremental Client Score State
+======================================
+
+Per-client running state that reproduces the three PLATAM score components
+of internal_credit_score.calculate_credit_score without re-reading the
+payment history. A new payment or plan event updates the state in O(1)
+(amortized) and the components are read from running sums:
+
+- Timeliness: recency-weighted score sums, kept per day-of-block residue so
+  the 1.5 ** months_ago weights can be re-based to any reference date
+- Pattern (6 months): Welford mean / M2 over the payments in the window
+- Deterioration: 1-month and 6-month DPD window aggregates
+- Payment plans: status counters over the 12-month window
+
+Only payments/plans inside the windows are kept individually (to expire
+them as the reference date moves forward), so the state size does not
+grow with history length. The state is plain JSON (to_dict / from_dict)
+and depends only on the standard library (and scoring_core).
+
+Dates are calendar days (like PaymentStore), and the pattern-break check
+uses the latest payment in the window, as with a ClientPaymentIndex.
+
+The highest payment_id / plan_id counted is kept (ids grow with each new
+row), plus the ids of the payments / plans still inside their windows, so
+has_payment / has_plan tell a redelivered event (skip it) from a new one
+(apply it). An id below the highest that is not among the kept ones, e.g.
+5120 arriving after 5121, cannot be told apart: has_payment returns None
+and the caller rebuilds the state from the history.
+
+Autor: PLATAM Data Team
+"""
+
+import bisect
+import math
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+
+from scoring_core import (
+    is_missing,
+    months_ago,
+    round1,
+    payment_quality_score,
+    maturity_weights,
+    pattern_break_penalty,
+    payment_plan_points,
+    deterioration_points,
+)
+
+EPOCH = date(1970, 1, 1)
+
+# months_ago = round(days / 30, 1) <= N  <=>  days <= N * 30 + 1
+WINDOW_1MO_DAYS = 31
+WINDOW_6MO_DAYS = 181
+WINDOW_12MO_DAYS = 361
+
+PLAN_STATUSES = ('active', 'completed', 'defaulted')
+
+
+def day_ordinal(value) -> Optional[int]:
+    """Days since 1970-01-01 for a date / datetime / pandas Timestamp / ISO string (None if missing)"""
+    # Before the datetime branch: pd.NaT is a datetime subclass
+    if is_missing(value) or (isinstance(value, str) and value == ''):
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        # e.g. np.datetime64
+        value = value.date() if hasattr(value, 'date') else date.fromisoformat(str(value)[:10])
+    return (value - EPOCH).days
+
+
+def _row_id(value) -> Optional[int]:
+    """Numeric payment / plan id (None if missing or not numeric)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Window:
+    """
+    Payments inside a trailing window, sorted by day, with Welford stats of DPD.
+
+    The running sum is kept next to the Welford mean: DPD are whole days, so
+    sum / n is exact and gives the same mean (to the last bit) as pandas.
+    """
+
+    def __init__(self, days: int):
+        self.days = days
+        self.rows = []      # [day, seq, dpd] sorted by (day, seq)
+        self.n_valid = 0    # rows with a non-null DPD
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, day: int, seq: int, dpd: Optional[float]):
+        bisect.insort(self.rows, [day, seq, dpd])
+        if dpd is None:
+            return
+        self.n_valid += 1
+        self.total += dpd
+        delta = dpd - self.mean
+        self.mean += delta / self.n_valid
+        self.m2 += delta * (dpd - self.mean)
+
+    def expire(self, ref_day: int):
+        while self.rows and ref_day - self.rows[0][0] > self.days:
+            _, _, dpd = self.rows.pop(0)
+            if dpd is None:
+                continue
+            if self.n_valid == 1:
+                self.n_valid, self.total, self.mean, self.m2 = 0, 0.0, 0.0, 0.0
+                continue
+            previous_mean = (self.n_valid * self.mean - dpd) / (self.n_valid - 1)
+            self.m2 -= (dpd - previous_mean) * (dpd - self.mean)
+            self.n_valid -= 1
+            self.total -= dpd
+            self.mean = previous_mean
+
+    def stats(self):
+        """(rows, mean, sample std) with pandas semantics (NaN when undefined)"""
+        mean = self.total / self.n_valid if self.n_valid > 0 else math.nan
+        std = math.sqrt(max(self.m2, 0.0) / (self.n_valid - 1)) if self.n_valid > 1 else math.nan
+        return len(self.rows), mean, std
+
+    def to_dict(self) -> Dict:
+        return {
+            'rows': self.rows, 'n_valid': self.n_valid,
+            'total': self.total, 'mean': self.mean, 'm2': self.m2
+        }
+
+    @classmethod
+    def from_dict(cls, days: int, data: Dict) -> '_Window':
+        window = cls(days)
+        window.rows = [list(row) for row in data['rows']]
+        window.n_valid = data['n_valid']
+        window.total = data['total']
+        window.mean = data['mean']
+        window.m2 = data['m2']
+        return window
+
+
+class ClientScoreState:
+    """
+    Incremental score state of one client.
+
+    Usage:
+        state = ClientScoreState.from_history(payments, plans, reference_date)
+        counted = state.has_payment(5120)
+        if counted is None:
+            state = ClientScoreState.from_history(...)   # unknown: rebuild
+        elif not counted:
+            state.add_payment('2026-01-15', days_past_due=7, payment_id=5120)
+        components = state.components(datetime.now(), months_as_client=14)
+        save(state.to_dict())
+    """
+
+    def __init__(self, as_of_day: int):
+        self.as_of_day = as_of_day
+        self.payment_count = 0
+        self.seq = 0
+
+        # Timeliness: sums of score * 1.5 ** ((anchor - block) / 10) per day % 3
+        self.anchor_block = as_of_day // 3
+        self.score_sums = [0.0, 0.0, 0.0]
+        self.weight_sums = [0.0, 0.0, 0.0]
+
+        self.window_1mo = _Window(WINDOW_1MO_DAYS)
+        self.window_6mo = _Window(WINDOW_6MO_DAYS)
+
+        # Payment plans
+        self.plan_count = 0
+        self.last_plan_day = None
+        self.plans_12mo = {}  # plan_id -> [start_day, status]
+        self.status_counts = {status: 0 for status in PLAN_STATUSES}
+
+        # Highest ids counted (None = unknown) and ids of the payments in the
+        # 6-month window (payment_id -> day)
+        self.last_payment_id = None
+        self.last_plan_id = None
+        self.payment_ids = {}
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    def has_payment(self, payment_id) -> Optional[bool]:
+        """
+        True if payment_id is counted, False if it is new (later than the last
+        id, or no id), None if it cannot be told (earlier id outside the window)
+        """
+        payment_id = _row_id(payment_id)
+        if payment_id in self.payment_ids:
+            return True
+        if payment_id is None or self.last_payment_id is None or payment_id > self.last_payment_id:
+            return False
+        return None
+
+    def has_plan(self, plan_id) -> Optional[bool]:
+        """Same as has_payment for a plan (plans of the 12-month window are kept)"""
+        if str(plan_id) in self.plans_12mo:
+            return True
+        numeric_id = _row_id(plan_id)
+        if numeric_id is None or self.last_plan_id is None or numeric_id > self.last_plan_id:
+            return False
+        return None
+
+    def add_payment(self, payment_date, days_past_due: Optional[float], payment_id=None):
+        """Register a new payment (O(1) amortized)"""
+        day = day_ordinal(payment_date)
+        dpd = None if days_past_due is None or days_past_due != days_past_due else float(days_past_due)
+        self.payment_count += 1
+        self.seq += 1
+        payment_id = _row_id(payment_id)
+        if payment_id is not None:
+            self.last_payment_id = max(payment_id, self.last_payment_id or payment_id)
+        if day is None:
+            return
+
+        weight = 1.5 ** ((self.anchor_block - day // 3) / 10)
+        self.score_sums[day % 3] += (payment_quality_score(dpd) if dpd is not None else 0) * weight
+        self.weight_sums[day % 3] += weight
+
+        if self.as_of_day - day <= WINDOW_1MO_DAYS:
+            self.window_1mo.add(day, self.seq, dpd)
+        if self.as_of_day - day <= WINDOW_6MO_DAYS:
+            self.window_6mo.add(day, self.seq, dpd)
+            if payment_id is not None:
+                self.payment_ids[payment_id] = day
+
+    def add_plan(self, plan_id, plan_start_date, plan_status: str):
+        """Register a new payment plan"""
+        day = day_ordinal(plan_start_date)
+        self.plan_count += 1
+        numeric_id = _row_id(plan_id)
+        if numeric_id is not None:
+            self.last_plan_id = max(numeric_id, self.last_plan_id or numeric_id)
+        if day is None:
+            return
+        if self.last_plan_day is None or day > self.last_plan_day:
+            self.last_plan_day = day
+        if self.as_of_day - day <= WINDOW_12MO_DAYS:
+            self.plans_12mo[str(plan_id)] = [day, plan_status]
+            self._count_status(plan_status, 1)
+
+    def update_plan_status(self, plan_id, plan_status: str):
+        """Change the status of a known plan (e.g. active -> completed)"""
+        plan = self.plans_12mo.get(str(plan_id))
+        if plan is None:
+            return  # outside the 12-month window: does not affect the score
+        self._count_status(plan[1], -1)
+        plan[1] = plan_status
+        self._count_status(plan_status, 1)
+
+    def _count_status(self, status: str, delta: int):
+        if status in self.status_counts:
+            self.status_counts[status] += delta
+
+    def advance_to(self, reference_date):
+        """Move the state to a later reference date, expiring window members"""
+        ref_day = day_ordinal(reference_date)
+        if ref_day < self.as_of_day:
+            raise ValueError(
+                f"reference_date {reference_date} is before the state date "
+                f"({date.fromordinal(EPOCH.toordinal() + self.as_of_day)})"
+            )
+        self.as_of_day = ref_day
+        self.window_1mo.expire(ref_day)
+        self.window_6mo.expire(ref_day)
+        for payment_id, day in list(self.payment_ids.items()):
+            if ref_day - day > WINDOW_6MO_DAYS:
+                del self.payment_ids[payment_id]
+        for plan_id, (day, status) in list(self.plans_12mo.items()):
+            if ref_day - day > WINDOW_12MO_DAYS:
+                del self.plans_12mo[plan_id]
+                self._count_status(status, -1)
+
+    # ------------------------------------------------------------------
+    # Score components
+    # ------------------------------------------------------------------
+
+    def _timeliness(self) -> float:
+        """Recency-weighted timeliness re-based to as_of_day"""
+        residue = self.as_of_day % 3
+        numerator = denominator = 0.0
+        for b in range(3):
+            # round((residue - b) / 3) -> -1, 0 or +1 block of extra age
+            shift = 1.5 ** (round((residue - b) / 3) / 10)
+            numerator += self.score_sums[b] * shift
+            denominator += self.weight_sums[b] * shift
+        return numerator / denominator if denominator else math.nan
+
+    def payment_performance(self, months_as_client: int) -> Dict:
+        """Same output as calculate_payment_performance"""
+        if self.payment_count < 3:
+            return {
+                'timeliness_score': 50,
+                'pattern_score': 50,
+                'timeliness_weight': 0.85,
+                'pattern_weight': 0.15,
+                'total': 300,
+                'payment_count': self.payment_count
+            }
+
+        timeliness_weight, pattern_weight = maturity_weights(months_as_client)
+
+        timeliness_score = self._timeliness()
+
+        recent_count, adtp, payment_stddev = self.window_6mo.stats()
+        if recent_count < 3:
+            pattern_score = 50
+        else:
+            consistency_score = max(0, 100 - (payment_stddev * 2))
+            recent_dpd = self.window_6mo.rows[-1][2]
+            recent_dpd = math.nan if recent_dpd is None else recent_dpd
+            if payment_stddev > 0:
+                penalty = pattern_break_penalty(abs((recent_dpd - adtp) / payment_stddev))
+            else:
+                penalty = 0
+            pattern_score = max(0, consistency_score - penalty)
+
+        total = (timeliness_score * timeliness_weight + pattern_score * pattern_weight) * 6
+
+        return {
+            'timeliness_score': round1(timeliness_score),
+            'pattern_score': round1(pattern_score),
+            'timeliness_weight': timeliness_weight,
+            'pattern_weight': pattern_weight,
+            'total': round1(total),
+            'payment_count': self.payment_count
+        }
+
+    def payment_plan_score(self) -> Dict:
+        """Same output as calculate_payment_plan_score"""
+        months_since_last = (
+            months_ago(self.as_of_day - self.last_plan_day)
+            if self.last_plan_day is not None else None
+        )
+        if self.plan_count == 0 or not self.plans_12mo:
+            return {
+                'total': 150,
+                'active_plans': 0,
+                'completed_plans_12mo': 0,
+                'defaulted_plans': 0,
+                'months_since_last_plan': months_since_last
+            }
+
+        active_plans = self.status_counts['active']
+        completed_plans = self.status_counts['completed']
+        defaulted_plans = self.status_counts['defaulted']
+        return {
+            'total': payment_plan_points(active_plans, completed_plans, defaulted_plans),
+            'active_plans': active_plans,
+            'completed_plans_12mo': completed_plans,
+            'defaulted_plans': defaulted_plans,
+            'months_since_last_plan': months_since_last
+        }
+
+    def deterioration_velocity(self) -> Dict:
+        """Same output as calculate_deterioration_velocity"""
+        if self.payment_count < 3:
+            return {
+                'total': 125,
+                'dpd_1mo': 0,
+                'dpd_6mo': 0,
+                'trend_delta': 0,
+                'payments_1mo': 0,
+                'payments_6mo': 0
+            }
+
+        payments_1mo, dpd_1mo, _ = self.window_1mo.stats()
+        payments_6mo, dpd_6mo, _ = self.window_6mo.stats()
+
+        if payments_6mo < 3 or payments_1mo < 1:
+            return {
+                'total': 125,
+                'dpd_1mo': 0,
+                'dpd_6mo': 0,
+                'trend_delta': 0,
+                'payments_1mo': payments_1mo,
+                'payments_6mo': payments_6mo
+            }
+
+        trend_delta = dpd_1mo - dpd_6mo
+
+        return {
+            'total': round1(deterioration_points(trend_delta)),
+            'dpd_1mo': round1(dpd_1mo),
+            'dpd_6mo': round1(dpd_6mo),
+            'trend_delta': round1(trend_delta),
+            'payments_1mo': payments_1mo,
+            'payments_6mo': payments_6mo
+        }
+
+    def components(self, reference_date, months_as_client: int) -> Dict:
+        """Advance to reference_date and return the three components + total"""
+        self.advance_to(reference_date)
+        payment_perf = self.payment_performance(months_as_client)
+        payment_plan = self.payment_plan_score()
+        deterioration = self.deterioration_velocity()
+        return {
+            'payment_performance': payment_perf,
+            'payment_plan': payment_plan,
+            'deterioration': deterioration,
+            'total_score': round1(
+                payment_perf['total'] + payment_plan['total'] + deterioration['total']
+            )
+        }
+
+    # ------------------------------------------------------------------
+    # Construction / persistence
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_history(
+        cls,
+        payments: Iterable[Dict],
+        payment_plans: Iterable[Dict],
+        reference_date
+    ) -> 'ClientScoreState':
+        """
+        Bootstrap the state from a full history (dicts with payment_date /
+        days_past_due / payment_id and plan_id / plan_start_date /
+        plan_status; ids optional). Payments
+        are applied oldest first so ties on the same day favour the row
+        listed first, as in a ClientPaymentIndex.
+        """
+        state = cls(day_ordinal(reference_date))
+        payments = list(payments)
+        undated = [row for row in payments if day_ordinal(row.get('payment_date')) is None]
+        dated = sorted(
+            (row for row in reversed(payments) if day_ordinal(row.get('payment_date')) is not None),
+            key=lambda row: day_ordinal(row['payment_date'])
+        )
+        for row in undated + dated:
+            state.add_payment(row.get('payment_date'), row.get('days_past_due'), row.get('payment_id'))
+        for i, row in enumerate(payment_plans):
+            plan_id = row.get('plan_id')
+            state.add_plan(f'#{i}' if plan_id is None else plan_id,
+                           row.get('plan_start_date'), row.get('plan_status'))
+        return state
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable snapshot of the state"""
+        return {
+            'as_of_day': self.as_of_day,
+            'payment_count': self.payment_count,
+            'seq': self.seq,
+            'anchor_block': self.anchor_block,
+            'score_sums': self.score_sums,
+            'weight_sums': self.weight_sums,
+            'window_1mo': self.window_1mo.to_dict(),
+            'window_6mo': self.window_6mo.to_dict(),
+            'plan_count': self.plan_count,
+            'last_plan_day': self.last_plan_day,
+            'plans_12mo': self.plans_12mo,
+            'status_counts': self.status_counts,
+            'last_payment_id': self.last_payment_id,
+            'last_plan_id': self.last_plan_id,
+            'payment_ids': [[payment_id, day] for payment_id, day in self.payment_ids.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ClientScoreState':
+        state = cls(data['as_of_day'])
+        state.payment_count = data['payment_count']
+        state.seq = data['seq']
+        state.anchor_block = data['anchor_block']
+        state.score_sums = list(data['score_sums'])
+        state.weight_sums = list(data['weight_sums'])
+        state.window_1mo = _Window.from_dict(WINDOW_1MO_DAYS, data['window_1mo'])
+        state.window_6mo = _Window.from_dict(WINDOW_6MO_DAYS, data['window_6mo'])
+        state.plan_count = data['plan_count']
+        state.last_plan_day = data['last_plan_day']
+        state.plans_12mo = {k: list(v) for k, v in data['plans_12mo'].items()}
+        state.status_counts = dict(data['status_counts'])
+        state.last_payment_id = data.get('last_payment_id')
+        state.last_plan_id = data.get('last_plan_id')
+        state.payment_ids = {payment_id: day for payment_id, day in data.get('payment_ids', [])}
+        return state
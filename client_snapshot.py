@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+PLATAM Client Snapshot
+======================
+
+Compact, memory-mapped columnar copy of a client table (e.g.
+SCORES_V2_ANALISIS_COMPLETO.csv) for the scoring API. Every uvicorn
+worker maps the same files read-only, so N workers share one physical
+copy through the page cache instead of each holding its own DataFrame
+with object columns.
+
+The snapshot path is a symlink to a versioned directory next to it
+(.<name>.<build id>); a rebuild writes a new version and swaps the link
+atomically, so a worker that is still loading the previous version never
+sees its files disappear.
+
+Layout of a snapshot directory:
+
+    snapshot.json           columns, kinds, row count, source CSV size / mtime
+    col_<i>.npy             numeric and bool columns as typed arrays
+    col_<i>.codes.npy       text columns, dictionary-encoded: int32 code per
+    col_<i>.offsets.npy     row (-1 = missing), UTF-8 bytes of the distinct
+    col_<i>.data.npy        values and their offsets
+    index.npy               open-addressing hash table: normalized cédula
+                            -> row position (-1 = empty slot)
+
+    path = ensure_snapshot('SCORES_V2_ANALISIS_COMPLETO.csv')
+    clientes = ClientSnapshot(path)
+    clientes.get('1.006.157.869')      -> row dict, like df.iloc[i].to_dict()
+    clientes.column('hybrid_score')    -> np.ndarray (memory-mapped)
+
+Lookups follow CedulaIndex: normalize_cedula on both sides, first row of a
+repeated cédula wins, constant time per request.
+
+Usage (build the snapshot ahead of time, e.g. in the Docker image):
+    python client_snapshot.py SCORES_V2_ANALISIS_COMPLETO.csv
+
+Autor: PLATAM Data Team
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from cedula_index import normalize_cedula, normalize_cedulas, cedulas_as_text
+
+SNAPSHOT_VERSION = 1
+META_FILE = 'snapshot.json'
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def read_clients_csv(csv_path) -> pd.DataFrame:
+    """Client CSV as the APIs load it: column names stripped (BOM), cédula as text"""
+    df = pd.read_csv(csv_path)
+    df.columns = df.columns.str.strip()
+    df['cedula'] = cedulas_as_text(df['cedula'])
+    return df
+
+
+def _key_hash(key: str) -> int:
+    """Stable 64-bit hash of a normalized cédula (hash() is salted per process)"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _build_index(keys: pd.Series) -> np.ndarray:
+    """Linear-probing table of at least twice the rows, first row of each key"""
+    size = 1 << max(3, (2 * len(keys)).bit_length())
+    mask = size - 1
+    slots = np.full(size, -1, dtype=np.int64)
+    seen = set()
+    for position, key in enumerate(keys.tolist()):
+        if key is None or key != key or key in seen:
+            continue
+        seen.add(key)
+        slot = _key_hash(key) & mask
+        while slots[slot] != -1:
+            slot = (slot + 1) & mask
+        slots[slot] = position
+    return slots
+
+
+def _encode_text(values: pd.Series):
+    """(codes, offsets, data) of a text column"""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    encoded = [str(value).encode('utf-8') for value in uniques]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return codes.astype(np.int32), offsets, data
+
+
+def write_snapshot(df: pd.DataFrame, path, key_column: str = 'cedula',
+                   source: Optional[Dict] = None) -> Path:
+    """
+    Writes df as a snapshot directory. Numeric and bool columns keep their
+    dtype; object columns must hold text (missing values allowed).
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        values = df[name]
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biuf':
+            array = values.to_numpy()
+            np.save(path / f'col_{i}.npy', array)
+            columns.append({'name': name, 'kind': 'numeric', 'dtype': array.dtype.str})
+        elif pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty'):
+            codes, offsets, data = _encode_text(values)
+            np.save(path / f'col_{i}.codes.npy', codes)
+            np.save(path / f'col_{i}.offsets.npy', offsets)
+            np.save(path / f'col_{i}.data.npy', data)
+            columns.append({'name': name, 'kind': 'text'})
+        else:
+            raise TypeError(f"Column {name!r} ({values.dtype}) is neither numeric nor text")
+
+    np.save(path / 'index.npy', _build_index(normalize_cedulas(df[key_column])))
+
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'rows': len(df),
+        'key_column': key_column,
+        'columns': columns,
+        'source': source,
+    }
+    # snapshot.json last: a directory without it is an unfinished snapshot
+    with open(path / META_FILE, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def _source_signature(csv_path: Path) -> Dict:
+    stat = csv_path.stat()
+    return {'file': csv_path.name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _read_meta(path: Path) -> Optional[Dict]:
+    try:
+        with open(path / META_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ensure_snapshot(csv_path, path=None, reader=read_clients_csv) -> Path:
+    """
+    Snapshot of csv_path (default: <csv>.snapshot next to it), built from
+    the CSV when missing, of another version or older than the CSV.
+
+    Safe with several workers starting at once: one builds (under a lock
+    file) into a new versioned directory and swaps the path symlink to it
+    with os.replace; the others wait and use its snapshot. The version the
+    link pointed to is kept for workers still loading it; older versions
+    are removed.
+    """
+    csv_path = Path(csv_path)
+    path = Path(path) if path is not None else csv_path.with_name(csv_path.name + '.snapshot')
+    source = _source_signature(csv_path)
+
+    def is_current(meta):
+        return meta is not None and meta['version'] == SNAPSHOT_VERSION and meta['source'] == source
+
+    if is_current(_read_meta(path)):
+        return path
+
+    lock = path.with_name(f'.{path.name}.lock')
+    with open(lock, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if is_current(_read_meta(path)):
+            # Another worker built it while this one waited
+            return path
+
+        build_id = f'{os.getpid()}-{time.time_ns()}'
+        version = path.with_name(f'.{path.name}.{build_id}')
+        write_snapshot(reader(csv_path), version, source=source)
+
+        previous = os.readlink(path) if path.is_symlink() else None
+        if previous is None and path.is_dir():
+            # Snapshot of the old layout (a plain directory)
+            shutil.rmtree(path, ignore_errors=True)
+
+        link = path.with_name(f'.{path.name}.{build_id}.link')
+        os.symlink(version.name, link)
+        os.replace(link, path)
+
+        # Older versions and leftovers of interrupted builds
+        for stale in path.parent.glob(f'.{path.name}.*'):
+            if stale.name in (version.name, previous, lock.name):
+                continue
+            if stale.is_symlink() or stale.is_file():
+                stale.unlink()
+            else:
+                shutil.rmtree(stale, ignore_errors=True)
+    return path
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+class _TextColumn:
+    """Dictionary-encoded text column over memory-mapped arrays"""
+
+    def __init__(self, path: Path, i: int):
+        self.codes = np.load(path / f'col_{i}.codes.npy', mmap_mode='r')
+        self.offsets = np.load(path / f'col_{i}.offsets.npy', mmap_mode='r')
+        self.data = np.load(path / f'col_{i}.data.npy', mmap_mode='r')
+
+    def category(self, code: int) -> str:
+        return self.data[self.offsets[code]:self.offsets[code + 1]].tobytes().decode('utf-8')
+
+    def value(self, position: int):
+        """Text of a row (NaN if missing, as pandas reads it)"""
+        code = int(self.codes[position])
+        return np.nan if code < 0 else self.category(code)
+
+    def to_numpy(self) -> np.ndarray:
+        categories = np.array(
+            [self.category(code) for code in range(len(self.offsets) - 1)] + [np.nan], dtype=object
+        )
+        return categories[self.codes]
+
+
+class ClientSnapshot:
+    """Read-only client table mapped from a snapshot directory"""
+
+    def __init__(self, path):
+        # Resolved once: a rebuild swaps the link, not the files mapped here
+        self.path = Path(path).resolve()
+        meta = _read_meta(self.path)
+        if meta is None or meta['version'] != SNAPSHOT_VERSION:
+            raise ValueError(f"{self.path} is not a version {SNAPSHOT_VERSION} client snapshot")
+
+        self.rows = meta['rows']
+        self.source = meta['source']
+        self.columns: List[str] = [column['name'] for column in meta['columns']]
+        self._columns = {}
+        for i, column in enumerate(meta['columns']):
+            if column['kind'] == 'numeric':
+                self._columns[column['name']] = np.load(self.path / f'col_{i}.npy', mmap_mode='r')
+            else:
+                self._columns[column['name']] = _TextColumn(self.path, i)
+
+        self._key = self._columns[meta['key_column']]
+        self._index = np.load(self.path / 'index.npy', mmap_mode='r')
+        self._mask = len(self._index) - 1
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _value(self, name: str, position: int):
+        column = self._columns[name]
+        if isinstance(column, _TextColumn):
+            return column.value(position)
+        return column[position].item()
+
+    def column(self, name: str) -> np.ndarray:
+        """Whole column: memory-mapped array (numeric) or object array (text)"""
+        column = self._columns[name]
+        return column.to_numpy() if isinstance(column, _TextColumn) else column
+
+    def row(self, position: int) -> dict:
+        """Row as a dict of Python scalars, like df.iloc[position].to_dict()"""
+        return {name: self._value(name, position) for name in self.columns}
+
+    def position(self, cedula) -> Optional[int]:
+        """Row position of a cédula (None if it is not in the table)"""
+        key = normalize_cedula(cedula)
+        if key is None:
+            return None
+
+        slot = _key_hash(key) & self._mask
+        while True:
+            position = int(self._index[slot])
+            if position < 0:
+                return None
+            if isinstance(self._key, _TextColumn):
+                stored = self._key.value(position)
+            else:
+                stored = self._key[position].item()
+            if normalize_cedula(stored) == key:
+                return position
+            slot = (slot + 1) & self._mask
+
+    def get(self, cedula) -> Optional[dict]:
+        """Row of a cédula as a dict (None if not found)"""
+        position = self.position(cedula)
+        return None if position is None else self.row(position)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materializes the table (private copy, for analysis / tests)"""
+        return pd.DataFrame({name: np.asarray(self.column(name)) for name in self.columns})
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python client_snapshot.py <clientes.csv>")
+        sys.exit(1)
+
+    snapshot_path = ensure_snapshot(sys.argv[1])
+    snapshot = ClientSnapshot(snapshot_path)
+    size = sum(f.stat().st_size for f in snapshot_path.iterdir())
+    print(f"✅ {snapshot_path}: {len(snapshot):,} clientes, {len(snapshot.columns)} columnas, {size / 1e6:.1f} MB")
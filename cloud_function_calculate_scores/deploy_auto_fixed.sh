@@ -86,6 +86,10 @@ echo ""
 echo "🚀 Desplegando Cloud Function..."
 echo ""
 
+# Copiar módulos compartidos del repo (se eliminan al terminar)
+cp ../scoring_core.py ../stage_timing.py .
+trap 'rm -f scoring_core.py stage_timing.py' EXIT
+
 gcloud functions deploy "$FUNCTION_NAME" \
   --gen2 \
   --runtime="$RUNTIME" \
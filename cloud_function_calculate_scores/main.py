@@ -18,7 +18,8 @@ Input (POST):
             "ciudad": "Barranquilla"
         },
         "payments": [...],
-        "loans": [...]  // Préstamos para calcular créditos vigentes/mora
+        "loans": [...],  // Préstamos para calcular créditos vigentes/mora
+        "profile": true  // Opcional: tiempos por etapa en stage_timings
     }
 
 Output:
@@ -36,16 +37,30 @@ Fecha: Enero 2026
 
 import functions_framework
 from flask import jsonify
-import pandas as pd
-import numpy as np
 from google.cloud import aiplatform
 import boto3
 import json
 import os
+import sys
 from datetime import datetime
 import time
 from typing import Dict, List, Optional
 
+try:
+    from scoring_core import (
+        mean, pstd, round1, maturity_weights, payment_plan_points,
+        deterioration_points, dynamic_hybrid_score
+    )
+    from stage_timing import new_recorder
+except ImportError:
+    # Ejecución local desde el repo (deploy.sh copia los módulos junto a main.py)
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from scoring_core import (
+        mean, pstd, round1, maturity_weights, payment_plan_points,
+        deterioration_points, dynamic_hybrid_score
+    )
+    from stage_timing import new_recorder
+
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
@@ -309,6 +324,9 @@ def extract_hcpn_demographics(hcpn_data: Dict) -> Dict:
 # FUNCIONES DE SCORING (iguales que antes)
 # ============================================================================
 
+# Fórmulas compartidas en scoring_core (solo librería estándar: sin pandas ni
+# numpy en el arranque en frío)
+
 def calculate_payment_performance(payments: List[Dict], months_as_client: int) -> Dict:
     """Calcula Payment Performance Score (600 pts)"""
 
@@ -344,17 +362,12 @@ def calculate_payment_performance(payments: List[Dict], months_as_client: int) -
 
         payment_scores.append(score)
 
-    timeliness_score = np.mean(payment_scores) if payment_scores else 50
+    timeliness_score = mean(payment_scores) if payment_scores else 50
 
     recent_dpds = [p.get('days_past_due', 0) for p in payments[:min(6, len(payments))]]
-    pattern_score = max(0, 100 - np.std(recent_dpds) * 2) if len(recent_dpds) > 1 else 50
+    pattern_score = max(0, 100 - pstd(recent_dpds) * 2) if len(recent_dpds) > 1 else 50
 
-    if months_as_client < 6:
-        timeliness_weight, pattern_weight = 0.85, 0.15
-    elif months_as_client < 12:
-        timeliness_weight, pattern_weight = 0.70, 0.30
-    else:
-        timeliness_weight, pattern_weight = 0.50, 0.50
+    timeliness_weight, pattern_weight = maturity_weights(months_as_client)
 
     total = (timeliness_score * timeliness_weight + pattern_score * pattern_weight) * 6
 
@@ -363,9 +376,9 @@ def calculate_payment_performance(payments: List[Dict], months_as_client: int) -
     pct_late = round(late_count / total_payments, 3) if total_payments > 0 else 0
 
     return {
-        'timeliness_score': round(timeliness_score, 1),
-        'pattern_score': round(pattern_score, 1),
-        'total': round(total, 1),
+        'timeliness_score': round1(timeliness_score),
+        'pattern_score': round1(pattern_score),
+        'total': round1(total),
         'payment_count': len(payments),
         'pct_early': pct_early,
         'pct_late': pct_late
@@ -387,17 +400,13 @@ def calculate_payment_plan_score(payment_plans: List[Dict]) -> Dict:
             'tiene_plan_pendiente': False
         }
 
-    score = 150
     active = sum(1 for p in payment_plans if p.get('plan_status') == 'active')
     completed = sum(1 for p in payment_plans if p.get('plan_status') == 'completed')
     defaulted = sum(1 for p in payment_plans if p.get('plan_status') == 'defaulted')
     pending = sum(1 for p in payment_plans if p.get('plan_status') == 'pending')
 
-    score -= (active * 50) + (defaulted * 100) - (completed * 30)
-    score = max(0, min(150, score))
-
     return {
-        'total': round(score, 1),
+        'total': payment_plan_points(active, completed, defaulted),
         'active_plans': active,
         'defaulted_plans': defaulted,
         'pending_plans': pending,
@@ -417,67 +426,25 @@ def calculate_deterioration_velocity(payments: List[Dict]) -> Dict:
     payments_1mo = payments[:min(1, len(payments))]
     payments_6mo = payments[:min(6, len(payments))]
 
-    dpd_1mo = np.mean([p.get('days_past_due', 0) for p in payments_1mo]) if payments_1mo else 0
-    dpd_6mo = np.mean([p.get('days_past_due', 0) for p in payments_6mo]) if payments_6mo else 0
+    dpd_1mo = mean([p.get('days_past_due', 0) for p in payments_1mo]) if payments_1mo else 0
+    dpd_6mo = mean([p.get('days_past_due', 0) for p in payments_6mo]) if payments_6mo else 0
 
     trend_delta = dpd_1mo - dpd_6mo
-    base_score = max(0, min(100, 100 - (trend_delta * 3)))
-    score = base_score * 2.5
 
     return {
-        'total': round(score, 1),
-        'dpd_1mo': round(dpd_1mo, 1),
-        'dpd_6mo': round(dpd_6mo, 1),
-        'trend_delta': round(trend_delta, 1)
+        'total': round1(deterioration_points(trend_delta)),
+        'dpd_1mo': round1(dpd_1mo),
+        'dpd_6mo': round1(dpd_6mo),
+        'trend_delta': round1(trend_delta)
     }
 
 
 def calculate_hybrid_score(platam_score: float, hcpn_score: Optional[float],
                           months_as_client: int, payment_count: int) -> Dict:
-    """Calcula score híbrido con pesos dinámicos"""
-
-    if months_as_client < 3:
-        categoria = 'muy_nuevo'
-    elif months_as_client < 6:
-        categoria = 'nuevo'
-    elif months_as_client < 12:
-        categoria = 'intermedio'
-    elif months_as_client < 24:
-        categoria = 'establecido'
-    else:
-        categoria = 'maduro'
-
-    pesos = {
-        'muy_nuevo': 0.30,
-        'nuevo': 0.40,
-        'intermedio': 0.50,
-        'establecido': 0.60,
-        'maduro': 0.70
-    }
-
-    if hcpn_score is None or pd.isna(hcpn_score) or hcpn_score == 0:
-        peso_platam = 1.0
-        peso_hcpn = 0.0
-        hybrid_score = platam_score
-    else:
-        peso_platam = pesos[categoria]
-
-        if payment_count >= 20:
-            peso_platam += 0.10
-        elif payment_count < 5:
-            peso_platam -= 0.10
-
-        peso_platam = max(0.20, min(0.80, peso_platam))
-        peso_hcpn = 1.0 - peso_platam
-
-        hybrid_score = (platam_score * peso_platam) + (hcpn_score * peso_hcpn)
-
-    return {
-        'hybrid_score': round(hybrid_score, 1),
-        'peso_platam': peso_platam,
-        'peso_hcpn': peso_hcpn,
-        'categoria': categoria
-    }
+    """Calcula score híbrido con pesos dinámicos (HCPN en 0 = sin HCPN)"""
+    return dynamic_hybrid_score(
+        platam_score, hcpn_score, months_as_client, payment_count, zero_hcpn_is_missing=True
+    )
 
 
 def get_ml_prediction(client_data: Dict, scores: Dict, hcpn_demographics: Dict) -> Dict:
@@ -581,16 +548,21 @@ def calculate_scores(request):
         if not cedula:
             return jsonify({'error': 'cedula is required'}), 400, headers
 
+        # Tiempos por etapa (opt-in: "profile": true o PLATAM_STAGE_TIMING=1)
+        recorder = new_recorder(bool(request_json.get('profile')))
+
         print(f"\n{'='*70}")
         print(f"🧮 CALCULANDO SCORES PARA CÉDULA: {cedula}")
         print(f"{'='*70}\n")
 
         # 1. Descargar HCPN de S3
         print("📥 1. Descargando HCPN de S3...")
-        hcpn_data = download_hcpn_from_s3(cedula)
+        with recorder.stage('hcpn_download'):
+            hcpn_data = download_hcpn_from_s3(cedula)
 
         if hcpn_data:
-            hcpn_demographics = extract_hcpn_demographics(hcpn_data)
+            with recorder.stage('hcpn_demographics'):
+                hcpn_demographics = extract_hcpn_demographics(hcpn_data)
         else:
             print("  ⚠ Usando valores por defecto para demografía")
             hcpn_demographics = {
@@ -610,9 +582,10 @@ def calculate_scores(request):
 
         months_as_client = client_data.get('months_as_client', 0)
 
-        payment_perf = calculate_payment_performance(payments, months_as_client)
-        payment_plan = calculate_payment_plan_score(payment_plans)
-        deterioration = calculate_deterioration_velocity(payments)
+        with recorder.stage('platam_score', rows=len(payments)):
+            payment_perf = calculate_payment_performance(payments, months_as_client)
+            payment_plan = calculate_payment_plan_score(payment_plans)
+            deterioration = calculate_deterioration_velocity(payments)
 
         platam_score = (
             payment_perf['total'] +
@@ -627,12 +600,13 @@ def calculate_scores(request):
 
         # 3. Calcular híbrido
         print(f"\n🔀 3. Calculando score híbrido...")
-        hybrid_result = calculate_hybrid_score(
-            platam_score,
-            hcpn_demographics.get('experian_score'),
-            months_as_client,
-            payment_perf['payment_count']
-        )
+        with recorder.stage('hybrid_score'):
+            hybrid_result = calculate_hybrid_score(
+                platam_score,
+                hcpn_demographics.get('experian_score'),
+                months_as_client,
+                payment_perf['payment_count']
+            )
 
         print(f"   ✓ Hybrid Score: {hybrid_result['hybrid_score']:.1f}")
         print(f"      • Peso PLATAM: {hybrid_result['peso_platam']*100:.0f}%")
@@ -659,7 +633,8 @@ def calculate_scores(request):
             'num_planes': payment_plan['num_planes']
         }
 
-        ml_prediction = get_ml_prediction(client_data, scores_for_ml, hcpn_demographics)
+        with recorder.stage('ml_prediction'):
+            ml_prediction = get_ml_prediction(client_data, scores_for_ml, hcpn_demographics)
 
         print(f"   ✓ Probabilidad Default: {ml_prediction['probability_default']*100:.1f}%")
         print(f"   ✓ Nivel de Riesgo: {ml_prediction['risk_level']}")
@@ -669,6 +644,8 @@ def calculate_scores(request):
         print(f"\n{'='*70}")
         print(f"✅ CÁLCULO COMPLETADO EN {processing_time_ms}ms")
         print(f"{'='*70}\n")
+        for line in recorder.summary_lines():
+            print(f"   ⏱ {line}")
 
         # Respuesta
         response = {
@@ -695,6 +672,8 @@ def calculate_scores(request):
             'timestamp': datetime.now().isoformat(),
             'hcpn_found': hcpn_data is not None
         }
+        if recorder.enabled:
+            response['stage_timings'] = recorder.to_dict()
 
         return jsonify(response), 200, headers
 
@@ -68,6 +68,10 @@ echo ""
 echo -e "${GREEN}🚀 Iniciando deployment...${NC}"
 echo ""
 
+# Copiar módulos compartidos del repo (se eliminan al terminar)
+cp ../client_score_state.py ../scoring_core.py ../stage_timing.py .
+trap 'rm -f client_score_state.py scoring_core.py stage_timing.py' EXIT
+
 # Deploy Cloud Function
 gcloud functions deploy "$FUNCTION_NAME" \
   --gen2 \
@@ -8,9 +8,37 @@ Recibe triggers de eventos de negocio y actualiza el score de UN cliente especí
 Input (POST):
     {
         "client_id": "1120",  // ID interno de MySQL (wp_jet_cct_clientes._ID)
-        "trigger": "late_7"   // Tipo de evento
+        "trigger": "late_7",  // Tipo de evento
+        "event": {            // Opcional: evento que originó el trigger
+            "type": "payment",
+            "payment_id": 5120,
+            "payment_date": "2026-01-15",
+            "days_past_due": 7
+        }
     }
 
+    Tipos de evento soportados (el id es obligatorio):
+        {"type": "payment", "payment_id": ..., "payment_date": ..., "days_past_due": ...}
+        {"type": "plan", "plan_id": ..., "plan_start_date": ..., "plan_status": ...}
+        {"type": "plan_status", "plan_id": ..., "plan_status": ...}
+
+    El score se recalcula desde el estado incremental del cliente
+    (client_score_state.py, tabla wp_platam_score_state): con "event", el
+    evento se aplica en O(1) sin releer el historial; sin "event" (n8n,
+    Cloud Scheduler) el estado guardado solo avanza a la fecha de hoy (los
+    pagos salen de las ventanas de 1 / 6 / 12 meses). El estado se
+    reconstruye desde el historial completo en MySQL solo si el cliente no
+    tiene estado todavía, si llega un evento fuera de orden o con
+    "rebuild_state": true (p.ej. tras corregir pagos o DPD históricos).
+
+    El recálculo de los scores PLATAM / híbrido corre en una transacción
+    que bloquea la fila del cliente en wp_platam_score_state: triggers
+    concurrentes del mismo cliente se atienden uno tras otro, y el estado se
+    guarda junto con los scores (o nada, si algo falla). La predicción de
+    Vertex AI se pide después del commit, sin la fila bloqueada, y se guarda
+    aparte: si falla, el request responde error y un reintento del mismo
+    evento lo omite (ya está en el estado) y vuelve a pedir la predicción.
+
 Output:
     {
         "status": "success",
@@ -31,19 +59,33 @@ Fecha: Enero 2026
 import functions_framework
 from flask import jsonify
 import pymysql
-import pandas as pd
-import numpy as np
 from google.cloud import aiplatform
 from datetime import datetime, timedelta
+from decimal import Decimal
 import json
 import time
 import os
+import sys
 from typing import Dict, Optional, List
 
+try:
+    from client_score_state import ClientScoreState
+    from scoring_core import is_missing, dynamic_hybrid_score
+    from stage_timing import new_recorder
+except ImportError:
+    # Ejecución local desde el repo (deploy.sh copia los módulos junto a main.py)
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from client_score_state import ClientScoreState
+    from scoring_core import is_missing, dynamic_hybrid_score
+    from stage_timing import new_recorder
+
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
 
+# Campo id de cada tipo de evento (para descartar eventos ya aplicados)
+EVENT_ID_FIELDS = {'payment': 'payment_id', 'plan': 'plan_id', 'plan_status': 'plan_id'}
+
 # Vertex AI
 PROJECT_ID = "platam-analytics"
 REGION = "us-central1"
@@ -65,144 +107,17 @@ endpoint = aiplatform.Endpoint(
 )
 
 # ============================================================================
-# FUNCIONES DE SCORING REUTILIZADAS (simplificadas)
+# FUNCIONES DE SCORING REUTILIZADAS
 # ============================================================================
 
-def calculate_payment_performance(payments_df: pd.DataFrame, months_as_client: int) -> Dict:
-    """Calcula Payment Performance Score (600 pts)"""
-
-    if len(payments_df) < 3:
-        return {
-            'timeliness_score': 50,
-            'pattern_score': 50,
-            'total': 300,
-            'payment_count': len(payments_df)
-        }
-
-    # Calcular score de timeliness
-    payments_df['payment_quality'] = payments_df['days_past_due'].apply(
-        lambda dpd: 100 if dpd <= 0 else max(0, 100 - dpd * 3)
-    )
-    timeliness_score = payments_df['payment_quality'].mean()
-
-    # Pattern score (consistencia)
-    recent_6mo = payments_df.head(min(6, len(payments_df)))
-    pattern_score = max(0, 100 - recent_6mo['days_past_due'].std() * 2) if len(recent_6mo) > 0 else 50
-
-    # Pesos según madurez
-    if months_as_client < 6:
-        timeliness_weight, pattern_weight = 0.85, 0.15
-    elif months_as_client < 12:
-        timeliness_weight, pattern_weight = 0.70, 0.30
-    else:
-        timeliness_weight, pattern_weight = 0.50, 0.50
-
-    total = (timeliness_score * timeliness_weight + pattern_score * pattern_weight) * 6
-
-    return {
-        'timeliness_score': round(timeliness_score, 1),
-        'pattern_score': round(pattern_score, 1),
-        'total': round(total, 1),
-        'payment_count': len(payments_df)
-    }
-
-
-def calculate_payment_plan_score(payment_plans_df: pd.DataFrame) -> Dict:
-    """Calcula Payment Plan History Score (150 pts)"""
-
-    if len(payment_plans_df) == 0:
-        return {'total': 150, 'active_plans': 0, 'defaulted_plans': 0}
-
-    score = 150
-    active = len(payment_plans_df[payment_plans_df['plan_status'] == 'active'])
-    completed = len(payment_plans_df[payment_plans_df['plan_status'] == 'completed'])
-    defaulted = len(payment_plans_df[payment_plans_df['plan_status'] == 'defaulted'])
-
-    score -= (active * 50) + (defaulted * 100) - (completed * 30)
-    score = max(0, min(150, score))
-
-    return {
-        'total': round(score, 1),
-        'active_plans': active,
-        'defaulted_plans': defaulted
-    }
-
-
-def calculate_deterioration_velocity(payments_df: pd.DataFrame) -> Dict:
-    """Calcula Deterioration Velocity Score (250 pts)"""
-
-    if len(payments_df) < 3:
-        return {'total': 125, 'dpd_1mo': 0, 'dpd_6mo': 0, 'trend_delta': 0}
-
-    # Últimos 1 mes vs últimos 6 meses
-    payments_1mo = payments_df.head(min(1, len(payments_df)))
-    payments_6mo = payments_df.head(min(6, len(payments_df)))
-
-    dpd_1mo = payments_1mo['days_past_due'].mean() if len(payments_1mo) > 0 else 0
-    dpd_6mo = payments_6mo['days_past_due'].mean() if len(payments_6mo) > 0 else 0
-
-    trend_delta = dpd_1mo - dpd_6mo
-    base_score = max(0, min(100, 100 - (trend_delta * 3)))
-    score = base_score * 2.5
-
-    return {
-        'total': round(score, 1),
-        'dpd_1mo': round(dpd_1mo, 1),
-        'dpd_6mo': round(dpd_6mo, 1),
-        'trend_delta': round(trend_delta, 1)
-    }
-
+# Los componentes PLATAM (payment performance, payment plan, deterioration)
+# salen de ClientScoreState, que reproduce internal_credit_score.py; el
+# híbrido, de scoring_core. Ninguno importa pandas / numpy (arranque en frío).
 
 def calculate_hybrid_score(platam_score: float, hcpn_score: Optional[float],
                           months_as_client: int, payment_count: int) -> Dict:
-    """Calcula score híbrido con pesos dinámicos"""
-
-    # Determinar categoría de madurez
-    if months_as_client < 3:
-        categoria = 'muy_nuevo'
-    elif months_as_client < 6:
-        categoria = 'nuevo'
-    elif months_as_client < 12:
-        categoria = 'intermedio'
-    elif months_as_client < 24:
-        categoria = 'establecido'
-    else:
-        categoria = 'maduro'
-
-    # Pesos base
-    pesos = {
-        'muy_nuevo': 0.30,
-        'nuevo': 0.40,
-        'intermedio': 0.50,
-        'establecido': 0.60,
-        'maduro': 0.70
-    }
-
-    # Si no tiene HCPN, 100% PLATAM
-    if hcpn_score is None or pd.isna(hcpn_score):
-        peso_platam = 1.0
-        peso_hcpn = 0.0
-        hybrid_score = platam_score
-    else:
-        peso_platam = pesos[categoria]
-
-        # Ajuste por historial
-        if payment_count >= 20:
-            peso_platam += 0.10
-        elif payment_count < 5:
-            peso_platam -= 0.10
-
-        peso_platam = max(0.20, min(0.80, peso_platam))
-        peso_hcpn = 1.0 - peso_platam
-
-        hybrid_score = (platam_score * peso_platam) + (hcpn_score * peso_hcpn)
-
-    return {
-        'hybrid_score': round(hybrid_score, 1),
-        'peso_platam': peso_platam,
-        'peso_hcpn': peso_hcpn,
-        'categoria': categoria
-    }
+    """Calcula score híbrido con pesos dinámicos (scoring_core)"""
+    return dynamic_hybrid_score(platam_score, hcpn_score, months_as_client, payment_count)
 
 # ============================================================================
 # FUNCIONES DE BASE DE DATOS
@@ -213,103 +128,178 @@ def get_db_connection():
     return pymysql.connect(**MYSQL_CONFIG)
 
 
+def fetch_records(query: str) -> List[Dict]:
+    """Ejecuta un SELECT y retorna las filas como dicts (DECIMAL → float, como pd.read_sql)"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        cursor.execute(query)
+        return [
+            {k: float(v) if isinstance(v, Decimal) else v for k, v in row.items()}
+            for row in cursor.fetchall()
+        ]
+
+    finally:
+        conn.close()
+
+
 def get_client_data(client_id: str) -> Optional[Dict]:
     """
     Obtiene datos del cliente desde MySQL
     Tabla: wp_jet_cct_clientes
     """
-    conn = get_db_connection()
-    try:
-        query = f"""
-        SELECT
-            _ID as client_id,
-            cl_cedula as cedula,
-            cl_nombre as client_name,
-            cl_email as email,
-            cl_ciudad as ciudad,
-            cl_genero as genero,
-            cl_edad as edad,
-            cl_cuota_mensual as cuota_mensual,
-            cl_creditos_vigentes as creditos_vigentes,
-            cl_creditos_mora as creditos_mora,
-            cl_hist_neg_12m as hist_neg_12m,
-            cl_platam_score as platam_score_anterior,
-            cl_hybrid_score as hybrid_score_anterior,
-            cl_experian_score as experian_score_normalized,
-            cl_months_as_client as months_as_client
-        FROM wp_jet_cct_clientes
-        WHERE _ID = {client_id}
-        LIMIT 1
-        """
-
-        df = pd.read_sql(query, conn)
+    query = f"""
+    SELECT
+        _ID as client_id,
+        cl_cedula as cedula,
+        cl_nombre as client_name,
+        cl_email as email,
+        cl_ciudad as ciudad,
+        cl_genero as genero,
+        cl_edad as edad,
+        cl_cuota_mensual as cuota_mensual,
+        cl_creditos_vigentes as creditos_vigentes,
+        cl_creditos_mora as creditos_mora,
+        cl_hist_neg_12m as hist_neg_12m,
+        cl_platam_score as platam_score_anterior,
+        cl_hybrid_score as hybrid_score_anterior,
+        cl_experian_score as experian_score_normalized,
+        cl_months_as_client as months_as_client
+    FROM wp_jet_cct_clientes
+    WHERE _ID = {client_id}
+    LIMIT 1
+    """
 
-        if df.empty:
-            return None
+    records = fetch_records(query)
 
-        return df.iloc[0].to_dict()
+    if not records:
+        return None
 
-    finally:
-        conn.close()
+    return records[0]
 
 
-def get_payments_history(cedula: str, limit: int = 100) -> pd.DataFrame:
+def get_payments_history(cedula: str, limit: Optional[int] = 100) -> List[Dict]:
     """
     Obtiene historial de pagos del cliente
     Tabla: wp_pagos (ajusta según tu estructura)
-    """
-    conn = get_db_connection()
-    try:
-        query = f"""
-        SELECT
-            payment_id,
-            payment_date,
-            due_date,
-            DATEDIFF(payment_date, due_date) as days_past_due,
-            payment_amount,
-            payment_status
-        FROM wp_pagos
-        WHERE client_cedula = '{cedula}'
-        ORDER BY payment_date DESC
-        LIMIT {limit}
-        """
 
-        df = pd.read_sql(query, conn)
-        return df
+    limit=None trae el historial completo (reconstrucción del estado)
+    """
+    query = f"""
+    SELECT
+        payment_id,
+        payment_date,
+        due_date,
+        DATEDIFF(payment_date, due_date) as days_past_due,
+        payment_amount,
+        payment_status
+    FROM wp_pagos
+    WHERE client_cedula = '{cedula}'
+    ORDER BY payment_date DESC
+    {f'LIMIT {limit}' if limit is not None else ''}
+    """
 
-    finally:
-        conn.close()
+    return fetch_records(query)
 
 
-def get_payment_plans(cedula: str) -> pd.DataFrame:
+def get_payment_plans(cedula: str) -> List[Dict]:
     """
     Obtiene planes de pago del cliente
     Tabla: wp_payment_plans (ajusta según tu estructura)
     """
-    conn = get_db_connection()
-    try:
-        query = f"""
-        SELECT
-            plan_id,
-            plan_start_date,
-            plan_end_date,
-            plan_status,
-            plan_amount
-        FROM wp_payment_plans
-        WHERE client_cedula = '{cedula}'
-        ORDER BY plan_start_date DESC
+    query = f"""
+    SELECT
+        plan_id,
+        plan_start_date,
+        plan_end_date,
+        plan_status,
+        plan_amount
+    FROM wp_payment_plans
+    WHERE client_cedula = '{cedula}'
+    ORDER BY plan_start_date DESC
+    """
+
+    return fetch_records(query)
+
+
+def get_score_state(conn, client_id: str) -> Optional[ClientScoreState]:
+    """
+    Obtiene el estado incremental del score del cliente
+    Tabla: wp_platam_score_state
+
+    Bloquea la fila (SELECT ... FOR UPDATE) hasta el commit / rollback de
+    conn: otro trigger del mismo cliente espera en vez de pisar el estado
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT state_json FROM wp_platam_score_state WHERE client_id = %s FOR UPDATE",
+        (client_id,)
+    )
+    row = cursor.fetchone()
+
+    if row is None:
+        return None
+
+    return ClientScoreState.from_dict(json.loads(row[0]))
+
+
+def save_score_state(conn, client_id: str, state: ClientScoreState):
+    """Guarda (upsert) el estado incremental del score (se confirma con el commit de conn)"""
+    cursor = conn.cursor()
+    cursor.execute(
         """
+        INSERT INTO wp_platam_score_state (client_id, state_json, updated_at)
+        VALUES (%s, %s, NOW())
+        ON DUPLICATE KEY UPDATE state_json = VALUES(state_json), updated_at = NOW()
+        """,
+        (client_id, json.dumps(state.to_dict()))
+    )
 
-        df = pd.read_sql(query, conn)
-        return df
 
-    finally:
-        conn.close()
+def build_score_state(cedula: str, reference_date: datetime) -> ClientScoreState:
+    """Reconstruye el estado incremental desde el historial completo en MySQL"""
+    payments = get_payments_history(cedula, limit=None)
+    payment_plans = get_payment_plans(cedula)
+    print(f"   ✓ {len(payments)} pagos y {len(payment_plans)} planes en el historial")
 
+    return ClientScoreState.from_history(payments, payment_plans, reference_date)
 
-def update_client_scores(client_id: str, scores: Dict, trigger: str):
-    """Actualiza scores en MySQL"""
-    conn = get_db_connection()
+
+def apply_event(state: ClientScoreState, event: Dict) -> Optional[bool]:
+    """
+    Aplica un evento de pago / plan al estado (O(1)). Retorna False si el
+    pago / plan ya estaba en el estado (evento reenviado): no se cuenta dos
+    veces. Retorna None, sin aplicarlo, si el estado no sabe si ya lo contó
+    (id anterior al último aplicado, p.ej. 5120 después de 5121): hay que
+    reconstruir desde el historial. Cambiar el estado de un plan es idempotente
+    """
+    event_type = event.get('type')
+
+    if event_type == 'payment':
+        counted = state.has_payment(event['payment_id'])
+        if counted is not False:
+            return None if counted is None else False
+        state.add_payment(event.get('payment_date'), event.get('days_past_due'), event['payment_id'])
+    elif event_type == 'plan':
+        counted = state.has_plan(event['plan_id'])
+        if counted is not False:
+            return None if counted is None else False
+        state.add_plan(event['plan_id'], event.get('plan_start_date'), event.get('plan_status'))
+    elif event_type == 'plan_status':
+        state.update_plan_status(event['plan_id'], event.get('plan_status'))
+    else:
+        raise ValueError(f"Tipo de evento no soportado: {event_type}")
+    return True
+
+
+def update_client_scores(client_id: str, scores: Dict, trigger: str, conn=None):
+    """
+    Actualiza los scores PLATAM / híbrido en MySQL (con conn, dentro de su
+    transacción, sin commit); la predicción ML va con update_ml_scores
+    """
+    own_connection = conn is None
+    if own_connection:
+        conn = get_db_connection()
     try:
         cursor = conn.cursor()
 
@@ -318,8 +308,6 @@ def update_client_scores(client_id: str, scores: Dict, trigger: str):
         SET
             cl_platam_score = {scores['platam_score']},
             cl_hybrid_score = {scores['hybrid_score']},
-            cl_ml_probability_default = {scores['ml_probability_default']},
-            cl_ml_risk_level = '{scores['ml_risk_level']}',
             cl_score_payment_performance = {scores.get('score_payment_performance', 0)},
             cl_score_payment_plan = {scores.get('score_payment_plan', 0)},
             cl_score_deterioration = {scores.get('score_deterioration', 0)},
@@ -331,10 +319,30 @@ def update_client_scores(client_id: str, scores: Dict, trigger: str):
         """
 
         cursor.execute(update_query)
-        conn.commit()
+        if own_connection:
+            conn.commit()
 
         print(f"✅ Scores actualizados en MySQL para client_id={client_id}")
 
+    finally:
+        if own_connection:
+            conn.close()
+
+
+def update_ml_scores(client_id: str, ml_prediction: Dict):
+    """Guarda la predicción ML del cliente (fuera de la transacción del estado)"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE wp_jet_cct_clientes
+            SET cl_ml_probability_default = %s, cl_ml_risk_level = %s, cl_modified = NOW()
+            WHERE _ID = %s
+            """,
+            (ml_prediction['probability_default'], ml_prediction['risk_level'], client_id)
+        )
+        conn.commit()
     finally:
         conn.close()
 
@@ -390,7 +398,7 @@ def get_ml_prediction(client_data: Dict, scores: Dict) -> Dict:
     instance = []
     for feature in feature_order:
         value = data_map.get(feature, 0)
-        if pd.isna(value) or value is None:
+        if is_missing(value):
             value = 0
         instance.append(float(value))
 
@@ -429,6 +437,9 @@ def update_client_score(request):
 
     Recibe:
         POST {"client_id": "1120", "trigger": "late_7"}
+        (opcional "event": aplica el evento al estado incremental; sin él el
+        estado solo avanza a hoy. "rebuild_state": true lo reconstruye desde
+        el historial. "profile": true agrega stage_timings)
 
     Retorna:
         {"status": "success", ...}
@@ -451,6 +462,18 @@ def update_client_score(request):
         if not client_id:
             return jsonify({'error': 'client_id is required'}), 400
 
+        # El evento debe traer su id: así un reintento no se aplica dos veces
+        event = request_json.get('event')
+        if event:
+            id_field = EVENT_ID_FIELDS.get(event.get('type'))
+            if id_field is None:
+                return jsonify({'error': f"Unsupported event type: {event.get('type')}"}), 400
+            if event.get(id_field) is None:
+                return jsonify({'error': f'event.{id_field} is required'}), 400
+
+        # Tiempos por etapa (opt-in: "profile": true o PLATAM_STAGE_TIMING=1)
+        recorder = new_recorder(bool(request_json.get('profile')))
+
         print(f"\n{'='*70}")
         print(f"🔄 RECALCULANDO SCORE PARA CLIENT_ID: {client_id}")
         print(f"📌 Trigger: {trigger}")
@@ -458,7 +481,8 @@ def update_client_score(request):
 
         # 1. Obtener datos del cliente
         print("📊 1. Consultando datos del cliente...")
-        client_data = get_client_data(client_id)
+        with recorder.stage('client_data'):
+            client_data = get_client_data(client_id)
 
         if not client_data:
             return jsonify({'error': f'Client {client_id} not found'}), 404
@@ -466,53 +490,95 @@ def update_client_score(request):
         cedula = client_data['cedula']
         print(f"   ✓ Cliente encontrado: {cedula}")
 
-        # 2. Obtener historial de pagos
-        print("💳 2. Consultando historial de pagos...")
-        payments_df = get_payments_history(cedula)
-        print(f"   ✓ {len(payments_df)} pagos encontrados")
-
-        # 3. Obtener planes de pago
-        print("📋 3. Consultando planes de pago...")
-        payment_plans_df = get_payment_plans(cedula)
-        print(f"   ✓ {len(payment_plans_df)} planes encontrados")
-
-        # 4. Recalcular scores PLATAM
-        print("🧮 4. Recalculando scores PLATAM...")
-
-        payment_perf = calculate_payment_performance(
-            payments_df,
-            client_data['months_as_client']
-        )
-        payment_plan = calculate_payment_plan_score(payment_plans_df)
-        deterioration = calculate_deterioration_velocity(payments_df)
-
-        platam_score = (
-            payment_perf['total'] +
-            payment_plan['total'] +
-            deterioration['total']
-        )
-
-        print(f"   ✓ PLATAM Score: {platam_score:.1f}")
-        print(f"      • Payment Performance: {payment_perf['total']:.1f}/600")
-        print(f"      • Payment Plan: {payment_plan['total']:.1f}/150")
-        print(f"      • Deterioration: {deterioration['total']:.1f}/250")
-
-        # 5. Calcular score híbrido
-        print("🔀 5. Calculando score híbrido...")
-
-        hybrid_result = calculate_hybrid_score(
-            platam_score,
-            client_data.get('experian_score_normalized'),
-            client_data['months_as_client'],
-            payment_perf['payment_count']
-        )
-
-        print(f"   ✓ Hybrid Score: {hybrid_result['hybrid_score']:.1f}")
-        print(f"      • Peso PLATAM: {hybrid_result['peso_platam']*100:.0f}%")
-        print(f"      • Peso HCPN: {hybrid_result['peso_hcpn']*100:.0f}%")
-
-        # 6. Obtener predicción ML
-        print("🤖 6. Obteniendo predicción ML de Vertex AI...")
+        # 2-5 en una transacción: la fila del estado queda bloqueada hasta el
+        # commit y, si algo falla, ni el estado ni los scores se guardan
+        conn = get_db_connection()
+        try:
+            # 2. Obtener estado incremental del score
+            print("💳 2. Consultando estado incremental del score...")
+            now = datetime.now()
+            with recorder.stage('score_state'):
+                # Bloquea la fila también al reconstruir (serializa triggers del cliente)
+                state = get_score_state(conn, client_id)
+
+                if state is None or request_json.get('rebuild_state'):
+                    # El historial en MySQL ya incluye el evento: no se re-aplica
+                    print("   ℹ Reconstruyendo el estado desde el historial...")
+                    state = build_score_state(cedula, now)
+                elif not event:
+                    # Nada nuevo que aplicar: solo vencen pagos / planes de las ventanas
+                    state.advance_to(now)
+                    print(f"   ✓ Estado al día: {state.payment_count} pagos y {state.plan_count} planes")
+                else:
+                    state.advance_to(now)
+                    applied = apply_event(state, event)
+                    if applied is None:
+                        # Id anterior al último aplicado: el historial en MySQL ya lo incluye
+                        print("   ℹ Evento fuera de orden, reconstruyendo el estado desde el historial...")
+                        state = build_score_state(cedula, now)
+                    elif applied:
+                        print(f"   ✓ Evento aplicado: {event.get('type')}")
+                    else:
+                        print(f"   ℹ Evento ya aplicado, se omite: {event.get('type')}")
+                    print(f"   ✓ {state.payment_count} pagos y {state.plan_count} planes en el estado")
+
+            months_as_client = int(client_data.get('months_as_client') or 0)
+
+            # 3. Recalcular scores PLATAM
+            print("🧮 3. Recalculando scores PLATAM...")
+
+            with recorder.stage('platam_score'):
+                components = state.components(now, months_as_client)
+            payment_perf = components['payment_performance']
+            payment_plan = components['payment_plan']
+            deterioration = components['deterioration']
+            platam_score = components['total_score']
+
+            print(f"   ✓ PLATAM Score: {platam_score:.1f}")
+            print(f"      • Payment Performance: {payment_perf['total']:.1f}/600")
+            print(f"      • Payment Plan: {payment_plan['total']:.1f}/150")
+            print(f"      • Deterioration: {deterioration['total']:.1f}/250")
+
+            # 4. Calcular score híbrido
+            print("🔀 4. Calculando score híbrido...")
+
+            with recorder.stage('hybrid_score'):
+                hybrid_result = calculate_hybrid_score(
+                    platam_score,
+                    client_data.get('experian_score_normalized'),
+                    months_as_client,
+                    payment_perf['payment_count']
+                )
+
+            print(f"   ✓ Hybrid Score: {hybrid_result['hybrid_score']:.1f}")
+            print(f"      • Peso PLATAM: {hybrid_result['peso_platam']*100:.0f}%")
+            print(f"      • Peso HCPN: {hybrid_result['peso_hcpn']*100:.0f}%")
+
+            # 5. Guardar scores y estado incremental (mismo commit)
+            print("💾 5. Actualizando MySQL y estado incremental...")
+
+            final_scores = {
+                'platam_score': platam_score,
+                'hybrid_score': hybrid_result['hybrid_score'],
+                'score_payment_performance': payment_perf['total'],
+                'score_payment_plan': payment_plan['total'],
+                'score_deterioration': deterioration['total'],
+                'peso_platam': hybrid_result['peso_platam'],
+                'peso_hcpn': hybrid_result['peso_hcpn']
+            }
+
+            with recorder.stage('update_mysql'):
+                update_client_scores(client_id, final_scores, trigger, conn)
+
+            with recorder.stage('save_state'):
+                save_score_state(conn, client_id, state)
+                conn.commit()
+
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
 
         # Preparar scores completos para ML
         scores_for_ml = {
@@ -526,41 +592,36 @@ def update_client_score(request):
             'tiene_plan_activo': payment_plan['active_plans'] > 0,
             'tiene_plan_default': payment_plan['defaulted_plans'] > 0,
             'tiene_plan_pendiente': 0,
-            'num_planes': len(payment_plans_df),
+            'num_planes': state.plan_count,
             'pct_early': 0,  # Calcular si tienes datos
             'pct_late': 0
         }
 
-        ml_prediction = get_ml_prediction(client_data, scores_for_ml)
+        # 6. Obtener predicción ML (fila del estado ya liberada: una llamada
+        # lenta a Vertex no bloquea otros triggers del cliente)
+        print("🤖 6. Obteniendo predicción ML de Vertex AI...")
+
+        with recorder.stage('ml_prediction'):
+            ml_prediction = get_ml_prediction(client_data, scores_for_ml)
 
         print(f"   ✓ Probabilidad Default: {ml_prediction['probability_default']*100:.1f}%")
         print(f"   ✓ Nivel de Riesgo: {ml_prediction['risk_level']}")
 
-        # 7. Actualizar MySQL
-        print("💾 7. Actualizando MySQL...")
-
-        final_scores = {
-            'platam_score': platam_score,
-            'hybrid_score': hybrid_result['hybrid_score'],
-            'ml_probability_default': ml_prediction['probability_default'],
-            'ml_risk_level': ml_prediction['risk_level'],
-            'score_payment_performance': payment_perf['total'],
-            'score_payment_plan': payment_plan['total'],
-            'score_deterioration': deterioration['total'],
-            'peso_platam': hybrid_result['peso_platam'],
-            'peso_hcpn': hybrid_result['peso_hcpn']
-        }
-
-        update_client_scores(client_id, final_scores, trigger)
+        # 7. Guardar predicción ML
+        print("🗂️  7. Guardando predicción ML...")
+        with recorder.stage('update_ml'):
+            update_ml_scores(client_id, ml_prediction)
 
         processing_time_ms = int((time.time() - start_time) * 1000)
 
         print(f"\n{'='*70}")
         print(f"✅ ACTUALIZACIÓN COMPLETADA EN {processing_time_ms}ms")
         print(f"{'='*70}\n")
+        for line in recorder.summary_lines():
+            print(f"   ⏱ {line}")
 
         # Respuesta
-        return jsonify({
+        response = {
             'status': 'success',
             'client_id': client_id,
             'cedula': cedula,
@@ -574,7 +635,11 @@ def update_client_score(request):
             'trigger': trigger,
             'processing_time_ms': processing_time_ms,
             'timestamp': datetime.now().isoformat()
-        }), 200
+        }
+        if recorder.enabled:
+            response['stage_timings'] = recorder.to_dict()
+
+        return jsonify(response), 200
 
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
@@ -0,0 +1,262 @@
+"""
+PLATAM Monthly DPD Rollup
+=========================
+
+Per-client rollup of days past due in monthly buckets, so the windowed DPD
+statistics of the scoring (1 and 6-month deterioration windows, 6-month
+pattern window, 3-month alert window) are read from at most 12 buckets
+instead of filtering every raw payment.
+
+A month is the 30-day month of internal_credit_score
+(months_ago = round(days / 30, 1)), counted back from the rollup's
+reference date:
+
+    bucket 0:  payments up to 31 days old (months_ago <= 1, incl. future dates)
+    bucket k:  payments 30k+2 .. 30k+31 days old (k = 1..11)
+
+so "months_ago <= N" is exactly buckets 0..N-1. Each bucket holds the
+payment count, the DPD count / sum / sum of squares (missing DPD skipped,
+like pandas) and the DPD of its latest payment.
+
+The rollup is built in one vectorized pass (from_arrays, from_payments or
+PaymentStore.dpd_rollup) and maintained incrementally with add_payment.
+Bucket edges depend on the reference date, so a new reference date means a
+rebuild.
+
+Autor: PLATAM Data Team
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Tuple
+
+N_BUCKETS = 12
+MISSING_DAY = np.iinfo(np.int32).min  # NaT marker in day ordinal columns (also PaymentStore)
+_NO_DAY = np.iinfo(np.int64).min
+
+# Per-client arrays and the value of a client without payments
+_COLUMNS = (('payment_count', 0), ('rows', 0), ('count', 0), ('total', 0.0), ('sumsq', 0.0),
+            ('latest_day', _NO_DAY), ('latest_dpd', np.nan))
+
+
+def _day(value) -> int:
+    """Calendar day of a date as days since 1970-01-01"""
+    return pd.Timestamp(value).value // 86_400_000_000_000
+
+
+def day_ordinals(dates) -> np.ndarray:
+    """Dates as int32 days since 1970-01-01 (time of day dropped, NaT -> MISSING_DAY)"""
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]')
+    days = dates.astype('datetime64[D]').view(np.int64)
+    return np.where(np.isnat(dates), MISSING_DAY, days).astype(np.int32)
+
+
+def bucket_index(elapsed_days: np.ndarray) -> np.ndarray:
+    """Bucket of each payment from its age in days (> N_BUCKETS - 1 = outside)"""
+    return np.maximum(0, (np.asarray(elapsed_days, dtype=np.int64) - 2) // 30)
+
+
+class MonthlyDPDRollup:
+    """
+    Monthly DPD buckets of every client, as of one reference date.
+
+    Arrays are (n_clients, N_BUCKETS), row i for client_ids[i]:
+        rows        payments in the bucket (incl. missing DPD)
+        count       payments with a DPD value
+        total       sum of DPD
+        sumsq       sum of squared DPD
+        latest_day  day ordinal of the latest payment
+        latest_dpd  DPD of the latest payment (NaN if missing)
+
+    payment_count holds every payment of the client (incl. older or undated
+    ones), which the scoring uses for its minimum-history checks.
+    """
+
+    def __init__(self, client_ids, reference_date: datetime):
+        self.client_ids = list(client_ids)
+        self._positions = {client_id: i for i, client_id in enumerate(self.client_ids)}
+        self.reference_date = reference_date
+        self.ref_day = _day(reference_date)
+
+        n = len(self.client_ids)
+        self.payment_count = np.zeros(n, dtype=np.int64)
+        self.rows = np.zeros((n, N_BUCKETS), dtype=np.int64)
+        self.count = np.zeros((n, N_BUCKETS), dtype=np.int64)
+        self.total = np.zeros((n, N_BUCKETS), dtype=np.float64)
+        self.sumsq = np.zeros((n, N_BUCKETS), dtype=np.float64)
+        self.latest_day = np.full((n, N_BUCKETS), _NO_DAY, dtype=np.int64)
+        self.latest_dpd = np.full((n, N_BUCKETS), np.nan, dtype=np.float64)
+
+        # add_payment of new clients: the arrays above are views of buffers
+        # that double when full (built on the first new client)
+        self._capacity = n
+        self._buffers = None
+
+    @classmethod
+    def from_arrays(
+        cls,
+        client_ids,
+        codes: np.ndarray,
+        days: np.ndarray,
+        dpd: np.ndarray,
+        reference_date: datetime
+    ) -> 'MonthlyDPDRollup':
+        """
+        Build from columnar payments: codes index client_ids (-1 = dropped),
+        days are day ordinals (MISSING_DAY = no date). On the same day, the
+        row listed first is the bucket's latest payment.
+        """
+        rollup = cls(client_ids, reference_date)
+        n = len(rollup.client_ids)
+        codes = np.asarray(codes, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        dpd = np.asarray(dpd, dtype=np.float64)
+
+        known = codes >= 0
+        rollup.payment_count = np.bincount(codes[known], minlength=n).astype(np.int64)
+
+        elapsed = rollup.ref_day - days
+        inside = np.flatnonzero(known & (days != MISSING_DAY) & (elapsed <= N_BUCKETS * 30 + 1))
+        flat = codes[inside] * N_BUCKETS + bucket_index(elapsed[inside])
+        values = dpd[inside]
+        valid = ~np.isnan(values)
+        size = n * N_BUCKETS
+
+        rollup.rows = np.bincount(flat, minlength=size).reshape(n, N_BUCKETS)
+        rollup.count = np.bincount(flat[valid], minlength=size).reshape(n, N_BUCKETS)
+        rollup.total = np.bincount(
+            flat[valid], weights=values[valid], minlength=size
+        ).reshape(n, N_BUCKETS)
+        rollup.sumsq = np.bincount(
+            flat[valid], weights=values[valid] ** 2, minlength=size
+        ).reshape(n, N_BUCKETS)
+
+        # Latest payment per bucket: day descending, then input order
+        order = np.lexsort((inside, -days[inside], flat))
+        first = order[np.r_[True, flat[order][1:] != flat[order][:-1]]] if len(order) else order
+        rollup.latest_day.reshape(-1)[flat[first]] = days[inside][first]
+        rollup.latest_dpd.reshape(-1)[flat[first]] = values[first]
+        return rollup
+
+    @classmethod
+    def from_payments(cls, payments_df: pd.DataFrame, reference_date: datetime) -> 'MonthlyDPDRollup':
+        """Build from a payments DataFrame (client_id, payment_date, days_past_due)"""
+        codes, client_ids = pd.factorize(payments_df['client_id'])
+        days = day_ordinals(payments_df['payment_date'])
+        dpd = pd.to_numeric(payments_df['days_past_due'], errors='coerce').to_numpy(dtype=np.float64)
+        return cls.from_arrays(client_ids, codes, days, dpd, reference_date)
+
+    def __len__(self) -> int:
+        return len(self.client_ids)
+
+    def __contains__(self, client_id) -> bool:
+        return client_id in self._positions
+
+    def check_reference(self, reference_date: datetime):
+        """Raise ValueError if reference_date is not the rollup's reference day"""
+        if _day(reference_date) != self.ref_day:
+            raise ValueError(
+                f"rollup built for {pd.Timestamp(self.reference_date).date()}, "
+                f"got reference_date {pd.Timestamp(reference_date).date()} (rebuild the rollup)"
+            )
+
+    def client_payment_count(self, client_id) -> int:
+        """All payments of one client (incl. older or undated ones)"""
+        i = self._positions.get(client_id)
+        return 0 if i is None else int(self.payment_count[i])
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance
+    # ------------------------------------------------------------------
+
+    def _position(self, client_id) -> int:
+        i = self._positions.get(client_id)
+        if i is not None:
+            return i
+
+        i = len(self.client_ids)
+        if self._buffers is None or i == self._capacity:
+            # Amortized doubling: n new clients cost O(n) copies, not O(n^2)
+            self._capacity = max(16, 2 * i)
+            buffers = {}
+            for name, fill in _COLUMNS:
+                array = getattr(self, name)
+                buffers[name] = np.full((self._capacity,) + array.shape[1:], fill, dtype=array.dtype)
+                buffers[name][:i] = array
+            self._buffers = buffers
+
+        self.client_ids.append(client_id)
+        self._positions[client_id] = i
+        for name, _ in _COLUMNS:
+            setattr(self, name, self._buffers[name][:i + 1])
+        return i
+
+    def add_payment(self, client_id, payment_date, days_past_due):
+        """Add one payment to its bucket (a new payment on the same day becomes the latest)"""
+        i = self._position(client_id)
+        self.payment_count[i] += 1
+        if payment_date is None or pd.isna(payment_date):
+            return
+
+        day = _day(payment_date)
+        elapsed = self.ref_day - day
+        if elapsed > N_BUCKETS * 30 + 1:
+            return
+
+        b = int(bucket_index(elapsed))
+        dpd = np.nan if days_past_due is None or pd.isna(days_past_due) else float(days_past_due)
+        self.rows[i, b] += 1
+        if not np.isnan(dpd):
+            self.count[i, b] += 1
+            self.total[i, b] += dpd
+            self.sumsq[i, b] += dpd * dpd
+        if day >= self.latest_day[i, b]:
+            self.latest_day[i, b] = day
+            self.latest_dpd[i, b] = dpd
+
+    # ------------------------------------------------------------------
+    # Windowed statistics
+    # ------------------------------------------------------------------
+
+    def window(self, months: int) -> Dict[str, np.ndarray]:
+        """
+        DPD statistics of every client over months_ago <= months (1..12):
+        rows, count, mean, std (ddof=1, NaN below 2 values) and latest_dpd
+        """
+        if not 1 <= months <= N_BUCKETS:
+            raise ValueError(f"months must be between 1 and {N_BUCKETS}, got {months}")
+
+        rows = self.rows[:, :months].sum(axis=1)
+        count = self.count[:, :months].sum(axis=1)
+        total = self.total[:, :months].sum(axis=1)
+        sumsq = self.sumsq[:, :months].sum(axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+            var = np.where(count > 1, (sumsq - total * mean) / (count - 1), np.nan)
+        std = np.sqrt(np.maximum(var, 0), where=~np.isnan(var), out=np.full(len(var), np.nan))
+
+        # Latest payment of the window = latest of the most recent non-empty bucket
+        latest_bucket = np.argmax(self.rows[:, :months] > 0, axis=1)
+        latest_dpd = self.latest_dpd[np.arange(len(self)), latest_bucket]
+        latest_dpd = np.where(rows > 0, latest_dpd, np.nan)
+
+        return {'rows': rows, 'count': count, 'mean': mean, 'std': std, 'latest_dpd': latest_dpd}
+
+    def client_window(self, client_id, months: int) -> Tuple[int, float, float, float]:
+        """(rows, mean, std, latest_dpd) of one client over months_ago <= months"""
+        i = self._positions.get(client_id)
+        if i is None:
+            return 0, np.nan, np.nan, np.nan
+
+        rows = int(self.rows[i, :months].sum())
+        count = int(self.count[i, :months].sum())
+        total = float(self.total[i, :months].sum())
+        sumsq = float(self.sumsq[i, :months].sum())
+
+        mean = total / count if count > 0 else np.nan
+        std = np.sqrt(max((sumsq - total * mean) / (count - 1), 0)) if count > 1 else np.nan
+        latest = np.flatnonzero(self.rows[i, :months])
+        latest_dpd = float(self.latest_dpd[i, latest[0]]) if len(latest) else np.nan
+        return rows, mean, std, latest_dpd
@@ -23,6 +23,19 @@ from google.cloud import storage
 from google.cloud import aiplatform
 from google.cloud import bigquery
 
+try:
+    from score_bands import RISK_LEVEL, ATTENTION_LEVEL, HYBRID_CATEGORY
+    from cedula_index import CedulaIndex, cedulas_as_text
+    from stage_timing import timed_stage, enable_from_env, get_recorder
+    from prediction_client import AsyncPredictionClient, PredictionBatcher
+except ImportError:
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from score_bands import RISK_LEVEL, ATTENTION_LEVEL, HYBRID_CATEGORY
+    from cedula_index import CedulaIndex, cedulas_as_text
+    from stage_timing import timed_stage, enable_from_env, get_recorder
+    from prediction_client import AsyncPredictionClient, PredictionBatcher
+
 # ==============================================================
 # CONFIGURACIÓN
 # ==============================================================
@@ -44,9 +57,19 @@ ENDPOINT_ID = "3426032820691755008"
 
 # Estado global
 df_clientes = None
+cedula_index = None
 last_update = None
 endpoint = None
 
+# Llamadas a Vertex en un pool acotado: no bloquean el event loop
+# (connect_vertex_ai le asigna el endpoint). Los requests que llegan juntos
+# (ventana de pocos ms) van en un solo predict
+vertex_client = AsyncPredictionClient(None)
+ml_batcher = PredictionBatcher(vertex_client)
+
+# Tiempos por etapa (opt-in con PLATAM_STAGE_TIMING=1, ver GET /metrics/stages)
+enable_from_env()
+
 # ==============================================================
 # CARGA INICIAL
 # ==============================================================
@@ -57,7 +80,7 @@ print("="*80)
 
 def load_csv_from_cloud_storage():
     """Carga CSV desde Cloud Storage"""
-    global df_clientes, last_update
+    global df_clientes, cedula_index, last_update
 
     try:
         print(f"\n📂 Cargando desde: gs://{BUCKET_NAME}/{CSV_FILENAME}")
@@ -76,7 +99,10 @@ def load_csv_from_cloud_storage():
 
         # Limpiar
         df_clientes.columns = df_clientes.columns.str.strip()
-        df_clientes['cedula'] = df_clientes['cedula'].astype(str)
+        df_clientes['cedula'] = cedulas_as_text(df_clientes['cedula'])
+
+        # Índice cédula normalizada -> fila (búsqueda O(1) por request)
+        cedula_index = CedulaIndex(df_clientes)
 
         # Metadata del blob
         blob.reload()
@@ -109,6 +135,7 @@ def connect_vertex_ai():
         endpoint = aiplatform.Endpoint(
             endpoint_name=f"projects/741488896424/locations/{REGION}/endpoints/{ENDPOINT_ID}"
         )
+        vertex_client.endpoint = endpoint
         print(f"✅ Conectado al endpoint: {ENDPOINT_ID}")
         return True
     except Exception as e:
@@ -173,21 +200,16 @@ class CompleteResponse(BaseModel):
 # FUNCIONES AUXILIARES
 # ==============================================================
 
+@timed_stage('api.client_cache_lookup')
 def get_client_from_cache(cedula: str) -> dict:
     """Busca cliente en caché (CSV)"""
-    global df_clientes
-
-    if df_clientes is None:
-        return None
-
-    client = df_clientes[df_clientes['cedula'] == cedula]
-
-    if len(client) == 0:
+    if cedula_index is None:
         return None
 
-    return client.iloc[0].to_dict()
+    return cedula_index.get(cedula)
 
 
+@timed_stage('api.client_database_lookup')
 def get_client_from_database(cedula: str) -> dict:
     """
     Fallback: Busca cliente en base de datos si no está en caché
@@ -253,7 +275,8 @@ def get_client_by_cedula(cedula: str) -> tuple:
     )
 
 
-def get_ml_prediction(client_data: dict) -> tuple:
+@timed_stage('api.ml_prediction')
+async def get_ml_prediction(client_data: dict) -> tuple:
     """Obtiene predicción del modelo ML en Vertex AI"""
 
     feature_order = [
@@ -275,54 +298,30 @@ def get_ml_prediction(client_data: dict) -> tuple:
             value = int(value)
         instance.append(float(value))
 
-    prediction = endpoint.predict(instances=[instance])
+    probabilities = await ml_batcher.predict_one(instance)
 
-    prob_no_default = prediction.predictions[0][0]
-    prob_default = prediction.predictions[0][1]
+    prob_no_default = probabilities[0]
+    prob_default = probabilities[1]
 
     return prob_default, prob_no_default
 
 
 def calculate_risk_level(prob_default: float) -> str:
     """Categoriza el nivel de riesgo"""
-    if prob_default < 0.10:
-        return "Muy Bajo"
-    elif prob_default < 0.20:
-        return "Bajo"
-    elif prob_default < 0.40:
-        return "Medio"
-    elif prob_default < 0.60:
-        return "Alto"
-    else:
-        return "Muy Alto"
+    return RISK_LEVEL(prob_default)
 
 
 def get_attention_level(prob_default: float) -> str:
     """Determina el nivel de atención según probabilidad de default"""
-    if prob_default >= 0.60:
-        return "Alerta crítica"
-    elif prob_default >= 0.40:
-        return "Seguimiento cercano"
-    elif prob_default >= 0.20:
-        return "Atención moderada"
-    else:
-        return "Monitoreo normal"
+    return ATTENTION_LEVEL(prob_default)
 
 
 def categorize_hybrid_score(score: float) -> str:
     """Categoriza el score híbrido"""
-    if score >= 750:
-        return "Excelente"
-    elif score >= 650:
-        return "Bueno"
-    elif score >= 550:
-        return "Medio"
-    elif score >= 450:
-        return "Regular"
-    else:
-        return "Bajo"
+    return HYBRID_CATEGORY(score)
 
 
+@timed_stage('api.recommendation')
 def generate_recommendation(client_data: dict, ml_data: dict) -> dict:
     """Genera recomendación de seguimiento y cobranza"""
     # (Misma lógica que en api_scoring_cedula.py)
@@ -402,7 +401,7 @@ async def predict_by_cedula(request: ClientRequest):
         }
 
         # 3. Obtener predicción ML
-        prob_default, prob_no_default = get_ml_prediction(client_data)
+        prob_default, prob_no_default = await get_ml_prediction(client_data)
 
         ml_data = {
             'probability_default': prob_default,
@@ -491,6 +490,18 @@ def health_check():
     }
 
 
+@app.get("/metrics/stages")
+def stage_metrics():
+    """Tiempos por etapa desde el arranque (requiere PLATAM_STAGE_TIMING=1)"""
+    recorder = get_recorder()
+    if recorder is None:
+        raise HTTPException(status_code=404, detail="Medición de etapas desactivada (PLATAM_STAGE_TIMING=1)")
+    return {
+        "started_at": recorder.started_at.isoformat(timespec='seconds'),
+        "stages": recorder.to_dict()
+    }
+
+
 @app.get("/stats")
 def get_stats():
     """Estadísticas de los datos cargados"""
@@ -16,30 +16,23 @@ from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from score_bands import ATTENTION_LEVEL
+from prediction_snapshot import MODEL_VERSION, prepare_instance, feature_fingerprint
+
 # ============================================
 # CONFIGURACIÓN
 # ============================================
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "key.json"
 PROJECT_ID = "platam-analytics"
 REGION = "us-central1"
-ENDPOINT_ID = "7891061911641391104"  # Modelo v2.2
-MODEL_VERSION = "v2.2"
+ENDPOINT_ID = "7891061911641391104"  # Modelo v2.2 (MODEL_VERSION)
 
 # Paths
 CSV_SOURCE = "SCORES_V2_ANALISIS_COMPLETO.csv"  # Solo para leer features
 CSV_OUTPUT = "PREDICCIONES_ML_V2.2.csv"  # Output separado
 
-# Features del modelo v2.2 (22 features)
-FEATURE_ORDER = [
-    'platam_score', 'experian_score_normalized',
-    'score_payment_performance', 'score_payment_plan', 'score_deterioration',
-    'payment_count', 'months_as_client',
-    'pct_early', 'pct_late',
-    'peso_platam_usado', 'peso_hcpn_usado',
-    'tiene_plan_activo', 'tiene_plan_default', 'tiene_plan_pendiente', 'num_planes',
-    'genero_encoded', 'edad', 'ciudad_encoded',
-    'cuota_mensual', 'creditos_vigentes', 'creditos_mora', 'hist_neg_12m'
-]
+# Features del modelo v2.2 (22 features): FEATURE_ORDER / prepare_instance
+# de prediction_snapshot, los mismos que usa la API
 
 print("="*80)
 print("🤖 GENERANDO PREDICCIONES ML PARA BIGQUERY/METABASE")
@@ -70,23 +63,6 @@ print(f"✅ Conectado al endpoint v2.2")
 # 3. FUNCIONES AUXILIARES
 # ============================================
 
-def prepare_instance(row):
-    """Prepara instancia para predicción"""
-    instance = []
-    for feature in FEATURE_ORDER:
-        value = row.get(feature, 0)
-        if pd.isna(value) or value is None:
-            if feature == 'edad':
-                value = 35
-            elif feature in ['genero_encoded', 'ciudad_encoded']:
-                value = 0
-            else:
-                value = 0
-        if isinstance(value, bool):
-            value = int(value)
-        instance.append(float(value))
-    return instance
-
 def classify_risk_level(prob_default):
     """Clasifica nivel de riesgo"""
     if prob_default < 0.10:
@@ -102,14 +78,7 @@ def classify_risk_level(prob_default):
 
 def get_attention_level(prob_default):
     """Determina nivel de atención requerido"""
-    if prob_default >= 0.60:
-        return "Alerta crítica"
-    elif prob_default >= 0.40:
-        return "Seguimiento cercano"
-    elif prob_default >= 0.20:
-        return "Atención moderada"
-    else:
-        return "Monitoreo normal"
+    return ATTENTION_LEVEL(prob_default)
 
 def calculate_risk_score(prob_default):
     """Convierte probabilidad a score 0-1000 (para gráficas)"""
@@ -148,18 +117,21 @@ for idx, row in df_source.iterrows():
         risk_score = calculate_risk_score(prob_default)
         follow_up = requires_follow_up(prob_default)
 
-        # Agregar a resultados
+        # Agregar a resultados (con la huella de las features: la API
+        # reutiliza la predicción mientras las features no cambien, así que
+        # las probabilidades van sin redondear, iguales a las de Vertex)
         predictions_data.append({
             'cedula': str(row['cedula']),
-            'prob_default': round(prob_default, 4),
-            'prob_no_default': round(prob_no_default, 4),
+            'prob_default': prob_default,
+            'prob_no_default': prob_no_default,
             'prob_default_pct': round(prob_default * 100, 2),  # Para gráficas
             'risk_level': risk_level,
             'risk_score': risk_score,  # 0-1000 para gráficas
             'attention_level': attention_level,
             'requires_follow_up': follow_up,
             'prediction_date': datetime.now().isoformat(),
-            'model_version': MODEL_VERSION
+            'model_version': MODEL_VERSION,
+            'feature_fingerprint': feature_fingerprint(instance)
         })
 
     except Exception as e:
@@ -175,7 +147,8 @@ for idx, row in df_source.iterrows():
             'attention_level': 'Error',
             'requires_follow_up': None,
             'prediction_date': datetime.now().isoformat(),
-            'model_version': MODEL_VERSION
+            'model_version': MODEL_VERSION,
+            'feature_fingerprint': None
         })
 
 print(f"✅ Predicciones generadas para {len(predictions_data)} clientes")
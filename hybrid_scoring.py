@@ -22,6 +22,11 @@ import numpy as np
 from typing import Dict, Tuple, Optional
 import logging
 
+import scoring_core
+from scoring_core import maturity_category, platam_weight
+from score_bands import HYBRID_RATING
+from stage_timing import timed_stage
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -38,28 +43,26 @@ class HybridScoringConfig:
     de default.
     """
 
+    # Los valores por defecto viven en scoring_core (compartidos con las
+    # cloud functions)
+
     # Umbrales de madurez del cliente (en meses)
-    MADUREZ_NUEVO = 3          # < 3 meses = muy nuevo
-    MADUREZ_INTERMEDIO = 6     # 3-6 meses = intermedio
-    MADUREZ_ESTABLECIDO = 12   # 6-12 meses = establecido
+    MADUREZ_NUEVO = scoring_core.MATURITY_MONTHS[0]        # < 3 meses = muy nuevo
+    MADUREZ_INTERMEDIO = scoring_core.MATURITY_MONTHS[1]   # 3-6 meses = intermedio
+    MADUREZ_ESTABLECIDO = scoring_core.MATURITY_MONTHS[2]  # 6-12 meses = establecido
     # > 12 meses = maduro
 
     # Umbrales de historial de pagos
-    MIN_PAGOS_CONFIABLES = 5   # Mínimo de pagos para confiar en PLATAM
-    MIN_PAGOS_MADUROS = 10     # Pagos para considerar cliente maduro
-
-    # Pesos PLATAM según madurez (cuando tiene HCPN)
-    PESOS_PLATAM = {
-        'muy_nuevo': 0.30,      # < 3 meses: confía más en HCPN
-        'nuevo': 0.40,          # 3-6 meses: HCPN sigue siendo importante
-        'intermedio': 0.50,     # 6-12 meses: equilibrado
-        'establecido': 0.60,    # 12-24 meses: confía más en PLATAM
-        'maduro': 0.70          # 24+ meses: confía mucho en PLATAM
-    }
+    MIN_PAGOS_CONFIABLES = scoring_core.MIN_RELIABLE_PAYMENTS  # Mínimo de pagos para confiar en PLATAM
+    MIN_PAGOS_MADUROS = scoring_core.MATURE_PAYMENTS           # Pagos para considerar cliente maduro
+
+    # Pesos PLATAM según madurez (cuando tiene HCPN):
+    # muy_nuevo 30%, nuevo 40%, intermedio 50%, establecido 60%, maduro 70%
+    PESOS_PLATAM = dict(scoring_core.PLATAM_WEIGHTS)
 
     # Ajustes por cantidad de historial de pagos
-    BONUS_HISTORIAL_AMPLIO = 0.10    # +10% peso PLATAM si >20 pagos
-    PENALIZACION_HISTORIAL_POCO = -0.10  # -10% peso PLATAM si <5 pagos
+    BONUS_HISTORIAL_AMPLIO = scoring_core.HISTORY_BONUS           # +10% peso PLATAM si >20 pagos
+    PENALIZACION_HISTORIAL_POCO = scoring_core.HISTORY_PENALTY    # -10% peso PLATAM si <5 pagos
 
     # Score por defecto para clientes sin datos
     DEFAULT_SCORE_SIN_DATOS = 500    # Score conservador
@@ -94,34 +97,15 @@ def determinar_categoria_madurez(months_as_client: int, payment_count: int) -> s
     """
     config = HybridScoringConfig()
 
-    # Categorización por tiempo
-    if months_as_client < config.MADUREZ_NUEVO:
-        categoria_tiempo = 'muy_nuevo'
-    elif months_as_client < config.MADUREZ_INTERMEDIO:
-        categoria_tiempo = 'nuevo'
-    elif months_as_client < config.MADUREZ_ESTABLECIDO:
-        categoria_tiempo = 'intermedio'
-    elif months_as_client < 24:
-        categoria_tiempo = 'establecido'
-    else:
-        categoria_tiempo = 'maduro'
-
-    # Ajuste por cantidad de pagos
-    # Si tiene muchos pagos pero poco tiempo, sube una categoría
-    if payment_count >= config.MIN_PAGOS_MADUROS * 2 and categoria_tiempo in ['muy_nuevo', 'nuevo']:
-        logger.debug(f"  Ajuste: Cliente con muchos pagos ({payment_count}) → sube categoría")
-        categorias = ['muy_nuevo', 'nuevo', 'intermedio', 'establecido', 'maduro']
-        idx = categorias.index(categoria_tiempo)
-        categoria_tiempo = categorias[min(idx + 1, len(categorias) - 1)]
-
-    # Si tiene pocos pagos pero mucho tiempo, baja una categoría
-    if payment_count < config.MIN_PAGOS_CONFIABLES and categoria_tiempo in ['establecido', 'maduro']:
-        logger.debug(f"  Ajuste: Cliente con pocos pagos ({payment_count}) → baja categoría")
-        categorias = ['muy_nuevo', 'nuevo', 'intermedio', 'establecido', 'maduro']
-        idx = categorias.index(categoria_tiempo)
-        categoria_tiempo = categorias[max(idx - 1, 0)]
-
-    return categoria_tiempo
+    # Categorización por tiempo; si tiene muchos pagos pero poco tiempo sube
+    # una categoría, si tiene pocos pagos pero mucho tiempo baja una
+    return maturity_category(
+        months_as_client,
+        payment_count,
+        months_thresholds=(config.MADUREZ_NUEVO, config.MADUREZ_INTERMEDIO, config.MADUREZ_ESTABLECIDO, 24),
+        mature_payments=config.MIN_PAGOS_MADUROS,
+        min_reliable_payments=config.MIN_PAGOS_CONFIABLES
+    )
 
 
 def calcular_peso_platam(
@@ -162,23 +146,25 @@ def calcular_peso_platam(
 
     # Caso 2: Con HCPN → Peso dinámico
     categoria = determinar_categoria_madurez(months_as_client, payment_count)
-    peso_base = config.PESOS_PLATAM[categoria]
 
     # Ajustes por historial de pagos
-    ajuste = 0.0
     razones_ajuste = []
 
     if payment_count >= 20:
-        ajuste += config.BONUS_HISTORIAL_AMPLIO
         razones_ajuste.append(f"historial amplio ({payment_count} pagos, +{config.BONUS_HISTORIAL_AMPLIO*100:.0f}%)")
 
     if payment_count < config.MIN_PAGOS_CONFIABLES:
-        ajuste += config.PENALIZACION_HISTORIAL_POCO
         razones_ajuste.append(f"poco historial ({payment_count} pagos, {config.PENALIZACION_HISTORIAL_POCO*100:.0f}%)")
 
-    # Aplicar ajustes con límites
-    peso_final = peso_base + ajuste
-    peso_final = max(0.20, min(0.80, peso_final))  # Límites: 20% - 80%
+    # Aplicar ajustes con límites: 20% - 80%
+    peso_final = platam_weight(
+        categoria,
+        payment_count,
+        weights=config.PESOS_PLATAM,
+        bonus=config.BONUS_HISTORIAL_AMPLIO,
+        penalty=config.PENALIZACION_HISTORIAL_POCO,
+        min_reliable_payments=config.MIN_PAGOS_CONFIABLES
+    )
 
     # Construir justificación
     justificacion = f"Cliente {categoria}"
@@ -193,6 +179,7 @@ def calcular_peso_platam(
 # FUNCIÓN PRINCIPAL: CALCULATE HYBRID SCORE
 # ============================================================================
 
+@timed_stage('hybrid_score', rows=lambda *args, **kwargs: 1)
 def calculate_hybrid_score(
     platam_score: float,
     hcpn_score: Optional[float],
@@ -221,6 +208,7 @@ def calculate_hybrid_score(
         - peso_platam: Peso usado para PLATAM (0-1)
         - peso_hcpn: Peso usado para HCPN (0-1)
         - estrategia: Descripción de la estrategia usada
+        - estrategia_codigo: Código de la estrategia (ver render_estrategia)
         - categoria_madurez: Categoría del cliente
 
     Examples:
@@ -285,6 +273,9 @@ def calculate_hybrid_score(
         hybrid_score = (platam_score * peso_platam) + (hcpn_score * peso_hcpn)
 
         estrategia = f"Híbrido: {justificacion}"
+        ajuste = (AJUSTE_AMPLIO if payment_count >= 20 else
+                  AJUSTE_POCO if payment_count < config.MIN_PAGOS_CONFIABLES else AJUSTE_NINGUNO)
+        codigo = codigo_estrategia(1, CATEGORIAS_MADUREZ.index(categoria), ajuste)
 
         if verbose:
             logger.info(f"\n  ✅ CASO 1: Cliente con ambos scores")
@@ -301,6 +292,7 @@ def calculate_hybrid_score(
         peso_hcpn = 0.0
         hybrid_score = platam_score
         estrategia = "Sin HCPN: usa 100% PLATAM V2.0 basado en comportamiento interno"
+        codigo = codigo_estrategia(2)
 
         if verbose:
             logger.info(f"\n  ✅ CASO 2: Cliente sin HCPN")
@@ -319,6 +311,7 @@ def calculate_hybrid_score(
         hybrid_score = (platam_default * peso_platam) + (hcpn_score * peso_hcpn)
 
         estrategia = f"Cliente nuevo con HCPN: usa 80% HCPN + 20% score base ({platam_default})"
+        codigo = codigo_estrategia(3)
 
         if verbose:
             logger.info(f"\n  ⚠️ CASO 3: Cliente nuevo con HCPN pero sin historial")
@@ -334,6 +327,7 @@ def calculate_hybrid_score(
         peso_hcpn = 0.0
         hybrid_score = config.DEFAULT_SCORE_SIN_DATOS
         estrategia = f"Thin file: usa score conservador por defecto ({config.DEFAULT_SCORE_SIN_DATOS})"
+        codigo = codigo_estrategia(4)
 
         if verbose:
             logger.info(f"\n  ⚠️ CASO 4: Thin file (sin datos suficientes)")
@@ -348,6 +342,7 @@ def calculate_hybrid_score(
         'peso_platam': peso_platam,
         'peso_hcpn': peso_hcpn,
         'estrategia': estrategia,
+        'estrategia_codigo': int(codigo),
         'categoria_madurez': categoria,
         'platam_score': platam_score,
         'hcpn_score': hcpn_score if tiene_hcpn else None
@@ -365,46 +360,177 @@ def get_hybrid_rating(hybrid_score: float) -> str:
     Usa la misma escala que PLATAM V2.0 para consistencia.
 
     Args:
-        hybrid_score: Score híbrido (0-1000)
+        hybrid_score: Score híbrido (0-1000), o una columna completa
 
     Returns:
         str: Rating ('A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D', 'F')
+        (Series / array de ratings si recibe una columna)
     """
-    if hybrid_score >= 900:
-        return 'A+'
-    elif hybrid_score >= 850:
-        return 'A'
-    elif hybrid_score >= 800:
-        return 'A-'
-    elif hybrid_score >= 750:
-        return 'B+'
-    elif hybrid_score >= 700:
-        return 'B'
-    elif hybrid_score >= 650:
-        return 'B-'
-    elif hybrid_score >= 600:
-        return 'C+'
-    elif hybrid_score >= 550:
-        return 'C'
-    elif hybrid_score >= 500:
-        return 'C-'
-    elif hybrid_score >= 450:
-        return 'D'
-    else:
-        return 'F'
+    return HYBRID_RATING(hybrid_score)
 
 
 # ============================================================================
 # FUNCIÓN BATCH PARA DATAFRAMES
 # ============================================================================
 
+CATEGORIAS_MADUREZ = list(scoring_core.MATURITY_CATEGORIES)
+
+
+# np.round(x, 1) redondea x * 10 (con su error de redondeo) y round(x, 1) de
+# Python redondea el decimal exacto de x: solo difieren si x * 10 queda a unos
+# ulp de un .5 (~1e-12 para scores <= 1000). Las filas más cerca que esto de
+# un .5 se redondean una a una con round(); las demás dan igual con np.round
+_HALF_TOLERANCE = 1e-6
+
+
+def _compat_iterrows(df: pd.DataFrame, hybrid: np.ndarray, entero: np.ndarray,
+                     solo_platam: np.ndarray, platam_col: str, payment_count_col: str):
+    """
+    Compatibilidad con la salida del bucle df.iterrows() que reemplazó
+    calculate_hybrid_scores_batch, para que hybrid_score y
+    estrategia_hibrido de hybrid_scores.csv no cambien de formato.
+
+    Contrato (fijado por test_compat_iterrows en test_scoring_core.py):
+
+    - Si todas las columnas son numéricas, iterrows convierte cada fila al
+      dtype común (float64): hybrid_score == np.round(score, 1), los pagos
+      llegan como float ("20.0 pagos" en el texto de estrategia) y un
+      PLATAM entero deja de serlo
+    - Si alguna columna es object, los valores llegan como escalares de
+      Python: hybrid_score == round(float(score), 1) fila por fila
+      (difiere de np.round en algunos .x5, p.ej. 500.05 -> 500.1)
+    - round() de un int sigue siendo int: si todos los scores son enteros
+      la columna queda int64
+
+    Args:
+        hybrid: scores sin redondear, ya recortados a 0 - 1000
+        entero: filas con score int en el bucle (thin file y recortados)
+        solo_platam: filas sin HCPN, con score int si el PLATAM lo es
+
+    Returns:
+        (hybrid_score, payment_count) como los producía el bucle
+    """
+    row_dtype = df.iloc[:0].to_numpy().dtype
+    payment_count = df[payment_count_col]
+    platam = df[platam_col]
+    rounded = np.round(hybrid, 1)
+    if row_dtype != object:
+        payment_count = payment_count.astype(row_dtype)
+        platam = platam.astype(row_dtype)
+    else:
+        with np.errstate(invalid='ignore'):
+            scaled = hybrid * 10
+            near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < _HALF_TOLERANCE
+        for i in np.flatnonzero(near_half):
+            rounded[i] = round(float(hybrid[i]), 1)
+
+    if pd.api.types.is_integer_dtype(platam.dtype):
+        entero = entero | solo_platam
+    if len(rounded) and entero.all():
+        rounded = rounded.astype(np.int64)
+    return rounded, payment_count
+
+
+# Código de estrategia por fila (int16) en lugar del texto: caso 1 (ambos
+# scores) → 100 + categoría*10 + ajuste (0 ninguno, 1 historial amplio,
+# 2 poco historial); casos 2, 3 y 4 → 200, 300 y 400. El texto se arma
+# solo cuando se pide, con render_estrategia / render_estrategias
+AJUSTE_NINGUNO, AJUSTE_AMPLIO, AJUSTE_POCO = 0, 1, 2
+
+
+def codigo_estrategia(caso, categoria=0, ajuste=AJUSTE_NINGUNO):
+    """Código de estrategia (escalar o arrays de caso, categoría y ajuste)"""
+    return np.where(np.equal(caso, 1), 100 + np.multiply(categoria, 10) + ajuste,
+                    np.multiply(caso, 100)).astype(np.int16)
+
+
+def plantillas_estrategia(config: Optional[HybridScoringConfig] = None) -> Dict[int, str]:
+    """
+    Texto de estrategia de calculate_hybrid_score por código; los ajustes
+    por historial llevan {pagos} para la cantidad de pagos del cliente
+    """
+    config = config or HybridScoringConfig()
+    plantillas = {}
+    for categoria, nombre in enumerate(CATEGORIAS_MADUREZ):
+        for ajuste in (AJUSTE_NINGUNO, AJUSTE_AMPLIO, AJUSTE_POCO):
+            # Mismas operaciones que calcular_peso_platam
+            peso = config.PESOS_PLATAM[nombre]
+            justificacion = f"Cliente {nombre}"
+            if ajuste == AJUSTE_AMPLIO:
+                peso += config.BONUS_HISTORIAL_AMPLIO
+                justificacion += f" con historial amplio ({{pagos}} pagos, +{config.BONUS_HISTORIAL_AMPLIO*100:.0f}%)"
+            elif ajuste == AJUSTE_POCO:
+                peso += config.PENALIZACION_HISTORIAL_POCO
+                justificacion += f" con poco historial ({{pagos}} pagos, {config.PENALIZACION_HISTORIAL_POCO*100:.0f}%)"
+            peso = max(0.20, min(0.80, peso))
+            justificacion += f": peso PLATAM {peso*100:.0f}%, HCPN {(1-peso)*100:.0f}%"
+            plantillas[int(codigo_estrategia(1, categoria, ajuste))] = f"Híbrido: {justificacion}"
+
+    plantillas[200] = "Sin HCPN: usa 100% PLATAM V2.0 basado en comportamiento interno"
+    plantillas[300] = f"Cliente nuevo con HCPN: usa 80% HCPN + 20% score base ({config.DEFAULT_SCORE_APLICACION})"
+    plantillas[400] = f"Thin file: usa score conservador por defecto ({config.DEFAULT_SCORE_SIN_DATOS})"
+    return plantillas
+
+
+ESTRATEGIAS = plantillas_estrategia()
+
+
+def render_estrategia(codigo: int, payment_count=None,
+                      config: Optional[HybridScoringConfig] = None) -> str:
+    """Texto de estrategia de un código (payment_count para los ajustes por historial)"""
+    plantillas = ESTRATEGIAS if config is None else plantillas_estrategia(config)
+    return plantillas[int(codigo)].format(pagos=payment_count)
+
+
+def render_estrategias(codigos, payment_count,
+                       config: Optional[HybridScoringConfig] = None) -> np.ndarray:
+    """
+    Texto de estrategia para una columna de códigos; se arma una vez por
+    combinación distinta de código y pagos (los pagos solo cuentan en los
+    códigos con ajuste por historial)
+    """
+    plantillas = ESTRATEGIAS if config is None else plantillas_estrategia(config)
+    codigos = np.asarray(codigos, dtype=np.int64)
+
+    pagos_codes, pagos = pd.factorize(payment_count, use_na_sentinel=False)
+    con_pagos = (codigos < 200) & (codigos % 10 != AJUSTE_NINGUNO)
+    pagos_codes = np.where(con_pagos, pagos_codes, -1)
+
+    key = codigos * (len(pagos) + 1) + pagos_codes + 1
+    groups, unique = pd.factorize(key)
+    unique = np.asarray(unique)
+
+    textos = [
+        plantillas[codigo].format(pagos=pagos[pagos_] if pagos_ >= 0 else None)
+        for codigo, pagos_ in zip(unique // (len(pagos) + 1), unique % (len(pagos) + 1) - 1)
+    ]
+    return np.array(textos, dtype=object)[groups] if len(textos) else np.empty(0, dtype=object)
+
+
+def agregar_estrategia_texto(
+    df: pd.DataFrame,
+    payment_count_col: str = 'payment_count',
+    codigo_col: str = 'estrategia_codigo',
+    texto_col: str = 'estrategia_hibrido'
+) -> pd.DataFrame:
+    """
+    Agrega la columna de texto de estrategia a partir de los códigos (p.ej.
+    al leer hybrid_scores.csv); no hace nada si el texto ya está
+    """
+    if texto_col not in df.columns and codigo_col in df.columns:
+        df[texto_col] = render_estrategias(df[codigo_col], df[payment_count_col])
+    return df
+
+
+@timed_stage('hybrid_scores_batch', rows=lambda df, *args, **kwargs: len(df))
 def calculate_hybrid_scores_batch(
     df: pd.DataFrame,
     platam_col: str = 'platam_score',
     hcpn_col: str = 'experian_score_normalized',
     months_col: str = 'months_as_client',
     payment_count_col: str = 'payment_id_count',
-    client_id_col: str = 'cedula'
+    client_id_col: str = 'cedula',
+    estrategia_texto: bool = True
 ) -> pd.DataFrame:
     """
     Calcula scores híbridos para un DataFrame completo.
@@ -416,6 +542,8 @@ def calculate_hybrid_scores_batch(
         months_col: Nombre de columna con meses como cliente
         payment_count_col: Nombre de columna con cantidad de pagos
         client_id_col: Nombre de columna con ID de cliente
+        estrategia_texto: Si False, solo agrega estrategia_codigo (el texto
+            se puede armar después con agregar_estrategia_texto)
 
     Returns:
         DataFrame original con columnas adicionales:
@@ -423,7 +551,8 @@ def calculate_hybrid_scores_batch(
         - hybrid_rating
         - peso_platam_usado
         - peso_hcpn_usado
-        - estrategia_hibrido
+        - estrategia_codigo
+        - estrategia_hibrido (si estrategia_texto)
         - categoria_madurez
     """
     logger.info(f"\n{'='*70}")
@@ -431,28 +560,67 @@ def calculate_hybrid_scores_batch(
     logger.info(f"{'='*70}")
     logger.info(f"Total clientes: {len(df):,}")
 
-    results = []
+    config = HybridScoringConfig()
 
-    for idx, row in df.iterrows():
-        result = calculate_hybrid_score(
-            platam_score=row[platam_col],
-            hcpn_score=row[hcpn_col] if pd.notna(row[hcpn_col]) else None,
-            months_as_client=row[months_col],
-            payment_count=row[payment_count_col],
-            client_id=row[client_id_col],
-            verbose=False
+    platam = pd.to_numeric(df[platam_col], errors='coerce').to_numpy(dtype=float)
+    hcpn = pd.to_numeric(df[hcpn_col], errors='coerce').to_numpy(dtype=float)
+    months = pd.to_numeric(df[months_col], errors='coerce').to_numpy(dtype=float)
+    count = pd.to_numeric(df[payment_count_col], errors='coerce').to_numpy(dtype=float)
+
+    # Categoría de madurez (determinar_categoria_madurez): por tiempo, luego
+    # sube una si tiene muchos pagos o baja una si tiene pocos
+    categoria = np.select(
+        [months < config.MADUREZ_NUEVO, months < config.MADUREZ_INTERMEDIO,
+         months < config.MADUREZ_ESTABLECIDO, months < 24],
+        [0, 1, 2, 3], 4
+    )
+    categoria = np.where((count >= config.MIN_PAGOS_MADUROS * 2) & (categoria <= 1), categoria + 1, categoria)
+    categoria = np.where((count < config.MIN_PAGOS_CONFIABLES) & (categoria >= 3), categoria - 1, categoria)
+
+    tiene_hcpn = ~np.isnan(hcpn)
+    tiene_platam = ~np.isnan(platam) & (platam > 0)
+    caso = np.select(
+        [tiene_hcpn & tiene_platam, tiene_platam, tiene_hcpn], [1, 2, 3], 4
+    )
+
+    # Peso PLATAM con HCPN (calcular_peso_platam): base por madurez + ajuste
+    # por historial, limitado a 20% - 80%
+    amplio = count >= 20
+    poco = count < config.MIN_PAGOS_CONFIABLES
+    ajuste = np.select([amplio, poco], [AJUSTE_AMPLIO, AJUSTE_POCO], AJUSTE_NINGUNO)
+    peso_base = np.array([config.PESOS_PLATAM[c] for c in CATEGORIAS_MADUREZ])[categoria]
+    peso_ajuste = np.array([0.0, config.BONUS_HISTORIAL_AMPLIO, config.PENALIZACION_HISTORIAL_POCO])[ajuste]
+    peso_dinamico = np.clip(peso_base + peso_ajuste, 0.20, 0.80)
+
+    peso_platam = np.select([caso == 1, caso == 3], [peso_dinamico, 0.20], 1.0)
+    peso_hcpn = np.select([caso == 1, caso == 3], [1.0 - peso_dinamico, 0.80], 0.0)
+
+    with np.errstate(invalid='ignore'):
+        hybrid = np.select(
+            [caso == 1, caso == 2, caso == 3],
+            [platam * peso_dinamico + hcpn * (1.0 - peso_dinamico),
+             platam,
+             config.DEFAULT_SCORE_APLICACION * 0.20 + hcpn * 0.80],
+            config.DEFAULT_SCORE_SIN_DATOS
         )
-        results.append(result)
+    fuera_de_rango = (hybrid < 0) | (hybrid > 1000)
+    hybrid = np.clip(hybrid, 0, 1000)
 
-        # Log progress
-        if (idx + 1) % 500 == 0:
-            logger.info(f"  Procesados {idx + 1:,} / {len(df):,} clientes...")
+    # Redondeo a un decimal y dtypes como el bucle iterrows original
+    hybrid, payment_count = _compat_iterrows(
+        df, hybrid, (caso == 4) | fuera_de_rango, caso == 2, platam_col, payment_count_col
+    )
 
-    # Crear DataFrame con resultados
-    results_df = pd.DataFrame(results)
+    results_df = pd.DataFrame({
+        'hybrid_score': hybrid,
+        'peso_platam': peso_platam,
+        'peso_hcpn': peso_hcpn,
+        'estrategia_codigo': codigo_estrategia(caso, categoria, ajuste),
+        'categoria_madurez': np.array(CATEGORIAS_MADUREZ, dtype=object)[categoria],
+    })
 
     # Agregar ratings
-    results_df['hybrid_rating'] = results_df['hybrid_score'].apply(get_hybrid_rating)
+    results_df['hybrid_rating'] = get_hybrid_rating(results_df['hybrid_score'])
 
     # Combinar con DataFrame original
     df_output = df.copy()
@@ -460,7 +628,10 @@ def calculate_hybrid_scores_batch(
     df_output['hybrid_rating'] = results_df['hybrid_rating']
     df_output['peso_platam_usado'] = results_df['peso_platam']
     df_output['peso_hcpn_usado'] = results_df['peso_hcpn']
-    df_output['estrategia_hibrido'] = results_df['estrategia']
+    df_output['estrategia_codigo'] = results_df['estrategia_codigo']
+    if estrategia_texto:
+        results_df['estrategia'] = render_estrategias(results_df['estrategia_codigo'], payment_count, config)
+        df_output['estrategia_hibrido'] = results_df['estrategia']
     df_output['categoria_madurez'] = results_df['categoria_madurez']
 
     # Resumen
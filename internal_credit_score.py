@@ -24,30 +24,220 @@ Usage in Google Colab:
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import warnings
 warnings.filterwarnings('ignore')
 
+from dpd_rollup import MonthlyDPDRollup, MISSING_DAY, day_ordinals
+from score_bands import CREDIT_RATING, SCORE_BUCKET, VELOCITY_MULTIPLIER
+from stage_timing import timed_stage
+from scoring_core import (
+    payment_quality_score,
+    maturity_weights,
+    pattern_break_penalty,
+    payment_plan_points,
+    deterioration_points,
+)
+
+# ============================================================================
+# CLIENT PAYMENT INDEX
+# ============================================================================
+
+class ClientPaymentIndex:
+    """
+    Payment history pre-partitioned by client, built once from payments_df.
+
+    Rows are sorted by client and payment day (most recent first, stable),
+    with an offsets table so a client's history is an O(k) slice of the
+    sorted frame instead of a scan + copy of the whole payments_df.
+
+    Any function that takes payments_df / payment_history_df also accepts
+    an index, with the same results as on the DataFrame.
+    """
+
+    def __init__(self, payments_df: pd.DataFrame):
+        payment_date = pd.to_datetime(payments_df['payment_date'])
+        codes, client_ids = pd.factorize(payments_df['client_id'])
+
+        # lexsort: last key is primary -> client, then day descending (NaT last)
+        days = day_ordinals(payment_date)
+        date_key = np.where(days == MISSING_DAY, np.iinfo(np.int64).max, -days.astype(np.int64))
+        order = np.lexsort((date_key, codes))
+
+        self.payments = payments_df.iloc[order].reset_index(drop=True)
+        self.payments['payment_date'] = payment_date.iloc[order].to_numpy()
+
+        counts = np.bincount(codes[order][codes[order] >= 0], minlength=len(client_ids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]) + int((codes < 0).sum())
+        self._positions = {client_id: i for i, client_id in enumerate(client_ids)}
+
+    def __len__(self) -> int:
+        return len(self.payments)
+
+    def __contains__(self, client_id) -> bool:
+        return client_id in self._positions
+
+    def get(self, client_id) -> pd.DataFrame:
+        """Payment rows of one client (a slice of the sorted frame, not a copy)"""
+        i = self._positions.get(client_id)
+        if i is None:
+            return self.payments.iloc[0:0]
+        return self.payments.iloc[self.offsets[i]:self.offsets[i + 1]]
+
+
+def _client_payments(payments, client_id) -> pd.DataFrame:
+    """Payment rows of one client from a DataFrame or a ClientPaymentIndex"""
+    if isinstance(payments, ClientPaymentIndex):
+        return payments.get(client_id)
+    return payments[payments['client_id'] == client_id]
+
+
+# ============================================================================
+# COLUMNAR PAYMENT STORE
+# ============================================================================
+
+class PaymentStore:
+    """
+    Compact, pre-typed payments and payment plans for scoring.
+
+    Dates are parsed once at load into int32 day ordinals, client ids become
+    int32 codes, DPD is float32 and plan_status an int8 code into
+    PLAN_STATUSES (-1 = other). Rows are sorted by client and date (most
+    recent first) with offsets per client, like ClientPaymentIndex.
+
+    The component functions, calculate_credit_score, check_dpd_alerts and
+    calculate_credit_scores_batch accept a store in place of payments_df
+    (and of payment_plans_df). Payment dates are treated as calendar dates.
+    dpd_rollup() gives the monthly DPD buckets for windowed statistics.
+    """
+
+    @timed_stage('payment_store', rows=lambda self, payments_df, *args, **kwargs: len(payments_df))
+    def __init__(self, payments_df: pd.DataFrame, payment_plans_df: pd.DataFrame = None):
+        if payment_plans_df is None:
+            payment_plans_df = pd.DataFrame(columns=['client_id', 'plan_start_date', 'plan_status'])
+
+        codes, self.client_ids = pd.factorize(
+            pd.concat([payments_df['client_id'], payment_plans_df['client_id']], ignore_index=True)
+        )
+        self._positions = {client_id: i for i, client_id in enumerate(self.client_ids)}
+        pay_codes, plan_codes = codes[:len(payments_df)], codes[len(payments_df):]
+
+        # Payments
+        order, self.pay_offsets = self._partition(pay_codes, day_ordinals(payments_df['payment_date']))
+        self.pay_client = pay_codes[order].astype(np.int32)
+        self.pay_day = day_ordinals(payments_df['payment_date'])[order]
+        self.pay_dpd = payments_df['days_past_due'].to_numpy(dtype=np.float32)[order]
+
+        # Payment plans
+        plan_day = day_ordinals(payment_plans_df['plan_start_date'])
+        order, self.plan_offsets = self._partition(plan_codes, plan_day)
+        self.plan_client = plan_codes[order].astype(np.int32)
+        self.plan_day = plan_day[order]
+        self.plan_status = pd.Index(PLAN_STATUSES).get_indexer(
+            payment_plans_df['plan_status']
+        ).astype(np.int8)[order]
+
+    def _partition(self, codes: np.ndarray, days: np.ndarray):
+        """Row order (client, date desc, missing dates last) and per-client offsets"""
+        date_key = np.where(days == MISSING_DAY, np.iinfo(np.int64).max, -days.astype(np.int64))
+        keep = np.flatnonzero(codes >= 0)
+        order = keep[np.lexsort((date_key[keep], codes[keep]))]
+        counts = np.bincount(codes[order], minlength=len(self.client_ids))
+        return order, np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self) -> int:
+        return len(self.pay_client)
+
+    def __contains__(self, client_id) -> bool:
+        return client_id in self._positions
+
+    def payment_slice(self, client_id) -> slice:
+        """Position range of one client's payments in the pay_* columns"""
+        i = self._positions.get(client_id)
+        if i is None:
+            return slice(0, 0)
+        return slice(self.pay_offsets[i], self.pay_offsets[i + 1])
+
+    def plan_slice(self, client_id) -> slice:
+        """Position range of one client's plans in the plan_* columns"""
+        i = self._positions.get(client_id)
+        if i is None:
+            return slice(0, 0)
+        return slice(self.plan_offsets[i], self.plan_offsets[i + 1])
+
+    def dpd_rollup(self, reference_date: datetime) -> MonthlyDPDRollup:
+        """Monthly DPD buckets of every client as of reference_date"""
+        return MonthlyDPDRollup.from_arrays(
+            self.client_ids, self.pay_client, self.pay_day, self.pay_dpd, reference_date
+        )
+
+    @staticmethod
+    def months_ago(days: np.ndarray, reference_date: datetime) -> np.ndarray:
+        """Months since each day ordinal, rounded like the DataFrame path (NaN if missing)"""
+        ref_day = pd.Timestamp(reference_date).value // 86_400_000_000_000
+        elapsed = (ref_day - days.astype(np.int64)).astype(float)
+        elapsed[days == MISSING_DAY] = np.nan
+        return np.round(elapsed / 30, 1)
+
+
+def _store_components(
+    store: PaymentStore,
+    client_id,
+    months_as_client: float,
+    reference_date: datetime
+) -> Dict:
+    """One client's component scores read straight from a PaymentStore"""
+    pay = store.payment_slice(client_id)
+    plan = store.plan_slice(client_id)
+    components = _score_components_arrays(
+        1, np.array([months_as_client], dtype=float),
+        np.zeros(pay.stop - pay.start, dtype=np.intp),
+        PaymentStore.months_ago(store.pay_day[pay], reference_date),
+        store.pay_dpd[pay].astype(float),
+        np.zeros(plan.stop - plan.start, dtype=np.intp),
+        PaymentStore.months_ago(store.plan_day[plan], reference_date),
+        store.plan_status[plan]
+    )
+    return {key: values[0].item() for key, values in components.items()}
+
+
 # ============================================================================
 # CREDIT SCORE CALCULATION FUNCTIONS
 # ============================================================================
 
+@timed_stage('payment_performance', rows=lambda *args, **kwargs: 1)
 def calculate_payment_performance(
-    payments_df: pd.DataFrame,
+    payments_df: Union[pd.DataFrame, ClientPaymentIndex, PaymentStore],
     client_id: str,
     months_as_client: int,
-    reference_date: datetime = None
+    reference_date: datetime = None,
+    dpd_rollup: Optional[MonthlyDPDRollup] = None
 ) -> Dict:
     """
     Calculate Payment Performance Score (600 points max)
     Combines timeliness and pattern scores with maturity weighting
 
+    With dpd_rollup (built for reference_date), the 6-month pattern window
+    is read from its monthly buckets; timeliness weights every payment by
+    its own recency, so it always comes from payments_df.
+
     Returns score on 600-point scale (60% of total credit score)
     """
     if reference_date is None:
         reference_date = datetime.now()
 
-    client_payments = payments_df[payments_df['client_id'] == client_id].copy()
+    if isinstance(payments_df, PaymentStore):
+        c = _store_components(payments_df, client_id, months_as_client, reference_date)
+        return {
+            'timeliness_score': c['timeliness_score'],
+            'pattern_score': c['pattern_score'],
+            'timeliness_weight': c['timeliness_weight'],
+            'pattern_weight': c['pattern_weight'],
+            'total': c['payment_performance'],
+            'payment_count': c['payment_count']
+        }
+
+    client_payments = _client_payments(payments_df, client_id)
 
     # Default scores if insufficient data
     if len(client_payments) < 3:
@@ -61,74 +251,50 @@ def calculate_payment_performance(
         }
 
     # Determine weights based on maturity
-    if months_as_client < 6:
-        timeliness_weight = 0.85
-        pattern_weight = 0.15
-    elif months_as_client < 12:
-        timeliness_weight = 0.70
-        pattern_weight = 0.30
-    else:
-        timeliness_weight = 0.50
-        pattern_weight = 0.50
+    timeliness_weight, pattern_weight = maturity_weights(months_as_client)
 
     # A. TIMELINESS SCORE (0-100)
-    client_payments['months_ago'] = (
-        (reference_date - pd.to_datetime(client_payments['payment_date'])).dt.days / 30
-    ).round(1)
-    client_payments['recency_weight'] = 1.5 ** client_payments['months_ago']
-
-    def payment_quality_score(dpd):
-        """Score individual payment based on days past due"""
-        if dpd <= 0:
-            return 100
-        elif dpd <= 15:
-            return 100 - (dpd * 3)
-        elif dpd <= 30:
-            return 55 - (dpd * 2)
-        elif dpd <= 60:
-            return max(0, 30 - dpd)
-        else:
-            return 0
+    payment_date = pd.to_datetime(client_payments['payment_date'])
+    months_ago = ((reference_date - payment_date).dt.days / 30).round(1)
+    recency_weight = 1.5 ** months_ago
 
-    client_payments['payment_score'] = client_payments['days_past_due'].apply(payment_quality_score)
-    client_payments['weighted_score'] = client_payments['payment_score'] * client_payments['recency_weight']
+    # Score individual payment based on days past due
+    payment_score = client_payments['days_past_due'].apply(payment_quality_score)
+    weighted_score = payment_score * recency_weight
 
-    timeliness_score = (
-        client_payments['weighted_score'].sum() / client_payments['recency_weight'].sum()
-    )
+    timeliness_score = weighted_score.sum() / recency_weight.sum()
 
     # B. PATTERN SCORE (0-100)
-    recent_6mo = client_payments[client_payments['months_ago'] <= 6]
-
-    if len(recent_6mo) < 3:
+    if dpd_rollup is not None:
+        # 6-month window (count, mean, std, latest DPD) from the monthly buckets
+        dpd_rollup.check_reference(reference_date)
+        recent_count, adtp, payment_stddev, recent_dpd = dpd_rollup.client_window(client_id, 6)
+    else:
+        recent_6mo = client_payments[months_ago <= 6]
+        recent_count = len(recent_6mo)
+        if recent_count >= 3:
+            adtp = recent_6mo['days_past_due'].mean()
+            payment_stddev = recent_6mo['days_past_due'].std()
+
+            # Latest payment of the window (on the same day, the first in
+            # input order), whatever the row order
+            recent_days = payment_date[months_ago <= 6].dt.normalize()
+            recent_dpd = recent_6mo['days_past_due'].iloc[recent_days.to_numpy().argmax()]
+
+    if recent_count < 3:
         pattern_score = 50
     else:
-        adtp = recent_6mo['days_past_due'].mean()
-        payment_stddev = recent_6mo['days_past_due'].std()
-
         # Consistency score based on standard deviation
         consistency_score = max(0, 100 - (payment_stddev * 2))
 
         # Pattern break detection
-        if len(recent_6mo) > 0:
-            recent_dpd = recent_6mo.iloc[0]['days_past_due']
-            if payment_stddev > 0:
-                z_score = abs((recent_dpd - adtp) / payment_stddev)
-
-                if z_score <= 1.5:
-                    pattern_break_penalty = 0
-                elif z_score <= 2.5:
-                    pattern_break_penalty = 15
-                elif z_score <= 3.5:
-                    pattern_break_penalty = 35
-                else:
-                    pattern_break_penalty = 60
-            else:
-                pattern_break_penalty = 0
+        if payment_stddev > 0:
+            z_score = abs((recent_dpd - adtp) / payment_stddev)
+            penalty = pattern_break_penalty(z_score)
         else:
-            pattern_break_penalty = 0
+            penalty = 0
 
-        pattern_score = max(0, consistency_score - pattern_break_penalty)
+        pattern_score = max(0, consistency_score - penalty)
 
     # COMBINED SCORE - Scaled to 600 points
     total = (timeliness_score * timeliness_weight + pattern_score * pattern_weight) * 6
@@ -143,8 +309,9 @@ def calculate_payment_performance(
     }
 
 
+@timed_stage('payment_plan_score', rows=lambda *args, **kwargs: 1)
 def calculate_payment_plan_score(
-    payment_plans_df: pd.DataFrame,
+    payment_plans_df: Union[pd.DataFrame, PaymentStore],
     client_id: str,
     reference_date: datetime = None
 ) -> Dict:
@@ -157,6 +324,17 @@ def calculate_payment_plan_score(
     if reference_date is None:
         reference_date = datetime.now()
 
+    if isinstance(payment_plans_df, PaymentStore):
+        c = _store_components(payment_plans_df, client_id, 0, reference_date)
+        months_since_last = c['months_since_last_plan']
+        return {
+            'total': c['payment_plan_history'],
+            'active_plans': c['active_plans'],
+            'completed_plans_12mo': c['completed_plans_12mo'],
+            'defaulted_plans': c['defaulted_plans'],
+            'months_since_last_plan': None if np.isnan(months_since_last) else months_since_last
+        }
+
     client_plans = payment_plans_df[payment_plans_df['client_id'] == client_id].copy()
 
     # Default - no plan history
@@ -189,23 +367,12 @@ def calculate_payment_plan_score(
             'months_since_last_plan': round(months_since_last, 1)
         }
 
-    # Calculate score based on events
-    score = 150
-
-    # Count active plans
+    # Calculate score based on events: -50 per active plan, +30 per completed
+    # plan, -100 per defaulted plan (bounded to 0-150)
     active_plans = len(plans_last_12mo[plans_last_12mo['plan_status'] == 'active'])
-    score -= (active_plans * 50)
-
-    # Count completed plans
     completed_plans = len(plans_last_12mo[plans_last_12mo['plan_status'] == 'completed'])
-    score += (completed_plans * 30)
-
-    # Count defaulted plans
     defaulted_plans = len(plans_last_12mo[plans_last_12mo['plan_status'] == 'defaulted'])
-    score -= (defaulted_plans * 100)
-
-    # Bound score
-    score = max(0, min(150, score))
+    score = payment_plan_points(active_plans, completed_plans, defaulted_plans)
 
     return {
         'total': round(score, 1),
@@ -216,8 +383,9 @@ def calculate_payment_plan_score(
     }
 
 
+@timed_stage('deterioration_velocity', rows=lambda *args, **kwargs: 1)
 def calculate_deterioration_velocity(
-    payments_df: pd.DataFrame,
+    payments_df: Union[pd.DataFrame, ClientPaymentIndex, PaymentStore, MonthlyDPDRollup],
     client_id: str,
     reference_date: datetime = None
 ) -> Dict:
@@ -230,10 +398,26 @@ def calculate_deterioration_velocity(
     if reference_date is None:
         reference_date = datetime.now()
 
-    client_payments = payments_df[payments_df['client_id'] == client_id].copy()
+    if isinstance(payments_df, PaymentStore):
+        c = _store_components(payments_df, client_id, 0, reference_date)
+        return {
+            'total': c['deterioration_velocity'],
+            'dpd_1mo': c['dpd_1mo'],
+            'dpd_6mo': c['dpd_6mo'],
+            'trend_delta': c['trend_delta'],
+            'payments_1mo': c['payments_1mo'],
+            'payments_6mo': c['payments_6mo']
+        }
+
+    if isinstance(payments_df, MonthlyDPDRollup):
+        payments_df.check_reference(reference_date)
+        payment_count = payments_df.client_payment_count(client_id)
+    else:
+        client_payments = _client_payments(payments_df, client_id)
+        payment_count = len(client_payments)
 
     # Default if insufficient data
-    if len(client_payments) < 3:
+    if payment_count < 3:
         return {
             'total': 125,  # 50% of 250
             'dpd_1mo': 0,
@@ -243,49 +427,50 @@ def calculate_deterioration_velocity(
             'payments_6mo': 0
         }
 
-    # Calculate months ago
-    client_payments['payment_date'] = pd.to_datetime(client_payments['payment_date'])
-    client_payments['months_ago'] = (
-        (reference_date - client_payments['payment_date']).dt.days / 30
-    ).round(1)
+    if isinstance(payments_df, MonthlyDPDRollup):
+        # 1-month and 6-month averages from the monthly buckets
+        payments_1mo, dpd_1mo, _, _ = payments_df.client_window(client_id, 1)
+        payments_6mo, dpd_6mo, _, _ = payments_df.client_window(client_id, 6)
+    else:
+        # Calculate months ago
+        months_ago = (
+            (reference_date - pd.to_datetime(client_payments['payment_date'])).dt.days / 30
+        ).round(1)
+
+        # 1-month average
+        window_1mo = client_payments[months_ago <= 1]
 
-    # 1-month average
-    payments_1mo = client_payments[client_payments['months_ago'] <= 1]
+        # 6-month average
+        window_6mo = client_payments[months_ago <= 6]
 
-    # 6-month average
-    payments_6mo = client_payments[client_payments['months_ago'] <= 6]
+        payments_1mo, payments_6mo = len(window_1mo), len(window_6mo)
+        dpd_1mo = window_1mo['days_past_due'].mean()
+        dpd_6mo = window_6mo['days_past_due'].mean()
 
     # Need at least 3 payments in 6mo window and 1 payment in 1mo window
-    if len(payments_6mo) < 3 or len(payments_1mo) < 1:
+    if payments_6mo < 3 or payments_1mo < 1:
         return {
             'total': 125,
             'dpd_1mo': 0,
             'dpd_6mo': 0,
             'trend_delta': 0,
-            'payments_1mo': len(payments_1mo),
-            'payments_6mo': len(payments_6mo)
+            'payments_1mo': payments_1mo,
+            'payments_6mo': payments_6mo
         }
 
-    dpd_1mo = payments_1mo['days_past_due'].mean()
-    dpd_6mo = payments_6mo['days_past_due'].mean()
-
     # Calculate trend
     trend_delta = dpd_1mo - dpd_6mo
 
     # Score (base 0-100, then scaled to 250)
-    base_score = 100 - (trend_delta * 3)
-    base_score = max(0, min(100, base_score))
-
-    # Scale to 250 points
-    score = base_score * 2.5
+    score = deterioration_points(trend_delta)
 
     return {
         'total': round(score, 1),
         'dpd_1mo': round(dpd_1mo, 1),
         'dpd_6mo': round(dpd_6mo, 1),
         'trend_delta': round(trend_delta, 1),
-        'payments_1mo': len(payments_1mo),
-        'payments_6mo': len(payments_6mo)
+        'payments_1mo': payments_1mo,
+        'payments_6mo': payments_6mo
     }
 
 
@@ -294,69 +479,21 @@ def calculate_deterioration_velocity(
 # ============================================================================
 
 def get_credit_rating(total_score: float) -> str:
-    """Convert total score to letter rating"""
-    if total_score >= 900:
-        return 'A+'
-    elif total_score >= 850:
-        return 'A'
-    elif total_score >= 800:
-        return 'A-'
-    elif total_score >= 750:
-        return 'B+'
-    elif total_score >= 700:
-        return 'B'
-    elif total_score >= 650:
-        return 'B-'
-    elif total_score >= 600:
-        return 'C+'
-    elif total_score >= 550:
-        return 'C'
-    elif total_score >= 500:
-        return 'C-'
-    else:
-        return 'D/F'
+    """Convert total score to letter rating (also takes an array / Series)"""
+    return CREDIT_RATING(total_score)
 
 
 def get_score_bucket(score: float) -> int:
-    """Return bucket number (lower = better)"""
-    if score >= 900:
-        return 1   # A+
-    elif score >= 850:
-        return 2   # A
-    elif score >= 800:
-        return 3   # A-
-    elif score >= 750:
-        return 4   # B+
-    elif score >= 700:
-        return 5   # B
-    elif score >= 650:
-        return 6   # B-
-    elif score >= 600:
-        return 7   # C+
-    elif score >= 550:
-        return 8   # C
-    elif score >= 500:
-        return 9   # C-
-    else:
-        return 10  # D/F
+    """Return bucket number (lower = better): 1 = A+ ... 10 = D/F"""
+    return SCORE_BUCKET(score)
 
 
 def calculate_velocity_multiplier(velocity_score: float) -> float:
     """Calculate reduction multiplier based on deterioration velocity"""
-    if velocity_score >= 237.5:  # 95+ on 0-100 scale
-        return 0.8
-    elif velocity_score >= 212.5:  # 85+ on 0-100 scale
-        return 1.0
-    elif velocity_score >= 175:  # 70+ on 0-100 scale
-        return 1.3
-    elif velocity_score >= 125:  # 50+ on 0-100 scale
-        return 1.7
-    elif velocity_score >= 75:  # 30+ on 0-100 scale
-        return 2.5
-    else:
-        return 3.0
+    return VELOCITY_MULTIPLIER(velocity_score)
 
 
+@timed_stage('limit_actions', rows=lambda *args, **kwargs: 1)
 def calculate_limit_actions(
     total_score: float,
     previous_score: Optional[float],
@@ -471,10 +608,11 @@ def calculate_limit_actions(
     }
 
 
+@timed_stage('credit_score', rows=lambda *args, **kwargs: 1)
 def calculate_credit_score(
     client_data: Dict,
-    payments_df: pd.DataFrame,
-    payment_plans_df: pd.DataFrame,
+    payments_df: Union[pd.DataFrame, ClientPaymentIndex, PaymentStore],
+    payment_plans_df: Union[pd.DataFrame, PaymentStore],
     previous_score: Optional[float] = None,
     reference_date: datetime = None
 ) -> Dict:
@@ -538,6 +676,655 @@ def calculate_credit_score(
     }
 
 
+# ============================================================================
+# PORTFOLIO (BATCH) SCORING
+# ============================================================================
+
+PLAN_STATUSES = ('active', 'completed', 'defaulted')
+
+
+def _months_ago(dates, reference_date) -> np.ndarray:
+    """
+    Months elapsed since each date, as the per-client functions compute it:
+    whole days (floored) / 30, rounded to 1 decimal. NaT -> NaN.
+    """
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]')
+    missing = np.isnat(dates)
+    ref_ns = pd.Timestamp(reference_date).value
+    delta_ns = ref_ns - np.where(missing, ref_ns, dates.view(np.int64))
+    days = np.floor_divide(delta_ns, 86_400_000_000_000).astype(float)
+    days[missing] = np.nan
+    return np.round(days / 30, 1)
+
+
+def _clip_like_python(values: np.ndarray, low: float, high: float = None) -> np.ndarray:
+    """max(low, min(high, x)) with Python's NaN semantics (NaN never wins a comparison)"""
+    if high is not None:
+        values = np.where(values < high, values, high)
+    return np.where(values > low, values, low)
+
+
+def _payment_quality_scores(dpd: np.ndarray) -> np.ndarray:
+    """Vectorized payment_quality_score (see calculate_payment_performance)"""
+    return np.select(
+        [dpd <= 0, dpd <= 15, dpd <= 30, dpd <= 60],
+        [100.0, 100 - dpd * 3, 55 - dpd * 2, _clip_like_python(30 - dpd, 0)],
+        default=0.0
+    )
+
+
+def _group_mean_std(codes: np.ndarray, values: np.ndarray, mask: np.ndarray, n: int):
+    """Per-group count, mean and sample std (ddof=1) of values[mask], skipping NaN like pandas"""
+    valid = mask & ~np.isnan(values)
+    g = codes[valid]
+    x = values[valid]
+    count = np.bincount(g, minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(g, weights=x, minlength=n) / count
+        sq_dev = np.bincount(g, weights=(x - mean[g]) ** 2, minlength=n)
+        std = np.where(count > 1, np.sqrt(sq_dev / (count - 1)), np.nan)
+    return count, mean, std
+
+
+def _score_components_arrays(
+    n_clients: int,
+    months_as_client: np.ndarray,
+    pay_codes: np.ndarray,
+    pay_months_ago: np.ndarray,
+    pay_dpd: np.ndarray,
+    plan_codes: np.ndarray,
+    plan_months: np.ndarray,
+    plan_status: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Segmented NumPy version of the three component functions.
+
+    pay_codes / plan_codes map every row to a client position in [0, n_clients).
+    Payment rows must be sorted most recent day first within each client
+    (as in PaymentStore): the pattern break check uses the first recent row.
+    plan_status holds indexes into PLAN_STATUSES (-1 for any other status).
+    """
+    n = n_clients
+    payment_count = np.bincount(pay_codes, minlength=n)
+
+    # Timeliness: recency-weighted payment quality
+    recency_weight = 1.5 ** pay_months_ago
+    weighted = _payment_quality_scores(pay_dpd) * recency_weight
+    valid_w = ~np.isnan(recency_weight)
+    valid_s = ~np.isnan(weighted)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        timeliness = (
+            np.bincount(pay_codes[valid_s], weights=weighted[valid_s], minlength=n) /
+            np.bincount(pay_codes[valid_w], weights=recency_weight[valid_w], minlength=n)
+        )
+
+    # 1 and 6-month DPD windows
+    recent_6mo = pay_months_ago <= 6
+    payments_6mo = np.bincount(pay_codes[recent_6mo], minlength=n)
+    _, dpd_6mo, std_6mo = _group_mean_std(pay_codes, pay_dpd, recent_6mo, n)
+
+    recent_1mo = pay_months_ago <= 1
+    payments_1mo = np.bincount(pay_codes[recent_1mo], minlength=n)
+    _, dpd_1mo, _ = _group_mean_std(pay_codes, pay_dpd, recent_1mo, n)
+
+    # First recent row per client (the latest payment)
+    recent_idx = np.flatnonzero(recent_6mo)
+    first_clients, first_pos = np.unique(pay_codes[recent_idx], return_index=True)
+    recent_dpd = np.full(n, np.nan)
+    recent_dpd[first_clients] = pay_dpd[recent_idx[first_pos]]
+
+    # Plans of the last 12 months
+    plan_count = np.bincount(plan_codes, minlength=n)
+    in_12mo = plan_months <= 12
+    plans_12mo = np.bincount(plan_codes[in_12mo], minlength=n)
+    active, completed, defaulted = (
+        np.bincount(plan_codes[in_12mo & (plan_status == k)], minlength=n)
+        for k in range(len(PLAN_STATUSES))
+    )
+
+    last_all = np.full(n, np.inf)
+    np.fmin.at(last_all, plan_codes, plan_months)
+    last_12mo = np.full(n, np.inf)
+    np.fmin.at(last_12mo, plan_codes[in_12mo], plan_months[in_12mo])
+    months_since_last = np.where(plans_12mo > 0, last_12mo, last_all)
+    months_since_last = np.where(
+        (plan_count > 0) & np.isfinite(months_since_last), months_since_last, np.nan
+    )
+
+    return _components_from_stats(
+        months_as_client, payment_count, timeliness,
+        payments_1mo, payments_6mo, dpd_1mo, dpd_6mo, std_6mo, recent_dpd,
+        active, completed, defaulted, months_since_last
+    )
+
+
+def _components_from_stats(
+    months_as_client: np.ndarray,
+    payment_count: np.ndarray,
+    timeliness: np.ndarray,
+    payments_1mo: np.ndarray,
+    payments_6mo: np.ndarray,
+    dpd_1mo: np.ndarray,
+    dpd_6mo: np.ndarray,
+    std_6mo: np.ndarray,
+    recent_dpd: np.ndarray,
+    active: np.ndarray,
+    completed: np.ndarray,
+    defaulted: np.ndarray,
+    months_since_last: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Component scores from per-client payment and plan statistics: DPD means
+    skip missing values, std_6mo is the sample std (ddof=1) of the 6-month
+    window, recent_dpd the DPD of its first row and months_since_last the
+    months since the latest plan (NaN without plans).
+    """
+    has_history = payment_count >= 3
+
+    # --- Payment performance -------------------------------------------------
+    timeliness_weight = np.select(
+        [months_as_client < 6, months_as_client < 12], [0.85, 0.70], default=0.50
+    )
+    pattern_weight = np.select(
+        [months_as_client < 6, months_as_client < 12], [0.15, 0.30], default=0.50
+    )
+
+    adtp, payment_stddev = dpd_6mo, std_6mo
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z_score = np.abs((recent_dpd - adtp) / payment_stddev)
+    pattern_break_penalty = np.where(
+        payment_stddev > 0,
+        np.select([z_score <= 1.5, z_score <= 2.5, z_score <= 3.5], [0, 15, 35], default=60),
+        0
+    )
+    consistency = _clip_like_python(100 - payment_stddev * 2, 0)
+    pattern = np.where(
+        payments_6mo < 3, 50.0, _clip_like_python(consistency - pattern_break_penalty, 0)
+    )
+
+    perf_total = (timeliness * timeliness_weight + pattern * pattern_weight) * 6
+
+    # --- Deterioration velocity ----------------------------------------------
+    trend_delta = dpd_1mo - dpd_6mo
+    det_total = _clip_like_python(100 - trend_delta * 3, 0, 100) * 2.5
+    det_ok = has_history & (payments_6mo >= 3) & (payments_1mo >= 1)
+
+    # --- Payment plans -------------------------------------------------------
+    plan_total = np.clip(150 - active * 50 + completed * 30 - defaulted * 100, 0, 150)
+
+    return {
+        'payment_performance': np.round(np.where(has_history, perf_total, 300.0), 1),
+        'timeliness_score': np.round(np.where(has_history, timeliness, 50.0), 1),
+        'pattern_score': np.round(np.where(has_history, pattern, 50.0), 1),
+        'timeliness_weight': np.where(has_history, timeliness_weight, 0.85),
+        'pattern_weight': np.where(has_history, pattern_weight, 0.15),
+        'payment_count': payment_count,
+
+        'payment_plan_history': plan_total,
+        'active_plans': active,
+        'completed_plans_12mo': completed,
+        'defaulted_plans': defaulted,
+        'months_since_last_plan': np.round(months_since_last, 1),
+
+        'deterioration_velocity': np.round(np.where(det_ok, det_total, 125.0), 1),
+        'dpd_1mo': np.round(np.where(det_ok, dpd_1mo, 0.0), 1),
+        'dpd_6mo': np.round(np.where(det_ok, dpd_6mo, 0.0), 1),
+        'trend_delta': np.round(np.where(det_ok, trend_delta, 0.0), 1),
+        'payments_1mo': np.where(has_history, payments_1mo, 0),
+        'payments_6mo': np.where(has_history, payments_6mo, 0),
+    }
+
+
+@timed_stage('credit_scores_batch', rows=lambda clients_df, *args, **kwargs: len(clients_df))
+def calculate_credit_scores_batch(
+    clients_df: pd.DataFrame,
+    payments_df: Union[pd.DataFrame, PaymentStore],
+    payment_plans_df: Union[pd.DataFrame, PaymentStore],
+    reference_date: datetime = None
+) -> pd.DataFrame:
+    """
+    Calculate the three score components for every client in one pass
+
+    Gives the same numbers as calling calculate_payment_performance,
+    calculate_payment_plan_score and calculate_deterioration_velocity per
+    client, but scans payments_df / payment_plans_df once instead of once
+    per client. Either frame may be given as a PaymentStore.
+
+    Returns one row per row of clients_df (same order) with the component
+    scores, their key metrics, total_score and credit_rating.
+    """
+    if reference_date is None:
+        reference_date = datetime.now()
+
+    client_ids = pd.Index(pd.unique(clients_df['client_id']))
+    months_as_client = clients_df['months_as_client'].to_numpy(dtype=float)
+
+    if isinstance(payments_df, PaymentStore):
+        store = payments_df
+        store_codes = client_ids.get_indexer(store.client_ids)
+        pay_codes = store_codes[store.pay_client]
+        pay_rows = pay_codes >= 0
+        pay_codes = pay_codes[pay_rows]
+        pay_months_ago = PaymentStore.months_ago(store.pay_day[pay_rows], reference_date)
+        pay_dpd = store.pay_dpd[pay_rows].astype(float)
+    else:
+        # Rows by client, most recent day first (same day: input order), like PaymentStore
+        pay_codes = client_ids.get_indexer(payments_df['client_id'])
+        days = day_ordinals(payments_df['payment_date'])
+        date_key = np.where(days == MISSING_DAY, np.iinfo(np.int64).max, -days.astype(np.int64))
+        pay_rows = np.flatnonzero(pay_codes >= 0)
+        pay_rows = pay_rows[np.lexsort((date_key[pay_rows], pay_codes[pay_rows]))]
+        pay_codes = pay_codes[pay_rows]
+        pay_months_ago = _months_ago(payments_df['payment_date'], reference_date)[pay_rows]
+        pay_dpd = payments_df['days_past_due'].to_numpy(dtype=float)[pay_rows]
+
+    if isinstance(payment_plans_df, PaymentStore):
+        store = payment_plans_df
+        plan_codes = client_ids.get_indexer(store.client_ids)[store.plan_client]
+        plan_rows = plan_codes >= 0
+        plan_codes = plan_codes[plan_rows]
+        plan_months = PaymentStore.months_ago(store.plan_day[plan_rows], reference_date)
+        plan_status = store.plan_status[plan_rows]
+    elif payment_plans_df is not None and len(payment_plans_df) > 0:
+        plan_codes = client_ids.get_indexer(payment_plans_df['client_id'])
+        plan_rows = plan_codes >= 0
+        plan_codes = plan_codes[plan_rows]
+        plan_months = _months_ago(payment_plans_df['plan_start_date'], reference_date)[plan_rows]
+        plan_status = pd.Index(PLAN_STATUSES).get_indexer(
+            payment_plans_df['plan_status']
+        )[plan_rows]
+    else:
+        plan_codes = np.empty(0, dtype=np.intp)
+        plan_months = np.empty(0)
+        plan_status = np.empty(0, dtype=np.intp)
+
+    # Components per unique client, then broadcast back to clients_df rows
+    # (client_id is expected to be unique; duplicates reuse the first row's maturity)
+    rows = client_ids.get_indexer(clients_df['client_id'])
+    first_rows = np.unique(rows, return_index=True)[1]
+    per_client = _score_components_arrays(
+        len(client_ids), months_as_client[first_rows],
+        pay_codes, pay_months_ago, pay_dpd,
+        plan_codes, plan_months, plan_status
+    )
+
+    results = pd.DataFrame({'client_id': clients_df['client_id'].to_numpy()})
+    results['months_as_client'] = clients_df['months_as_client'].to_numpy()
+    for column, values in per_client.items():
+        results[column] = values[rows]
+
+    total_score = (
+        results['payment_performance'] +
+        results['payment_plan_history'] +
+        results['deterioration_velocity']
+    )
+    results['total_score'] = total_score.round(1)
+    results['credit_rating'] = get_credit_rating(total_score)
+
+    return results
+
+
+@timed_stage('score_valid_until', rows=lambda clients_df, *args, **kwargs: len(clients_df))
+def score_valid_until(
+    clients_df: pd.DataFrame,
+    payments_df: pd.DataFrame,
+    payment_plans_df: pd.DataFrame,
+    reference_date: datetime
+) -> np.ndarray:
+    """
+    Last calendar day (day ordinal, as in PaymentStore) up to which each
+    client's calculate_credit_scores_batch components stay the same as on
+    reference_date, for the same payments, plans and months_as_client.
+
+    The components move with the date only when a payment leaves the 1 or
+    6-month window, a plan leaves the 12-month window, the rounded months
+    since the latest plan steps (every 3 days), or, with payments of
+    different quality, when the recency weights shift (any day). Clients
+    with fewer than 3 payments keep the default payment components.
+    """
+    client_ids = pd.Index(clients_df['client_id'])
+    n = len(client_ids)
+    ref_day = _calendar_day(reference_date)
+    never = np.iinfo(np.int64).max
+
+    # Payments
+    codes = client_ids.get_indexer(payments_df['client_id'])
+    days = day_ordinals(payments_df['payment_date']).astype(np.int64)
+    quality = _payment_quality_scores(payments_df['days_past_due'].to_numpy(dtype=float))
+    payment_count = np.bincount(codes[codes >= 0], minlength=n)
+    dated = (codes >= 0) & (days != MISSING_DAY)
+
+    pay_until = np.full(n, never)
+    for leaves_window in (days + 32, days + 182):
+        moving = dated & (leaves_window > ref_day)
+        np.minimum.at(pay_until, codes[moving], leaves_window[moving] - 1)
+
+    lowest = np.full(n, np.inf)
+    highest = np.full(n, -np.inf)
+    np.minimum.at(lowest, codes[dated], quality[dated])
+    np.maximum.at(highest, codes[dated], quality[dated])
+    pay_until = np.where(lowest < highest, ref_day, pay_until)
+    pay_until = np.where(payment_count < 3, never, pay_until)
+
+    # Payment plans
+    plan_codes = client_ids.get_indexer(payment_plans_df['client_id'])
+    plan_days = day_ordinals(payment_plans_df['plan_start_date']).astype(np.int64)
+    plan_dated = (plan_codes >= 0) & (plan_days != MISSING_DAY)
+
+    plan_until = np.full(n, never)
+    leaves_window = plan_days + 362
+    moving = plan_dated & (leaves_window > ref_day)
+    np.minimum.at(plan_until, plan_codes[moving], leaves_window[moving] - 1)
+
+    latest_plan = np.full(n, np.iinfo(np.int64).min)
+    np.maximum.at(latest_plan, plan_codes[plan_dated], plan_days[plan_dated])
+    has_plan = latest_plan != np.iinfo(np.int64).min
+    next_step = ref_day + 3 - (ref_day - latest_plan + 1) % 3
+    plan_until = np.where(has_plan, np.minimum(plan_until, next_step - 1), plan_until)
+
+    return np.minimum(pay_until, plan_until)
+
+
+@timed_stage('limit_actions_batch', rows=lambda total_score, *args, **kwargs: np.size(total_score))
+def calculate_limit_actions_batch(
+    total_score,
+    previous_score,
+    velocity_score,
+    current_limit,
+    has_active_plan
+) -> pd.DataFrame:
+    """
+    Portfolio version of calculate_limit_actions: one NumPy pass over arrays
+    of current score, previous score (None/NaN = first calculation),
+    velocity score, current limit and active plan flag.
+
+    Returns one row per line with the calculate_limit_actions fields
+    (without 'note') plus current_credit_limit; see limit_exposure_totals
+    for the portfolio totals.
+    """
+    total_score = np.asarray(total_score, dtype=float)
+    previous_score = pd.to_numeric(pd.Series(previous_score, dtype=object), errors='coerce').to_numpy(dtype=float)
+    velocity_score = np.asarray(velocity_score, dtype=float)
+    current_limit = np.asarray(current_limit, dtype=float)
+    has_active_plan = np.asarray(has_active_plan, dtype=bool)
+
+    has_previous = ~np.isnan(previous_score)
+    current_bucket = get_score_bucket(total_score)
+    previous_bucket = np.where(has_previous, get_score_bucket(previous_score), current_bucket)
+
+    # REDUCTIONS - Automatic if ≤ B- and bucket worsened
+    reduction = (current_bucket > previous_bucket) & (total_score <= 650)
+    base_reduction = np.select(
+        [total_score >= 700, total_score >= 650, total_score >= 600,
+         total_score >= 550, total_score >= 500],
+        [0.0, 0.15, 0.25, 0.35, 0.50],
+        default=1.0  # Collections
+    )
+    velocity_multiplier = calculate_velocity_multiplier(velocity_score)
+    final_reduction = np.minimum(1.0, base_reduction * velocity_multiplier)
+    reduced_limit = current_limit * (1 - final_reduction)
+
+    # INCREASES - Suggested if improved from B- or above
+    increase = ~reduction & (current_bucket < previous_bucket) & (previous_score >= 650)
+    suggested_increase = np.select(
+        [total_score >= 900, total_score >= 850, total_score >= 800,
+         total_score >= 750, total_score >= 700],
+        [0.25, 0.20, 0.15, 0.10, 0.10],
+        default=0.0
+    )
+
+    new_limit = np.where(reduction, np.round(reduced_limit, 2), current_limit)
+    previous_rating = np.where(has_previous, get_credit_rating(previous_score), None)
+    # NO_CHANGE reports previous_rating only for a truthy previous_score
+    previous_rating = np.where(
+        ~reduction & ~increase & ~(has_previous & (previous_score != 0)), None, previous_rating
+    )
+
+    return pd.DataFrame({
+        'action_type': np.select(
+            [reduction, increase], ['REDUCTION', 'INCREASE_SUGGESTED'], default='NO_CHANGE'
+        ),
+        'previous_score': previous_score,
+        'current_score': total_score,
+        'previous_rating': previous_rating,
+        'current_rating': get_credit_rating(total_score),
+        'bucket_changed': reduction | increase,
+        'base_reduction_pct': np.where(reduction, np.round(base_reduction * 100, 1), 0.0),
+        'velocity_multiplier': np.where(reduction, velocity_multiplier, 1.0),
+        'final_reduction_pct': np.where(reduction, np.round(final_reduction * 100, 1), 0.0),
+        'suggested_increase_pct': np.where(increase, np.round(suggested_increase * 100, 1), 0.0),
+        'current_credit_limit': current_limit,
+        'new_credit_limit': new_limit,
+        'limit_change_amount': np.where(reduction, np.round(reduced_limit - current_limit, 2), 0.0),
+        'is_frozen': has_active_plan | (~increase & (total_score < 500)),
+    })
+
+
+def limit_exposure_totals(limit_actions_df: pd.DataFrame) -> Dict:
+    """Portfolio exposure totals of a calculate_limit_actions_batch result"""
+    action_type = limit_actions_df['action_type']
+    current = limit_actions_df['current_credit_limit']
+    new = limit_actions_df['new_credit_limit']
+    frozen = limit_actions_df['is_frozen']
+    increase = action_type == 'INCREASE_SUGGESTED'
+
+    return {
+        'lines': len(limit_actions_df),
+        'current_exposure': float(current.sum()),
+        'new_exposure': float(new.sum()),
+        'exposure_change': float(limit_actions_df['limit_change_amount'].sum()),
+        'reductions': int((action_type == 'REDUCTION').sum()),
+        'increases_suggested': int(increase.sum()),
+        'suggested_increase_amount': float(
+            (current[increase] * limit_actions_df['suggested_increase_pct'][increase] / 100).sum()
+        ),
+        'frozen_lines': int(frozen.sum()),
+        'frozen_exposure': float(new[frozen].sum()),
+    }
+
+
+# ============================================================================
+# AS-OF-DATE BACKFILL (SCORE PANEL)
+# ============================================================================
+
+def month_end_dates(end_date: datetime, months: int) -> List[pd.Timestamp]:
+    """The last `months` month-ends up to end_date (oldest first)"""
+    last = pd.Timestamp(end_date).normalize()
+    if last != last + pd.offsets.MonthEnd(0):
+        last = last - pd.offsets.MonthEnd(1)
+    return [last - pd.offsets.MonthEnd(k) for k in range(months - 1, -1, -1)]
+
+
+def _calendar_day(value) -> int:
+    """Calendar day as days since 1970-01-01 (the PaymentStore day ordinal)"""
+    return pd.Timestamp(value).value // 86_400_000_000_000
+
+
+class _AsOfIndex:
+    """Dated rows sorted by client and day, with per-client cutoffs by date"""
+
+    def __init__(self, codes: np.ndarray, days: np.ndarray, n_clients: int):
+        days = days.astype(np.int64)
+        keep = np.flatnonzero((codes >= 0) & (days != MISSING_DAY))
+        # Same day: later store rows first, so the store's first row comes last
+        self.order = keep[np.lexsort((-keep, days[keep], codes[keep]))]
+        self.codes = codes[self.order]
+        self.days = days[self.order]
+
+        counts = np.bincount(self.codes, minlength=n_clients)
+        self.start = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+
+        # Sort key client * span + day: one searchsorted finds every client's cutoff
+        self._first = int(self.days.min()) if len(self.days) else 0
+        self._span = (int(self.days.max()) - self._first + 2) if len(self.days) else 2
+        self._key = self.codes * self._span + (self.days - self._first)
+        self._client_base = np.arange(n_clients, dtype=np.int64) * self._span
+
+    def cut(self, day: int) -> np.ndarray:
+        """Per client, the position after its last row dated on or before day"""
+        offset = min(max(day - self._first, -1), self._span - 2)
+        return np.searchsorted(self._key, self._client_base + offset, side='right')
+
+    def running(self, values: np.ndarray) -> np.ndarray:
+        """Running sum with a leading 0, for between()"""
+        return np.concatenate([[0.0], np.cumsum(values, dtype=float)])
+
+    @staticmethod
+    def between(running: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Sum of the rows in [start, end) from a running sum"""
+        return running[end] - running[start]
+
+
+@timed_stage('score_panel', rows=lambda clients_df, *args, **kwargs: len(clients_df))
+def calculate_score_panel(
+    clients_df: pd.DataFrame,
+    payments_df: Union[pd.DataFrame, PaymentStore],
+    payment_plans_df: Union[pd.DataFrame, PaymentStore],
+    reference_dates: List[datetime],
+    clients_as_of: datetime = None
+) -> pd.DataFrame:
+    """
+    Score every client as of each reference date (client x date panel)
+
+    For each date only the payments and plans dated up to that day count,
+    and months_as_client (given as of clients_as_of, default today) is moved
+    back in 30-day months; clients that were not yet clients are left out.
+    Payment and plan dates are calendar dates, as in PaymentStore, and
+    undated rows are ignored. Plans keep their current plan_status.
+
+    Payments are sorted once by client and date with running sums of the
+    DPD statistics, so each date is a few searchsorted lookups over the
+    clients instead of a pass over the payments. On a date on or after the
+    last payment, the components equal calculate_credit_scores_batch with a
+    PaymentStore.
+
+    Returns one row per client and date (clients_df order, dates ascending)
+    with the calculate_credit_scores_batch columns plus reference_date and
+    previous_score (total_score at the client's previous panel date, for
+    calculate_limit_actions_batch).
+    """
+    if len(reference_dates) == 0:
+        raise ValueError("reference_dates is empty")
+    if clients_as_of is None:
+        clients_as_of = datetime.now()
+
+    clients = clients_df.drop_duplicates('client_id')
+    client_ids = pd.Index(clients['client_id'])
+    months_as_client = clients['months_as_client'].to_numpy(dtype=float)
+    n = len(client_ids)
+
+    pay_store = payments_df if isinstance(payments_df, PaymentStore) else PaymentStore(payments_df)
+    if isinstance(payment_plans_df, PaymentStore):
+        plan_store = payment_plans_df
+    else:
+        plan_store = PaymentStore(
+            pd.DataFrame(columns=['client_id', 'payment_date', 'days_past_due']), payment_plans_df
+        )
+
+    # Payments: client, date ascending; on the same day the store's first
+    # row (the latest payment) last
+    pay = _AsOfIndex(
+        client_ids.get_indexer(pay_store.client_ids)[pay_store.pay_client], pay_store.pay_day, n
+    )
+    dpd = pay_store.pay_dpd[pay.order].astype(float)
+    latest_dpd = np.append(dpd, np.nan)  # position len(dpd) = no payment
+    quality = _payment_quality_scores(dpd)
+    has_dpd = ~np.isnan(dpd)
+    dpd_sum = pay.running(np.where(has_dpd, dpd, 0.0))
+    dpd_sumsq = pay.running(np.where(has_dpd, dpd, 0.0) ** 2)
+    dpd_count = pay.running(has_dpd)
+
+    # months_ago = round(days / 30, 1) moves in 3-day steps, so within each
+    # class of day % 3 the recency weight 1.5 ** months_ago is a fixed
+    # multiple of 1.5 ** (-days / 30): one running sum per class.
+    # Weights are relative to the client's first payment (<= 1) so the
+    # running sums stay well scaled.
+    decay = 1.5 ** (-(pay.days - pay.days[pay.start[pay.codes]]) / 30)
+    day_class = pay.days % 3
+    weight_sum = [pay.running(np.where(day_class == r, decay, 0.0)) for r in range(3)]
+    quality_sum = [pay.running(np.where(day_class == r, decay * quality, 0.0)) for r in range(3)]
+
+    plan = _AsOfIndex(
+        client_ids.get_indexer(plan_store.client_ids)[plan_store.plan_client], plan_store.plan_day, n
+    )
+    status = plan_store.plan_status[plan.order]
+    latest_plan_day = np.append(plan.days, MISSING_DAY)  # position len(plan.days) = no plan
+    status_count = [plan.running(status == k) for k in range(len(PLAN_STATUSES))]
+
+    reference_dates = sorted(pd.Timestamp(d) for d in reference_dates)
+    as_of_day = _calendar_day(clients_as_of)
+    by_date = []
+    for reference_date in reference_dates:
+        day = _calendar_day(reference_date)
+        months_then = months_as_client - (as_of_day - day) / 30
+
+        # Windows: months_ago <= 1 / 6 / 12  <=>  up to 31 / 181 / 361 days old
+        end = pay.cut(day)
+        start_6mo = pay.cut(day - 182)
+        start_1mo = pay.cut(day - 32)
+        payment_count = end - pay.start
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            numerator = denominator = 0.0
+            for r in range(3):
+                factor = 1.5 ** (-((day + 1 - r) % 3) / 30)
+                numerator = numerator + factor * pay.between(quality_sum[r], pay.start, end)
+                denominator = denominator + factor * pay.between(weight_sum[r], pay.start, end)
+            timeliness = numerator / denominator
+
+            count_6mo = pay.between(dpd_count, start_6mo, end)
+            sum_6mo = pay.between(dpd_sum, start_6mo, end)
+            dpd_6mo = sum_6mo / count_6mo
+            var_6mo = (pay.between(dpd_sumsq, start_6mo, end) - sum_6mo * dpd_6mo) / (count_6mo - 1)
+            std_6mo = np.where(count_6mo > 1, np.sqrt(np.maximum(var_6mo, 0)), np.nan)
+            dpd_1mo = pay.between(dpd_sum, start_1mo, end) / pay.between(dpd_count, start_1mo, end)
+
+        payments_6mo = end - start_6mo
+        recent_dpd = latest_dpd[np.where(payments_6mo > 0, end - 1, len(dpd))]
+
+        plan_end = plan.cut(day)
+        plan_start_12mo = plan.cut(day - 362)
+        active, completed, defaulted = (
+            plan.between(counts, plan_start_12mo, plan_end).astype(np.int64) for counts in status_count
+        )
+        last_plan_day = latest_plan_day[np.where(plan_end > plan.start, plan_end - 1, len(plan.days))]
+
+        components = _components_from_stats(
+            months_then, payment_count, timeliness,
+            end - start_1mo, payments_6mo, dpd_1mo, dpd_6mo, std_6mo, recent_dpd,
+            active, completed, defaulted,
+            PaymentStore.months_ago(last_plan_day, reference_date)
+        )
+        components['months_as_client'] = months_then
+        by_date.append(components)
+
+    # (client, date) grid in client-major order, dates ascending; a client
+    # joins the panel at its first date as a client (months_as_client >= 0)
+    grid = {
+        column: np.stack([components[column] for components in by_date], axis=1)
+        for column in by_date[0]
+    }
+    in_panel = grid['months_as_client'] >= 0
+
+    total = grid['payment_performance'] + grid['payment_plan_history'] + grid['deterioration_velocity']
+    previous = np.full(total.shape, np.nan)
+    previous[:, 1:] = np.where(in_panel[:, :-1], np.round(total[:, :-1], 1), np.nan)
+
+    rows = in_panel.ravel()
+    results = pd.DataFrame({
+        'reference_date': np.tile(np.array(reference_dates, dtype='datetime64[ns]'), n)[rows],
+        'client_id': np.repeat(client_ids.to_numpy(), len(reference_dates))[rows],
+        'months_as_client': np.round(grid.pop('months_as_client').ravel()[rows], 1),
+    })
+    for column, values in grid.items():
+        results[column] = values.ravel()[rows]
+    results['total_score'] = np.round(total.ravel()[rows], 1)
+    results['credit_rating'] = get_credit_rating(total.ravel()[rows])
+    results['previous_score'] = previous.ravel()[rows]
+
+    return results
+
+
 # ============================================================================
 # DPD ALERT SYSTEM
 # ============================================================================
@@ -546,7 +1333,7 @@ def check_dpd_alerts(
     client_id: str,
     client_name: str,
     current_dpd: float,
-    payment_history_df: pd.DataFrame,
+    payment_history_df: Union[pd.DataFrame, ClientPaymentIndex, PaymentStore, MonthlyDPDRollup],
     reference_date: datetime = None
 ) -> Dict:
     """
@@ -559,16 +1346,29 @@ def check_dpd_alerts(
         reference_date = datetime.now()
 
     # Get 3-month payment history
-    client_payments = payment_history_df[payment_history_df['client_id'] == client_id].copy()
-    client_payments['payment_date'] = pd.to_datetime(client_payments['payment_date'])
-    client_payments['months_ago'] = (
-        (reference_date - client_payments['payment_date']).dt.days / 30
-    ).round(1)
+    if isinstance(payment_history_df, MonthlyDPDRollup):
+        payment_history_df.check_reference(reference_date)
+        recent_count, avg_dpd_3mo, std_dpd_3mo, _ = payment_history_df.client_window(client_id, 3)
+    elif isinstance(payment_history_df, PaymentStore):
+        pay = payment_history_df.payment_slice(client_id)
+        months_ago = PaymentStore.months_ago(payment_history_df.pay_day[pay], reference_date)
+        recent_3mo = pd.DataFrame({
+            'days_past_due': payment_history_df.pay_dpd[pay][months_ago <= 3].astype(float)
+        })
+    else:
+        client_payments = _client_payments(payment_history_df, client_id)
+        months_ago = (
+            (reference_date - pd.to_datetime(client_payments['payment_date'])).dt.days / 30
+        ).round(1)
+        recent_3mo = client_payments[months_ago <= 3]
 
-    recent_3mo = client_payments[client_payments['months_ago'] <= 3]
+    if not isinstance(payment_history_df, MonthlyDPDRollup):
+        recent_count = len(recent_3mo)
+        avg_dpd_3mo = recent_3mo['days_past_due'].mean()
+        std_dpd_3mo = recent_3mo['days_past_due'].std()
 
     # NEW CLIENT - FPD Prevention with tiered thresholds
-    if len(recent_3mo) < 3:
+    if recent_count < 3:
         if current_dpd >= 30:
             return {
                 'alert': True,
@@ -614,9 +1414,6 @@ def check_dpd_alerts(
         return {'alert': False}
 
     # ESTABLISHED CLIENT - Z-score pattern analysis
-    avg_dpd_3mo = recent_3mo['days_past_due'].mean()
-    std_dpd_3mo = recent_3mo['days_past_due'].std()
-
     # Apply minimum std_dev of 3 days
     # Prevents false alerts for ultra-consistent payers
     safe_std = max(std_dpd_3mo, 3.0)
@@ -651,31 +1448,159 @@ def check_dpd_alerts(
     }
 
 
+# severity, tier, reason (None = current DPD vs 3mo avg), action, block_new_orders, freeze_account
+_DPD_ALERT_RULES = [
+    # NEW CLIENT (< 3 payments in 3 months)
+    ('CRITICAL', 'ACTION', 'New client 30+ days late - FPD in progress',
+     '🚨 FREEZE account + Collections immediately', True, True),
+    ('HIGH', 'ACTION', 'New client 15-29 days late - FPD prevention',
+     '📞 Immediate call + BLOCK NEW ORDERS', True, False),
+    ('WATCH', 'MONITOR', 'New client 7-14 days late - early intervention',
+     '📞 Call today + educate on payment terms', False, False),
+    # ESTABLISHED CLIENT (z-score > 3.0 / 2.0 / 1.5)
+    ('CRITICAL', 'ACTION', None, '🚨 Contact IMMEDIATELY', False, False),
+    ('HIGH', 'ACTION', None, '📞 Contact today', False, False),
+    ('WATCH', 'MONITOR', None, '👁️ Watch list + automated reminder', False, False),
+]
+
+
+def _alert_window_stats(
+    payment_history_df: Union[pd.DataFrame, ClientPaymentIndex, PaymentStore, MonthlyDPDRollup],
+    client_ids: pd.Index,
+    reference_date: datetime
+):
+    """Payments, mean and std of DPD in the last 3 months for each of client_ids (one grouped pass)"""
+    n = len(client_ids)
+
+    if isinstance(payment_history_df, PaymentStore):
+        payment_history_df = payment_history_df.dpd_rollup(reference_date)
+
+    if isinstance(payment_history_df, MonthlyDPDRollup):
+        payment_history_df.check_reference(reference_date)
+        window = payment_history_df.window(3)
+        pos = pd.Index(payment_history_df.client_ids).get_indexer(client_ids)
+        found = pos >= 0
+        return (
+            np.where(found, window['rows'][pos], 0),
+            np.where(found, window['mean'][pos], np.nan),
+            np.where(found, window['std'][pos], np.nan)
+        )
+
+    if isinstance(payment_history_df, ClientPaymentIndex):
+        payment_history_df = payment_history_df.payments
+
+    codes = client_ids.get_indexer(payment_history_df['client_id'])
+    in_window = (codes >= 0) & (_months_ago(payment_history_df['payment_date'], reference_date) <= 3)
+    _, mean, std = _group_mean_std(
+        codes, payment_history_df['days_past_due'].to_numpy(dtype=float), in_window, n
+    )
+    return np.bincount(codes[in_window], minlength=n), mean, std
+
+
+@timed_stage('dpd_alerts_batch', rows=lambda active_loans_df, *args, **kwargs: len(active_loans_df))
+def check_dpd_alerts_batch(
+    active_loans_df: pd.DataFrame,
+    payment_history_df: Union[pd.DataFrame, ClientPaymentIndex, PaymentStore, MonthlyDPDRollup],
+    reference_date: datetime = None
+) -> pd.DataFrame:
+    """
+    Vectorized check_dpd_alerts for every active overdue loan
+
+    3-month DPD stats are computed once per client and joined to the loans;
+    severity / tier / action come from vectorized conditions. Returns the
+    alerts in loan order with the same columns as pd.DataFrame of the
+    check_dpd_alerts results (empty DataFrame if there are none).
+    """
+    if reference_date is None:
+        reference_date = datetime.now()
+
+    loans = active_loans_df[active_loans_df['current_dpd'] > 0]
+    client_ids = pd.Index(loans['client_id'].unique())
+    recent_count, avg_3mo, std_3mo = _alert_window_stats(payment_history_df, client_ids, reference_date)
+
+    pos = client_ids.get_indexer(loans['client_id'])
+    recent_count, avg_3mo, std_3mo = recent_count[pos], avg_3mo[pos], std_3mo[pos]
+    current_dpd = loans['current_dpd'].to_numpy(dtype=float)
+
+    # Minimum std_dev of 3 days, max(std, 3.0) semantics (NaN std -> no alert)
+    is_new = recent_count < 3
+    safe_std = np.where(std_3mo < 3.0, 3.0, std_3mo)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z_score = (current_dpd - avg_3mo) / safe_std
+
+    rule = np.select(
+        [
+            is_new & (current_dpd >= 30),
+            is_new & (current_dpd >= 15),
+            is_new & (current_dpd >= 7),
+            ~is_new & (z_score > 3.0),
+            ~is_new & (z_score > 2.0),
+            ~is_new & (z_score > 1.5),
+        ],
+        np.arange(len(_DPD_ALERT_RULES)),
+        default=-1
+    )
+
+    alert = rule >= 0
+    if not alert.any():
+        return pd.DataFrame()
+
+    loans = loans[alert]
+    rule, current_dpd = rule[alert], current_dpd[alert]
+    avg_3mo, z_score = avg_3mo[alert], z_score[alert]
+    established = rule >= 3
+    rules = list(zip(*_DPD_ALERT_RULES))
+
+    columns = {
+        'alert': np.ones(len(rule), dtype=bool),
+        'client_id': loans['client_id'].to_numpy(),
+        'client_name': loans['client_name'].to_numpy(),
+        'severity': np.array(rules[0])[rule],
+        'tier': np.array(rules[1])[rule],
+        'reason': [
+            f'Current DPD {dpd:.0f} days vs 3mo avg {avg:.0f} days' if est else _DPD_ALERT_RULES[r][2]
+            for r, est, dpd, avg in zip(rule, established, current_dpd, avg_3mo)
+        ],
+        'current_dpd': loans['current_dpd'].round(0).to_numpy(),
+        'z_score': (
+            np.where(established, np.round(z_score, 2), np.nan) if established.any()
+            else np.full(len(rule), None, dtype=object)
+        ),
+    }
+    pattern_columns = {
+        'avg_3mo': np.where(established, np.round(avg_3mo, 1), np.nan),
+        'deviation_days': np.where(established, np.round(current_dpd - avg_3mo, 1), np.nan),
+    }
+    action_columns = {
+        'action': np.array(rules[3], dtype=object)[rule],
+        'block_new_orders': np.array(rules[4])[rule],
+        'freeze_account': np.array(rules[5])[rule],
+    }
+
+    # Column order follows the first alert, like pd.DataFrame(list_of_alert_dicts)
+    if established[0]:
+        columns.update(pattern_columns)
+        columns.update(action_columns)
+    else:
+        columns.update(action_columns)
+        if established.any():
+            columns.update(pattern_columns)
+
+    return pd.DataFrame(columns)
+
+
+@timed_stage('dpd_alert_report', rows=lambda active_loans_df, *args, **kwargs: len(active_loans_df))
 def generate_dpd_alert_report(
     active_loans_df: pd.DataFrame,
-    payment_history_df: pd.DataFrame,
+    payment_history_df: Union[pd.DataFrame, ClientPaymentIndex, PaymentStore, MonthlyDPDRollup],
     reference_date: datetime = None
 ) -> pd.DataFrame:
     """Generate daily DPD alert report for all active overdue loans"""
-    alerts = []
-
-    for _, loan in active_loans_df.iterrows():
-        if loan['current_dpd'] > 0:
-            alert = check_dpd_alerts(
-                loan['client_id'],
-                loan['client_name'],
-                loan['current_dpd'],
-                payment_history_df,
-                reference_date
-            )
-
-            if alert['alert']:
-                alerts.append(alert)
-
-    if not alerts:
+    alerts_df = check_dpd_alerts_batch(active_loans_df, payment_history_df, reference_date)
+
+    if alerts_df.empty:
         return pd.DataFrame()
 
-    alerts_df = pd.DataFrame(alerts)
     severity_order = {'CRITICAL': 1, 'HIGH': 2, 'WATCH': 3}
     alerts_df['severity_rank'] = alerts_df['severity'].map(severity_order)
     alerts_df = alerts_df.sort_values(['severity_rank', 'current_dpd'], ascending=[True, False])
@@ -841,6 +1766,121 @@ def generate_sample_data():
     return clients, payments_df, payment_plans_df, active_loans_df, reference_date
 
 
+# Risk profiles of generate_portfolio_data: share of clients, then the
+# probability of each DPD regime per payment (on time / late / severe) and
+# the mean HCPN-like score of the profile
+PORTFOLIO_PROFILES = {
+    'good': {'share': 0.60, 'dpd_regimes': (0.85, 0.14, 0.01), 'hcpn_mean': 780},
+    'slow': {'share': 0.25, 'dpd_regimes': (0.45, 0.48, 0.07), 'hcpn_mean': 650},
+    'risky': {'share': 0.15, 'dpd_regimes': (0.25, 0.45, 0.30), 'hcpn_mean': 480},
+}
+
+
+def generate_portfolio_data(
+    n_clients: int = 10_000,
+    payments_per_client: float = 10.0,
+    seed: int = 42,
+    reference_date: datetime = None
+):
+    """
+    Generate a synthetic portfolio for benchmarks (10k - 1M+ clients)
+
+    Same tables as generate_sample_data, fully vectorized: every client gets
+    a risk profile that drives its DPD distribution (on time, 1-29 days late,
+    30-120 days late, ~1% missing), its payment plans and an HCPN-like score
+    (experian_score_normalized, 0-1000, ~20% missing). Payments are spread
+    over the client's tenure, about payments_per_client per client.
+    """
+    rng = np.random.default_rng(seed)
+    reference_date = reference_date or datetime(2024, 12, 23)
+    ref = np.datetime64(reference_date, 'D')
+
+    # CLIENT DATA
+    profile_names = list(PORTFOLIO_PROFILES)
+    profiles = rng.choice(
+        len(profile_names), size=n_clients, p=[PORTFOLIO_PROFILES[p]['share'] for p in profile_names]
+    )
+    months_as_client = np.minimum(rng.geometric(1 / 14, size=n_clients) - 1, 72)
+    credit_limit = np.round(rng.lognormal(np.log(40_000_000), 0.8, size=n_clients), -5)
+    hcpn_mean = np.array([PORTFOLIO_PROFILES[p]['hcpn_mean'] for p in profile_names])[profiles]
+    hcpn = np.clip(np.round(rng.normal(hcpn_mean, 90)), 0, 1000)
+    hcpn[rng.random(n_clients) < 0.20] = np.nan
+
+    client_ids = np.char.add('CL', np.arange(n_clients).astype(str).astype('U'))
+    clients = pd.DataFrame({
+        'client_id': client_ids,
+        'client_name': np.char.add('Cliente ', np.arange(n_clients).astype(str).astype('U')),
+        'cedula': (1_000_000_000 + rng.permutation(n_clients) * 37 % 9_000_000_000).astype(str),
+        'months_as_client': months_as_client,
+        'current_credit_limit': credit_limit,
+        'current_outstanding': np.round(credit_limit * rng.beta(2, 3, size=n_clients), -3),
+        'experian_score_normalized': hcpn,
+        'risk_profile': np.array(profile_names)[profiles],
+    })
+
+    # PAYMENT HISTORY: count grows with tenure, dates spread over the tenure
+    tenure_days = np.maximum(months_as_client * 30, 15)
+    expected = payments_per_client * tenure_days / tenure_days.mean()
+    counts = rng.poisson(expected)
+    owner = np.repeat(np.arange(n_clients), counts)
+    n_payments = len(owner)
+
+    age = (rng.random(n_payments) * tenure_days[owner]).astype(np.int64)
+    regime_p = np.array([PORTFOLIO_PROFILES[p]['dpd_regimes'] for p in profile_names])[profiles[owner]]
+    regime = (rng.random(n_payments)[:, None] > regime_p.cumsum(axis=1)).sum(axis=1)
+    dpd = np.select(
+        [regime == 0, regime == 1],
+        [rng.integers(-3, 1, n_payments), rng.integers(1, 30, n_payments)],
+        rng.integers(30, 121, n_payments)
+    ).astype(float)
+    dpd[rng.random(n_payments) < 0.01] = np.nan
+
+    payment_date = ref - age.astype('timedelta64[D]')
+    payments_df = pd.DataFrame({
+        'client_id': client_ids[owner],
+        'payment_date': payment_date.astype('datetime64[ns]'),
+        'due_date': (payment_date - np.nan_to_num(dpd).astype('timedelta64[D]')).astype('datetime64[ns]'),
+        'days_past_due': dpd,
+        'payment_amount': np.round(credit_limit[owner] * rng.uniform(0.05, 0.25, n_payments), -3),
+    })
+
+    # PAYMENT PLANS: more frequent and worse for riskier profiles
+    plan_rate = np.array([0.05, 0.15, 0.35])[profiles]
+    plan_counts = rng.binomial(2, plan_rate)
+    plan_owner = np.repeat(np.arange(n_clients), plan_counts)
+    n_plans = len(plan_owner)
+    status_p = np.array([
+        [0.15, 0.80, 0.05],  # good
+        [0.30, 0.60, 0.10],  # slow
+        [0.35, 0.35, 0.30],  # risky
+    ])[profiles[plan_owner]]
+    status = (rng.random(n_plans)[:, None] > status_p.cumsum(axis=1)).sum(axis=1)
+    plan_start = ref - rng.integers(0, 540, n_plans).astype('timedelta64[D]')
+    plan_end = plan_start + rng.integers(30, 120, n_plans).astype('timedelta64[D]')
+
+    payment_plans_df = pd.DataFrame({
+        'client_id': client_ids[plan_owner],
+        'plan_start_date': plan_start.astype('datetime64[ns]'),
+        'plan_end_date': pd.Series(plan_end.astype('datetime64[ns]')).where(status != 0),
+        'plan_status': np.array(PLAN_STATUSES)[np.minimum(status, 2)],
+    })
+
+    # ACTIVE LOANS (for DPD alerts): one per client with outstanding balance
+    current_dpd = np.where(
+        rng.random(n_clients) < np.array([0.20, 0.45, 0.70])[profiles],
+        rng.integers(1, 90, n_clients), 0
+    )
+    active_loans_df = pd.DataFrame({
+        'client_id': client_ids,
+        'client_name': clients['client_name'],
+        'loan_id': np.char.add('L', np.arange(n_clients).astype(str).astype('U')),
+        'current_dpd': current_dpd,
+        'due_date': (ref - current_dpd.astype('timedelta64[D]')).astype('datetime64[ns]'),
+    })
+
+    return clients, payments_df, payment_plans_df, active_loans_df, reference_date
+
+
 # ============================================================================
 # MAIN EXECUTION
 # ============================================================================
@@ -866,6 +1906,7 @@ def main():
     print("="*80)
 
     results = []
+    payment_index = ClientPaymentIndex(payments_df)
 
     for _, client in clients.iterrows():
         print(f"\n{'='*80}")
@@ -874,7 +1915,7 @@ def main():
 
         result = calculate_credit_score(
             client.to_dict(),
-            payments_df,
+            payment_index,
             payment_plans_df,
             previous_score=None,
             reference_date=reference_date
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+PLATAM Prediction Client
+========================
+
+Non-blocking access to the Vertex AI endpoint from the async FastAPI
+handlers. aiplatform.Endpoint.predict is synchronous: awaited directly in
+an `async def` handler, one slow round trip stalls the event loop and every
+other in-flight request.
+
+AsyncPredictionClient runs predict in its own bounded thread pool, so the
+event loop keeps serving while up to max_concurrency calls wait on Vertex
+in parallel (more queue for a free thread). The endpoint's gRPC channel is
+shared by all threads, so the calls reuse its keep-alive connection.
+
+    client = AsyncPredictionClient(endpoint)
+    predictions = await client.predict([instance])
+
+The limit comes from PLATAM_VERTEX_CONCURRENCY (default 16).
+
+PredictionBatcher sits in front of the client and micro-batches requests:
+instances that arrive within a short window (PLATAM_BATCH_WINDOW_MS,
+default 5 ms), or until the batch is full (PLATAM_BATCH_MAX_SIZE, default
+32), go to Vertex as one predict call, and each waiting request gets its
+own row back. A burst of n requests costs ~n / 32 round trips instead of n.
+If a batch call fails, the batch is split in halves and retried, so one
+bad instance only fails its own request (predict_isolated, also used by
+the batch endpoint for its own multi-instance calls).
+
+    batcher = PredictionBatcher(client)
+    probabilities = await batcher.predict_one(instance)
+
+Local backend: with a LocalModel (the model.pkl / scaler.pkl /
+feature_names.json of the Vertex custom container, see
+vertex_custom_py311/predictor.py) the client predicts in process, with the
+same float32 -> scaler -> predict_proba steps, in about a millisecond and
+without batching. If the local model fails on a call, that call falls back
+to the endpoint. PLATAM_ML_BACKEND=local selects it (load_local_model
+returns None, i.e. Vertex only, when the artifacts or joblib are missing).
+
+    client = AsyncPredictionClient(endpoint, local_model=load_local_model('vertex_custom_py311'))
+
+Autor: PLATAM Data Team
+"""
+
+import os
+import json
+import asyncio
+import logging
+import functools
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple, Union
+
+from stage_timing import stage
+
+ENV_VAR = 'PLATAM_VERTEX_CONCURRENCY'
+DEFAULT_CONCURRENCY = 16
+
+WINDOW_ENV_VAR = 'PLATAM_BATCH_WINDOW_MS'
+DEFAULT_WINDOW_MS = 5.0
+MAX_BATCH_ENV_VAR = 'PLATAM_BATCH_MAX_SIZE'
+DEFAULT_MAX_BATCH = 32
+
+BACKEND_ENV_VAR = 'PLATAM_ML_BACKEND'   # 'vertex' (default) or 'local'
+MODEL_DIR_ENV_VAR = 'PLATAM_MODEL_DIR'
+DEFAULT_MODEL_DIR = 'vertex_custom_py311'
+
+logger = logging.getLogger(__name__)
+
+
+def _env_number(var: str, default, cast):
+    try:
+        return cast(os.environ.get(var, default))
+    except ValueError:
+        return default
+
+
+def concurrency_from_env(var: str = ENV_VAR, default: int = DEFAULT_CONCURRENCY) -> int:
+    """Concurrent Vertex calls allowed per worker process"""
+    return max(1, _env_number(var, default, int))
+
+
+# ============================================================================
+# LOCAL MODEL
+# ============================================================================
+
+class LocalModel:
+    """The Vertex custom container's model, scaler and feature names, loaded in process"""
+
+    def __init__(self, model_dir, expected_features: Optional[Sequence[str]] = None):
+        import joblib  # only needed by the local backend
+
+        model_dir = Path(model_dir)
+        self.model = joblib.load(model_dir / 'model.pkl')
+        self.scaler = joblib.load(model_dir / 'scaler.pkl')
+        with open(model_dir / 'feature_names.json', encoding='utf-8') as f:
+            self.feature_names = json.load(f)
+
+        if expected_features is not None and list(expected_features) != self.feature_names:
+            raise ValueError(f"{model_dir}/feature_names.json does not match the API's feature order")
+
+    def predict(self, instances: List[List[float]]) -> List[List[float]]:
+        """Class probabilities per instance, as the custom predictor computes them"""
+        X = np.array(instances, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} features, got shape {X.shape}")
+        return self.model.predict_proba(self.scaler.transform(X)).tolist()
+
+
+def load_local_model(model_dir=None, expected_features: Optional[Sequence[str]] = None) -> Optional[LocalModel]:
+    """LocalModel from model_dir (PLATAM_MODEL_DIR), or None if it cannot be loaded"""
+    model_dir = model_dir or os.environ.get(MODEL_DIR_ENV_VAR, DEFAULT_MODEL_DIR)
+    try:
+        return LocalModel(model_dir, expected_features)
+    except Exception as e:
+        logger.warning(f"Local model not available ({model_dir}): {e}; using Vertex AI")
+        return None
+
+
+def backend_from_env(var: str = BACKEND_ENV_VAR) -> str:
+    """'local' or 'vertex'"""
+    return 'local' if os.environ.get(var, 'vertex').strip().lower() == 'local' else 'vertex'
+
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+class AsyncPredictionClient:
+    """Awaitable predictions: in-process local model, else endpoint.predict on a bounded thread pool"""
+
+    def __init__(self, endpoint, max_concurrency: Optional[int] = None,
+                 local_model: Optional[LocalModel] = None):
+        self.endpoint = endpoint
+        self.local_model = local_model
+        self.max_concurrency = max_concurrency or concurrency_from_env()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix='vertex-predict'
+        )
+
+    @property
+    def connected(self) -> bool:
+        return self.endpoint is not None
+
+    @property
+    def backend(self) -> str:
+        return 'local' if self.local_model is not None else 'vertex'
+
+    def predict_remote(self, instances: List[List[float]]) -> List[List[float]]:
+        """Blocking Vertex call: predictions of the instances (one list of class probabilities each)"""
+        if self.endpoint is None:
+            raise RuntimeError("Vertex AI endpoint is not connected")
+        return self.endpoint.predict(instances=instances).predictions
+
+    def _predict_local(self, instances: List[List[float]]) -> Optional[List[List[float]]]:
+        """Local model predictions, or None (logged) if it fails"""
+        try:
+            with stage('local_model.predict', rows=len(instances)):
+                return self.local_model.predict(instances)
+        except Exception as e:
+            logger.warning(f"Local model failed, falling back to Vertex AI: {e}")
+            return None
+
+    def predict_sync(self, instances: List[List[float]]) -> List[List[float]]:
+        """Blocking call: local model if configured, Vertex otherwise or if it fails"""
+        if self.local_model is not None:
+            predictions = self._predict_local(instances)
+            if predictions is not None:
+                return predictions
+        return self.predict_remote(instances)
+
+    async def predict(self, instances: List[List[float]]) -> List[List[float]]:
+        """
+        predict_sync without blocking the event loop: the local model runs
+        inline (about a millisecond), Vertex calls on the thread pool
+        """
+        if self.local_model is not None:
+            predictions = self._predict_local(instances)
+            if predictions is not None:
+                return predictions
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self.predict_remote, instances)
+        )
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+# ============================================================================
+# MICRO-BATCHING
+# ============================================================================
+
+async def predict_isolated(client: AsyncPredictionClient,
+                           instances: List[List[float]]) -> List[Union[List[float], Exception]]:
+    """
+    client.predict over the instances, with a prediction or an exception per
+    instance: if a call fails (or returns another number of rows), the
+    instances are bisected and retried (at most 2n - 2 more calls if every
+    call fails) until the error reaches only the instances that fail on
+    their own.
+    """
+    if not instances:
+        return []
+    try:
+        with stage('vertex.predict_batch', rows=len(instances)):
+            predictions = await client.predict(instances)
+        if len(predictions) != len(instances):
+            raise RuntimeError(f"Vertex AI returned {len(predictions)} predictions for {len(instances)} instances")
+        return list(predictions)
+    except Exception as e:
+        if len(instances) == 1:
+            return [e]
+        logger.warning(f"Prediction batch of {len(instances)} failed ({e}); retrying in halves")
+        half = len(instances) // 2
+        first, second = await asyncio.gather(
+            predict_isolated(client, instances[:half]), predict_isolated(client, instances[half:])
+        )
+        return first + second
+
+
+class PredictionBatcher:
+    """
+    Combines the instances of concurrent requests into one predict call.
+    A batch is sent when it reaches max_batch or window_ms after its first
+    instance; window_ms=0 (or max_batch=1) sends every instance on its own.
+    """
+
+    def __init__(self, client: AsyncPredictionClient, window_ms: Optional[float] = None,
+                 max_batch: Optional[int] = None):
+        self.client = client
+        if window_ms is None:
+            window_ms = _env_number(WINDOW_ENV_VAR, DEFAULT_WINDOW_MS, float)
+        if max_batch is None:
+            max_batch = _env_number(MAX_BATCH_ENV_VAR, DEFAULT_MAX_BATCH, int)
+        self.window = max(0.0, window_ms) / 1000
+        self.max_batch = max(1, max_batch)
+
+        self._pending: List[Tuple[List[float], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def predict_one(self, instance: List[float]) -> List[float]:
+        """Prediction (class probabilities) of one instance"""
+        # In process there is no round trip to save: no batching window
+        if self.window == 0 or self.max_batch == 1 or self.client.local_model is not None:
+            return (await self.client.predict([instance]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((instance, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            # The loop only keeps weak references to tasks
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[List[float], asyncio.Future]]):
+        """
+        One predict call for the batch (predict_isolated); fans the rows back,
+        or the error to the requests whose instance fails on its own
+        """
+        # Requests cancelled while waiting already have their future done
+        batch = [(instance, future) for instance, future in batch if not future.done()]
+        results = await predict_isolated(self.client, [instance for instance, _ in batch])
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+PLATAM Prediction Snapshot
+==========================
+
+Precomputed ML predictions (PREDICCIONES_ML_V2.2.csv, written by
+generar_predicciones_ml_bigquery.py) served from memory by the scoring API,
+so a lookup of a client whose features have not changed needs no Vertex AI
+round trip.
+
+Each prediction carries the fingerprint of the feature row it was computed
+from. The API fingerprints the row it is about to send; a prediction is
+reused only when cédula, fingerprint and model version all match, and
+Vertex is called otherwise (new client, changed features, no fingerprint).
+
+    snapshot = PredictionSnapshot.from_csv('PREDICCIONES_ML_V2.2.csv')
+    instance = prepare_instance(client_data)
+    cached = snapshot.lookup(client_data['cedula'], feature_fingerprint(instance))
+    # -> (prob_default, prob_no_default) or None
+
+Autor: PLATAM Data Team
+"""
+
+import struct
+import hashlib
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from cedula_index import normalize_cedula, normalize_cedulas
+
+MODEL_VERSION = 'v2.2'
+
+# Features of model v2.2, in the order the endpoint expects them
+FEATURE_ORDER = [
+    'platam_score', 'experian_score_normalized',
+    'score_payment_performance', 'score_payment_plan', 'score_deterioration',
+    'payment_count', 'months_as_client',
+    'pct_early', 'pct_late',
+    'peso_platam_usado', 'peso_hcpn_usado',
+    'tiene_plan_activo', 'tiene_plan_default', 'tiene_plan_pendiente', 'num_planes',
+    'genero_encoded', 'edad', 'ciudad_encoded',
+    'cuota_mensual', 'creditos_vigentes', 'creditos_mora', 'hist_neg_12m'
+]
+
+# Value of a missing feature (0 for the rest)
+MISSING_DEFAULTS = {'edad': 35}
+
+
+def prepare_instance(row, feature_order: List[str] = FEATURE_ORDER) -> List[float]:
+    """Feature row for the model: floats in feature_order, missing values replaced"""
+    instance = []
+    for feature in feature_order:
+        value = row.get(feature, 0)
+        if value is None or pd.isna(value):
+            value = MISSING_DEFAULTS.get(feature, 0)
+        if isinstance(value, bool):
+            value = int(value)
+        instance.append(float(value))
+    return instance
+
+
+def feature_fingerprint(instance: List[float]) -> str:
+    """Stable hash of a prepared feature row (exact float64 values and their order)"""
+    packed = struct.pack(f'<{len(instance)}d', *instance)
+    return hashlib.blake2b(packed, digest_size=8).hexdigest()
+
+
+class PredictionSnapshot:
+    """Normalized cédula -> (fingerprint, prob_default, prob_no_default) of one model version"""
+
+    def __init__(self, predictions: Dict[str, Tuple[str, float, float]],
+                 model_version: str = MODEL_VERSION):
+        self.predictions = predictions
+        self.model_version = model_version
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_csv(cls, path, model_version: str = MODEL_VERSION) -> 'PredictionSnapshot':
+        """
+        Loads the predictions of model_version that have a fingerprint and a
+        probability (error rows and files from before the fingerprint column
+        are skipped: those clients go to Vertex)
+        """
+        # round_trip: the probabilities read back bit for bit as Vertex returned them
+        df = pd.read_csv(path, dtype={'cedula': str}, float_precision='round_trip')
+        if 'feature_fingerprint' not in df.columns:
+            return cls({}, model_version)
+
+        usable = (
+            (df['model_version'].astype(str) == model_version)
+            & df['feature_fingerprint'].notna()
+            & df['prob_default'].notna()
+            & df['prob_no_default'].notna()
+        )
+        df = df[usable].assign(cedula=normalize_cedulas(df.loc[usable, 'cedula']))
+        df = df[df['cedula'].notna()].drop_duplicates('cedula', keep='first')
+
+        predictions = dict(zip(
+            df['cedula'],
+            zip(df['feature_fingerprint'], df['prob_default'].astype(float),
+                df['prob_no_default'].astype(float))
+        ))
+        return cls(predictions, model_version)
+
+    def __len__(self) -> int:
+        return len(self.predictions)
+
+    def lookup(self, cedula, fingerprint: str) -> Optional[Tuple[float, float]]:
+        """(prob_default, prob_no_default) if precomputed for exactly these features"""
+        entry = self.predictions.get(normalize_cedula(cedula))
+        if entry is None or entry[0] != fingerprint:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def stats(self) -> Dict:
+        return {
+            'predictions': len(self.predictions),
+            'model_version': self.model_version,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,126 @@
+"""
+PLATAM Score Bands
+==================
+
+Declarative threshold tables for ratings and score bands, shared by the
+scoring engine (internal_credit_score.py, hybrid_scoring.py), the APIs and
+the report scripts.
+
+Every table is a list of ascending lower edges and one label per band:
+a value belongs to the band of the highest edge it reaches (edge <= value),
+which is what the original "if score >= 900 ... elif ..." and
+"if prob < 0.10 ... elif ..." chains compute. Missing values (None / NaN)
+get the table's missing label (the chain's fall-through branch, unless the
+caller checked pd.isna first).
+
+A table answers scalars and whole columns through np.searchsorted:
+
+    CREDIT_RATING(742.5)              -> 'B'
+    CREDIT_RATING(df['total_score'])  -> Series of ratings, same index
+
+Autor: PLATAM Data Team
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Sequence
+
+
+class BandTable:
+    """Lower-inclusive bands: labels[i] for edges[i - 1] <= value < edges[i]"""
+
+    def __init__(self, edges: Sequence[float], labels: Sequence, missing):
+        if len(labels) != len(edges) + 1:
+            raise ValueError(f"{len(edges)} edges need {len(edges) + 1} labels, got {len(labels)}")
+        if list(edges) != sorted(edges):
+            raise ValueError("edges must be ascending")
+
+        self.edges = np.asarray(edges, dtype=float)
+        self.labels = list(labels)
+        self.missing = missing
+        self._labels = np.array(self.labels + [missing])
+
+    def index(self, values) -> np.ndarray:
+        """Band index of each value (len(labels) for missing values)"""
+        values = np.asarray(values).ravel()
+        if values.dtype.kind not in 'biuf':
+            values = pd.to_numeric(values.astype(object), errors='coerce')
+        values = values.astype(float)
+        index = np.searchsorted(self.edges, values, side='right')
+        index[np.isnan(values)] = len(self.labels)
+        return index
+
+    def __call__(self, values):
+        """Label of a scalar, or labels of an array / Series (Series keep their index)"""
+        if np.ndim(values) == 0:
+            if values is None or values != values:
+                return self.missing
+            return self.labels[int(np.searchsorted(self.edges, float(values), side='right'))]
+
+        labels = self._labels[self.index(values)]
+        if isinstance(values, pd.Series):
+            return pd.Series(labels, index=values.index, name=values.name)
+        return labels
+
+
+# ============================================================================
+# PLATAM SCORE (0-1000)
+# ============================================================================
+
+SCORE_EDGES = [500, 550, 600, 650, 700, 750, 800, 850, 900]
+
+# get_credit_rating (internal_credit_score.py)
+CREDIT_RATING = BandTable(
+    SCORE_EDGES,
+    ['D/F', 'C-', 'C', 'C+', 'B-', 'B', 'B+', 'A-', 'A', 'A+'],
+    missing='D/F'
+)
+
+# get_score_bucket: 1 = A+ ... 10 = D/F (lower = better)
+SCORE_BUCKET = BandTable(SCORE_EDGES, [10, 9, 8, 7, 6, 5, 4, 3, 2, 1], missing=10)
+
+# calculate_velocity_multiplier (deterioration velocity, 0-250)
+VELOCITY_MULTIPLIER = BandTable(
+    [75, 125, 175, 212.5, 237.5],
+    [3.0, 2.5, 1.7, 1.3, 1.0, 0.8],
+    missing=3.0
+)
+
+# get_hybrid_rating (hybrid_scoring.py): D and F below C-
+HYBRID_RATING = BandTable(
+    [450] + SCORE_EDGES,
+    ['F', 'D', 'C-', 'C', 'C+', 'B-', 'B', 'B+', 'A-', 'A', 'A+'],
+    missing='F'
+)
+
+# get_credit_rating of the report scripts (06, 07, 10): D+ / D / F, N/A if missing
+REPORT_RATING = BandTable(
+    [400, 450] + SCORE_EDGES,
+    ['F', 'D', 'D+', 'C-', 'C', 'C+', 'B-', 'B', 'B+', 'A-', 'A', 'A+'],
+    missing='N/A'
+)
+
+# categorize_hybrid_score (APIs)
+HYBRID_CATEGORY = BandTable(
+    [450, 550, 650, 750],
+    ['Bajo', 'Regular', 'Medio', 'Bueno', 'Excelente'],
+    missing='Bajo'
+)
+
+# ============================================================================
+# DEFAULT PROBABILITY (0-1)
+# ============================================================================
+
+# calculate_risk_level (APIs)
+RISK_LEVEL = BandTable(
+    [0.10, 0.20, 0.40, 0.60],
+    ['Muy Bajo', 'Bajo', 'Medio', 'Alto', 'Muy Alto'],
+    missing='Muy Alto'
+)
+
+# get_attention_level (APIs)
+ATTENTION_LEVEL = BandTable(
+    [0.20, 0.40, 0.60],
+    ['Monitoreo normal', 'Atención moderada', 'Seguimiento cercano', 'Alerta crítica'],
+    missing='Monitoreo normal'
+)
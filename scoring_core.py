@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+PLATAM Scoring Core
+===================
+
+Dependency-free building blocks of the PLATAM and hybrid scores, shared by
+internal_credit_score.py, client_score_state.py, hybrid_scoring.py and the
+two cloud functions. It only imports the standard library, so a cloud
+function cold start that needs nothing else does not pay for importing
+pandas / numpy.
+
+- Numerics: is_missing, mean, pstd and round1 reproduce pd.isna, np.mean,
+  np.std and np.round(x, 1) on scalars / small lists bit for bit (mean and
+  pstd use NumPy's pairwise summation)
+- PLATAM components: payment_quality_score, maturity_weights,
+  pattern_break_penalty, payment_plan_points, deterioration_points
+- Hybrid: maturity_category, platam_weight and dynamic_hybrid_score
+
+Autor: PLATAM Data Team
+"""
+
+import math
+from typing import Dict, Optional, Sequence, Tuple
+
+# ============================================================================
+# NUMERICS (same results as pandas / NumPy)
+# ============================================================================
+
+# NumPy sums blocks of up to 128 values with 8 accumulators
+_PAIRWISE_BLOCK = 128
+
+
+def is_missing(value) -> bool:
+    """pd.isna for a scalar: None, NaN, NaT or pd.NA"""
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        # pd.NA != pd.NA is pd.NA, which has no truth value
+        return True
+
+
+def _pairwise_sum(values: Sequence[float], start: int, n: int) -> float:
+    """NumPy's pairwise summation of values[start:start + n]"""
+    if n < 8:
+        total = 0.0
+        for i in range(start, start + n):
+            total += values[i]
+        return total
+    if n <= _PAIRWISE_BLOCK:
+        acc = [float(v) for v in values[start:start + 8]]
+        end = start + n - n % 8
+        for i in range(start + 8, end, 8):
+            for j in range(8):
+                acc[j] += values[i + j]
+        total = ((acc[0] + acc[1]) + (acc[2] + acc[3])) + ((acc[4] + acc[5]) + (acc[6] + acc[7]))
+        for i in range(end, start + n):
+            total += values[i]
+        return total
+    half = n // 2
+    half -= half % 8
+    return _pairwise_sum(values, start, half) + _pairwise_sum(values, start + half, n - half)
+
+
+def pairwise_sum(values: Sequence[float]) -> float:
+    """np.sum of a list of numbers (float64, pairwise summation)"""
+    values = [float(v) for v in values]
+    return 0.0 + _pairwise_sum(values, 0, len(values))
+
+
+def mean(values: Sequence[float]) -> float:
+    """np.mean of a list of numbers (NaN if empty)"""
+    if len(values) == 0:
+        return math.nan
+    return pairwise_sum(values) / len(values)
+
+
+def pstd(values: Sequence[float], ddof: int = 0) -> float:
+    """np.std of a list of numbers (population std unless ddof=1)"""
+    n = len(values)
+    if n - ddof <= 0:
+        return math.nan
+    values = [float(v) for v in values]
+    center = pairwise_sum(values) / n
+    squares = [(v - center) * (v - center) for v in values]
+    return math.sqrt(pairwise_sum(squares) / (n - ddof))
+
+
+def round1(value: float) -> float:
+    """np.round(value, 1) (round half to even on value * 10, not decimal rounding; NaN / inf unchanged)"""
+    if not math.isfinite(value):
+        return value
+    return round(value * 10) / 10
+
+
+def months_ago(days: int) -> float:
+    """round(days / 30, 1) exactly as NumPy/pandas compute it"""
+    return round(days / 30 * 10) / 10
+
+
+# ============================================================================
+# PLATAM SCORE COMPONENTS
+# ============================================================================
+
+def payment_quality_score(dpd: float) -> float:
+    """Score (0-100) of one payment by days past due"""
+    if dpd <= 0:
+        return 100
+    elif dpd <= 15:
+        return 100 - (dpd * 3)
+    elif dpd <= 30:
+        return 55 - (dpd * 2)
+    elif dpd <= 60:
+        return max(0, 30 - dpd)
+    else:
+        return 0
+
+
+def maturity_weights(months_as_client: float) -> Tuple[float, float]:
+    """(timeliness_weight, pattern_weight) of the payment performance by client maturity"""
+    if months_as_client < 6:
+        return 0.85, 0.15
+    elif months_as_client < 12:
+        return 0.70, 0.30
+    else:
+        return 0.50, 0.50
+
+
+def pattern_break_penalty(z_score: float) -> int:
+    """Pattern score penalty for a latest payment z_score standard deviations off the mean"""
+    if z_score <= 1.5:
+        return 0
+    elif z_score <= 2.5:
+        return 15
+    elif z_score <= 3.5:
+        return 35
+    else:
+        return 60
+
+
+def payment_plan_points(active_plans: int, completed_plans: int, defaulted_plans: int) -> int:
+    """Payment plan history score (0-150) from the plan counts of the last 12 months"""
+    score = 150 - active_plans * 50 + completed_plans * 30 - defaulted_plans * 100
+    return max(0, min(150, score))
+
+
+def deterioration_points(trend_delta: float) -> float:
+    """Deterioration velocity score (0-250) from the 1-month minus 6-month mean DPD"""
+    base_score = max(0, min(100, 100 - (trend_delta * 3)))
+    return base_score * 2.5
+
+
+# ============================================================================
+# HYBRID WEIGHTS
+# ============================================================================
+
+MATURITY_CATEGORIES = ('muy_nuevo', 'nuevo', 'intermedio', 'establecido', 'maduro')
+
+# Upper bound (months as client, exclusive) of each category but the last
+MATURITY_MONTHS = (3, 6, 12, 24)
+
+# PLATAM weight by maturity when the client has an HCPN score
+PLATAM_WEIGHTS = {
+    'muy_nuevo': 0.30,
+    'nuevo': 0.40,
+    'intermedio': 0.50,
+    'establecido': 0.60,
+    'maduro': 0.70
+}
+
+MIN_RELIABLE_PAYMENTS = 5     # fewer payments: -10% PLATAM weight, one category down
+MATURE_PAYMENTS = 10          # twice as many: one category up
+WIDE_HISTORY_PAYMENTS = 20    # at least this many: +10% PLATAM weight
+HISTORY_BONUS = 0.10
+HISTORY_PENALTY = -0.10
+MIN_PLATAM_WEIGHT = 0.20
+MAX_PLATAM_WEIGHT = 0.80
+
+
+def maturity_category(
+    months_as_client: float,
+    payment_count: Optional[float] = None,
+    months_thresholds: Sequence[float] = MATURITY_MONTHS,
+    mature_payments: int = MATURE_PAYMENTS,
+    min_reliable_payments: int = MIN_RELIABLE_PAYMENTS
+) -> str:
+    """
+    Maturity category by months as client. With payment_count, a new client
+    with many payments moves one category up and an established one with
+    few payments one category down (hybrid_scoring); without it, months only
+    (cloud functions).
+    """
+    index = len(months_thresholds)
+    for i, threshold in enumerate(months_thresholds):
+        if months_as_client < threshold:
+            index = i
+            break
+
+    if payment_count is not None:
+        if payment_count >= mature_payments * 2 and index <= 1:
+            index += 1
+        if payment_count < min_reliable_payments and index >= 3:
+            index -= 1
+
+    return MATURITY_CATEGORIES[index]
+
+
+def platam_weight(
+    category: str,
+    payment_count: float,
+    weights: Dict[str, float] = PLATAM_WEIGHTS,
+    bonus: float = HISTORY_BONUS,
+    penalty: float = HISTORY_PENALTY,
+    wide_history_payments: int = WIDE_HISTORY_PAYMENTS,
+    min_reliable_payments: int = MIN_RELIABLE_PAYMENTS
+) -> float:
+    """PLATAM weight (20%-80%) for a client with HCPN: base by maturity plus history adjustment"""
+    weight = weights[category]
+    if payment_count >= wide_history_payments:
+        weight += bonus
+    elif payment_count < min_reliable_payments:
+        weight += penalty
+    return max(MIN_PLATAM_WEIGHT, min(MAX_PLATAM_WEIGHT, weight))
+
+
+def dynamic_hybrid_score(
+    platam_score: float,
+    hcpn_score: Optional[float],
+    months_as_client: float,
+    payment_count: float,
+    zero_hcpn_is_missing: bool = False
+) -> Dict:
+    """
+    Hybrid score of the cloud functions: 100% PLATAM without HCPN, else the
+    dynamic PLATAM weight of a months-only maturity category
+    """
+    categoria = maturity_category(months_as_client)
+
+    if is_missing(hcpn_score) or (zero_hcpn_is_missing and hcpn_score == 0):
+        peso_platam = 1.0
+        peso_hcpn = 0.0
+        hybrid_score = platam_score
+    else:
+        peso_platam = platam_weight(categoria, payment_count)
+        peso_hcpn = 1.0 - peso_platam
+        hybrid_score = (platam_score * peso_platam) + (hcpn_score * peso_hcpn)
+
+    return {
+        'hybrid_score': round(hybrid_score, 1),
+        'peso_platam': peso_platam,
+        'peso_hcpn': peso_hcpn,
+        'categoria': categoria
+    }
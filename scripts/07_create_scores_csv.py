@@ -18,44 +18,25 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import logging
+import sys
+
+# Añadir path raíz al sys.path para importar módulos
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from score_bands import REPORT_RATING
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
 # Paths
-BASE_DIR = Path(__file__).parent.parent
 PROCESSED_DIR = BASE_DIR / 'data' / 'processed'
 SCORES_FILE = PROCESSED_DIR / 'platam_scores.csv'
 OUTPUT_CSV = BASE_DIR / 'SCORES_COMPARACION.csv'
 
 def get_credit_rating(score):
-    """Asigna rating crediticio según score"""
-    if pd.isna(score):
-        return 'N/A'
-    if score >= 900:
-        return 'A+'
-    elif score >= 850:
-        return 'A'
-    elif score >= 800:
-        return 'A-'
-    elif score >= 750:
-        return 'B+'
-    elif score >= 700:
-        return 'B'
-    elif score >= 650:
-        return 'B-'
-    elif score >= 600:
-        return 'C+'
-    elif score >= 550:
-        return 'C'
-    elif score >= 500:
-        return 'C-'
-    elif score >= 450:
-        return 'D+'
-    elif score >= 400:
-        return 'D'
-    else:
-        return 'F'
+    """Asigna rating crediticio según score (escalar o columna completa)"""
+    return REPORT_RATING(score)
 
 def create_scores_csv():
     """Crea archivo CSV con comparación de scores"""
@@ -106,7 +87,7 @@ def create_scores_csv():
     )
 
     # 8. Rating del score híbrido
-    csv_data['rating_score_calculado'] = csv_data['score_calculado_hcpn'].apply(get_credit_rating)
+    csv_data['rating_score_calculado'] = get_credit_rating(csv_data['score_calculado_hcpn'])
 
     # 9. Componentes del score PLATAM
     # Componentes del score PLATAM V2.0 (3 componentes)
@@ -25,7 +25,7 @@ import sys
 BASE_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(BASE_DIR))
 
-from hybrid_scoring import calculate_hybrid_scores_batch, HybridScoringConfig
+from hybrid_scoring import calculate_hybrid_scores_batch, HybridScoringConfig, render_estrategias
 from internal_credit_score import get_credit_rating
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -87,11 +87,12 @@ def calculate_hybrid_scores():
         platam_col='platam_score',
         hcpn_col='experian_score_normalized',
         months_col='months_as_client',
-        payment_count_col='payment_count'
+        payment_count_col='payment_count',
+        estrategia_texto=False  # se guarda el código; el texto se arma al leer
     )
 
     # Calcular rating del score híbrido
-    df_hybrid['hybrid_rating'] = df_hybrid['hybrid_score'].apply(get_credit_rating)
+    df_hybrid['hybrid_rating'] = get_credit_rating(df_hybrid['hybrid_score'])
 
     # Estadísticas
     logger.info("\n" + "="*80)
@@ -112,7 +113,9 @@ def calculate_hybrid_scores():
 
     # Distribución por estrategia
     logger.info(f"\n📋 Distribución por Estrategia:")
-    estrategia_dist = df_hybrid['estrategia_hibrido'].value_counts()
+    estrategia_dist = pd.Series(
+        render_estrategias(df_hybrid['estrategia_codigo'], df_hybrid['payment_count'])
+    ).value_counts()
     for estrategia, count in estrategia_dist.items():
         pct = count / len(df_hybrid) * 100
         logger.info(f"   {estrategia[:50]}: {count:4} ({pct:5.1f}%)")
@@ -187,7 +190,7 @@ def calculate_hybrid_scores():
     logger.info("\n✅ INFORMACIÓN DE CÁLCULO:")
     logger.info("  • peso_platam_usado - Peso usado para PLATAM (0-1)")
     logger.info("  • peso_hcpn_usado - Peso usado para HCPN (0-1)")
-    logger.info("  • estrategia_hibrido - Estrategia de cálculo aplicada")
+    logger.info("  • estrategia_codigo - Estrategia de cálculo aplicada (texto con agregar_estrategia_texto)")
     logger.info("  • categoria_madurez - Categoría del cliente")
 
     logger.info("\n" + "="*80)
@@ -17,12 +17,18 @@ import seaborn as sns
 import numpy as np
 from pathlib import Path
 import logging
+import sys
+
+# Añadir path raíz al sys.path para importar módulos
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from hybrid_scoring import agregar_estrategia_texto
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
 # Paths
-BASE_DIR = Path(__file__).parent.parent
 PROCESSED_DIR = BASE_DIR / 'data' / 'processed'
 CHARTS_DIR = BASE_DIR / 'charts'
 HYBRID_FILE = PROCESSED_DIR / 'hybrid_scores.csv'
@@ -235,7 +241,7 @@ def create_rating_comparison():
 
 def create_weight_analysis():
     """Análisis de pesos dinámicos del híbrido"""
-    df = pd.read_csv(HYBRID_FILE)
+    df = agregar_estrategia_texto(pd.read_csv(HYBRID_FILE))
 
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
 
@@ -20,44 +20,26 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import logging
+import sys
+
+# Añadir path raíz al sys.path para importar módulos
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from score_bands import REPORT_RATING
+from hybrid_scoring import agregar_estrategia_texto
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
 # Paths
-BASE_DIR = Path(__file__).parent.parent
 PROCESSED_DIR = BASE_DIR / 'data' / 'processed'
 HYBRID_FILE = PROCESSED_DIR / 'hybrid_scores.csv'
 OUTPUT_FILE = BASE_DIR / 'DASHBOARD_SCORING_DINAMICO.csv'
 
 def get_credit_rating(score):
-    """Asigna rating crediticio según score"""
-    if pd.isna(score):
-        return 'N/A'
-    if score >= 900:
-        return 'A+'
-    elif score >= 850:
-        return 'A'
-    elif score >= 800:
-        return 'A-'
-    elif score >= 750:
-        return 'B+'
-    elif score >= 700:
-        return 'B'
-    elif score >= 650:
-        return 'B-'
-    elif score >= 600:
-        return 'C+'
-    elif score >= 550:
-        return 'C'
-    elif score >= 500:
-        return 'C-'
-    elif score >= 450:
-        return 'D+'
-    elif score >= 400:
-        return 'D'
-    else:
-        return 'F'
+    """Asigna rating crediticio según score (escalar o columna completa)"""
+    return REPORT_RATING(score)
 
 def categorize_dpd(dpd):
     """Categoriza días de mora"""
@@ -128,7 +110,7 @@ def create_dynamic_dashboard_csv():
 
     # Cargar datos híbridos
     logger.info(f"\n1. Cargando datos híbridos...")
-    df = pd.read_csv(HYBRID_FILE)
+    df = agregar_estrategia_texto(pd.read_csv(HYBRID_FILE))
     logger.info(f"   ✓ Cargados {len(df):,} clientes")
 
     # Crear DataFrame para dashboard
@@ -154,7 +136,7 @@ def create_dynamic_dashboard_csv():
 
     # Ratings
     dashboard['rating_platam'] = df['platam_rating']
-    dashboard['rating_hcpn'] = df['experian_score_normalized'].apply(get_credit_rating)
+    dashboard['rating_hcpn'] = get_credit_rating(df['experian_score_normalized'])
     dashboard['rating_hibrido'] = df['hybrid_rating']
 
     # ========================================================================
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Barrido what-if de pesos sobre todo el portafolio
+
+Versión batch del simulador de Excel (11_create_interactive_simulator.py):
+en lugar de recalcular 100 clientes de muestra con fórmulas, evalúa una
+grilla de escenarios (pesos PLATAM por madurez, bonus / penalización por
+historial y máximos de componentes) contra todos los clientes en un solo
+cálculo vectorizado (weight_sweep.py).
+
+Por escenario reporta:
+- Distribución de ratings híbridos
+- Aprobados (score híbrido >= UMBRAL_APROBACION)
+- Tasa de default de aprobados / rechazados y por rating (default_flag)
+
+Usage:
+    python scripts/12_weight_sweep.py
+"""
+
+import pandas as pd
+from pathlib import Path
+import logging
+import sys
+
+# Añadir path raíz al sys.path para importar módulos
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from weight_sweep import scenario_grid, sweep
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+# Paths
+SCORES_FILE = BASE_DIR / 'SCORES_V2_ANALISIS_COMPLETO.csv'   # componentes + default_flag
+OUTPUT_SUMMARY = BASE_DIR / 'WEIGHT_SWEEP_ESCENARIOS.csv'
+OUTPUT_RATINGS = BASE_DIR / 'WEIGHT_SWEEP_RATINGS.csv'
+
+# Score híbrido mínimo para aprobar (bajo 500 las APIs marcan "score bajo")
+UMBRAL_APROBACION = 500
+
+# Grilla de escenarios (None = valor actual de HybridScoringConfig)
+PESOS_PLATAM = [None] + [
+    {'establecido': establecido, 'maduro': maduro}
+    for establecido, maduro in [(0.50, 0.60), (0.60, 0.80), (0.70, 0.80)]
+] + [
+    {'muy_nuevo': 0.20, 'nuevo': 0.30},
+    {'muy_nuevo': 0.40, 'nuevo': 0.50},
+]
+MAXIMOS_COMPONENTES = [
+    None,
+    {'score_payment_performance': 500, 'score_deterioration': 350},
+    {'score_payment_performance': 700, 'score_deterioration': 150},
+    {'score_payment_plan': 250, 'score_deterioration': 150},
+]
+BONUS = [None, 0.0, 0.15]
+PENALIZACION = [None, 0.0, -0.20]
+
+
+def run_weight_sweep():
+    """Evalúa la grilla de escenarios y guarda los reportes"""
+
+    logger.info("="*80)
+    logger.info("BARRIDO WHAT-IF DE PESOS")
+    logger.info("="*80)
+
+    logger.info(f"\n1. Cargando datos...")
+    df = pd.read_csv(SCORES_FILE)
+    logger.info(f"   ✓ {len(df):,} clientes, {int(df['default_flag'].sum())} con default")
+
+    scenarios = scenario_grid(
+        pesos_platam=PESOS_PLATAM,
+        component_maxima=MAXIMOS_COMPONENTES,
+        bonus=BONUS,
+        penalty=PENALIZACION,
+    )
+    logger.info(f"\n2. Evaluando {len(scenarios)} escenarios (umbral de aprobación: {UMBRAL_APROBACION})...")
+    results = sweep(df, scenarios, approval_score=UMBRAL_APROBACION)
+    summary = results['summary']
+
+    summary.to_csv(OUTPUT_SUMMARY, index=False, encoding='utf-8-sig')
+    results['ratings'].to_csv(OUTPUT_RATINGS, index=False, encoding='utf-8-sig')
+    logger.info(f"   ✓ Guardado: {OUTPUT_SUMMARY.name}")
+    logger.info(f"   ✓ Guardado: {OUTPUT_RATINGS.name}")
+
+    base = summary.iloc[0]
+    logger.info(f"\n3. Escenario actual:")
+    logger.info(f"   • Aprobados: {base['approved']:,} ({base['approval_rate']*100:.1f}%)")
+    logger.info(f"   • Tasa de default aprobados: {base['default_rate_approved']*100:.2f}%")
+    logger.info(f"   • Tasa de default rechazados: {base['default_rate_rejected']*100:.2f}%")
+
+    logger.info(f"\n4. Escenarios con menor tasa de default entre aprobados:")
+    mejores = summary.sort_values(['default_rate_approved', 'approved'], ascending=[True, False]).head(10)
+    for _, row in mejores.iterrows():
+        logger.info(
+            f"   • {row['default_rate_approved']*100:5.2f}% default, "
+            f"{row['approved']:,} aprobados - {row['scenario']}"
+        )
+
+    logger.info("\n" + "="*80)
+    logger.info("✓ BARRIDO COMPLETADO")
+    logger.info("="*80)
+
+    return results
+
+
+if __name__ == '__main__':
+    run_weight_sweep()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Backfill de scores históricos (panel cliente x fecha)
+
+Calcula el score de todos los clientes a cada cierre de mes de los últimos
+N meses en una sola pasada, usando solo los pagos y planes registrados hasta
+cada fecha. Cada fila trae el score del cierre anterior (previous_score) y
+las acciones de límite resultantes, para backtests de la política de límites.
+
+Usage:
+    python scripts/backfill_score_panel.py
+    python scripts/backfill_score_panel.py --months 12 --end-date 2024-12-31
+
+Output:
+    data/processed/score_panel_<timestamp>.csv
+    data/processed/score_panel_latest.csv
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from datetime import datetime
+import logging
+
+# Importar funciones del código de scoring actualizado
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+from internal_credit_score import (
+    calculate_score_panel,
+    calculate_limit_actions_batch,
+    month_end_dates
+)
+from calculate_scores import ScoringCalculator, PROCESSED_DIR
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def build_panel(calculator, months, end_date):
+    """Panel de scores a cada cierre de mes, con acciones de límite"""
+    clients_df = calculator._prepare_clients()
+    dates = month_end_dates(end_date, months)
+    logger.info(
+        f"\n[2/3] Calculando panel: {len(clients_df):,} clientes x {len(dates)} fechas "
+        f"({dates[0].date()} → {dates[-1].date()})..."
+    )
+
+    panel = calculate_score_panel(
+        clients_df,
+        calculator.payment_store,
+        calculator.payment_store,
+        dates,
+        calculator.reference_date
+    )
+
+    # Acciones de límite contra el cierre anterior (límite actual del cliente)
+    current_limit = panel['client_id'].map(
+        clients_df.drop_duplicates('client_id').set_index('client_id')['current_credit_limit']
+    )
+    limit_df = calculate_limit_actions_batch(
+        panel['total_score'],
+        panel['previous_score'],
+        panel['deterioration_velocity'],
+        current_limit,
+        panel['active_plans'] > 0
+    )
+    panel['action_type'] = limit_df['action_type']
+    panel['limit_change_pct'] = limit_df['final_reduction_pct'].where(
+        limit_df['final_reduction_pct'] != 0, limit_df['suggested_increase_pct']
+    )
+    panel['is_frozen'] = limit_df['is_frozen']
+
+    logger.info(f"  ✓ {len(panel):,} filas (cliente x fecha)")
+    return panel
+
+
+def save_panel(panel):
+    """Guarda el panel con timestamp y como versión latest"""
+    logger.info("\n[3/3] Guardando resultados...")
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_file = PROCESSED_DIR / f'score_panel_{timestamp}.csv'
+    panel.to_csv(output_file, index=False)
+    logger.info(f"  ✓ Guardado: {output_file}")
+
+    latest_file = PROCESSED_DIR / 'score_panel_latest.csv'
+    panel.to_csv(latest_file, index=False)
+    logger.info(f"  ✓ Guardado: {latest_file}")
+
+    return output_file
+
+
+def print_summary(panel):
+    """Resumen por fecha: clientes, score promedio y acciones de límite"""
+    logger.info("\n" + "="*60)
+    logger.info("RESUMEN DEL PANEL HISTÓRICO")
+    logger.info("="*60)
+
+    summary = panel.groupby('reference_date').agg(
+        clientes=('client_id', 'size'),
+        score_promedio=('total_score', 'mean'),
+        reducciones=('action_type', lambda a: (a == 'REDUCTION').sum()),
+        aumentos=('action_type', lambda a: (a == 'INCREASE_SUGGESTED').sum())
+    )
+    for row in summary.itertuples():
+        logger.info(
+            f"  {row.Index.date()}: {row.clientes:6,} clientes | score {row.score_promedio:6.1f} | "
+            f"{row.reducciones:5,} reducciones | {row.aumentos:5,} aumentos"
+        )
+
+
+def parse_args():
+    """Argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Backfill de scores a cierres de mes')
+    parser.add_argument('--months', type=int, default=24, help='Cierres de mes a calcular (default: 24)')
+    parser.add_argument(
+        '--end-date',
+        type=lambda value: datetime.strptime(value, '%Y-%m-%d'),
+        help='Último día del backfill (YYYY-MM-DD, default: hoy)'
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    args = parse_args()
+    calculator = ScoringCalculator()
+    end_date = args.end_date or calculator.reference_date
+
+    # 1. Cargar datos
+    calculator.load_data()
+
+    # 2. Panel cliente x fecha
+    panel = build_panel(calculator, args.months, end_date)
+
+    # 3. Guardar y resumir
+    output_file = save_panel(panel)
+    print_summary(panel)
+
+    logger.info("\n" + "="*60)
+    logger.info("✅ BACKFILL COMPLETADO")
+    logger.info("="*60)
+    logger.info(f"\nResultados guardados en:")
+    logger.info(f"  {output_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Benchmark del scoring a escala de portafolio
+
+Genera portafolios sintéticos (generate_portfolio_data) de varios tamaños y
+mide cada etapa: generación, store de pagos, cada componente
+(calculate_payment_performance, calculate_payment_plan_score,
+calculate_deterioration_velocity) y calculate_credit_score cliente a
+cliente sobre una muestra, calculate_credit_scores_batch,
+calculate_hybrid_scores_batch, generate_dpd_alert_report y la búsqueda por
+cédula que usan las APIs (CedulaIndex.get y ClientSnapshot.get).
+
+Los resultados quedan en JSON (versión del código, entorno y segundos por
+etapa y tamaño) para comparar entre versiones con --compare.
+
+Usage:
+    python scripts/benchmark_scoring.py
+    python scripts/benchmark_scoring.py --sizes 10000 100000 1000000 --repeat 3
+    python scripts/benchmark_scoring.py --compare data/benchmarks/benchmark_20250101_120000.json
+
+Output:
+    data/benchmarks/benchmark_<timestamp>.json
+    data/benchmarks/benchmark_latest.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from datetime import datetime
+import logging
+
+# Importar funciones del código de scoring actualizado
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+from internal_credit_score import (
+    generate_portfolio_data,
+    calculate_payment_performance,
+    calculate_payment_plan_score,
+    calculate_deterioration_velocity,
+    calculate_credit_score,
+    calculate_credit_scores_batch,
+    generate_dpd_alert_report,
+    PaymentStore
+)
+from hybrid_scoring import calculate_hybrid_scores_batch
+from cedula_index import CedulaIndex
+from client_snapshot import ClientSnapshot, write_snapshot
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# El batch híbrido registra progreso cada 500 clientes
+logging.getLogger('hybrid_scoring').setLevel(logging.WARNING)
+
+# Paths
+BENCHMARK_DIR = Path('data/benchmarks')
+
+
+def timed(func, repeat=1):
+    """Mejor tiempo (segundos) de `repeat` ejecuciones y el último resultado"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class ScoringBenchmark:
+    """Mide cada etapa del scoring sobre portafolios sintéticos"""
+
+    def __init__(self, sizes, payments_per_client=10.0, repeat=1, loop_clients=1000,
+                 lookups=1000, seed=42):
+        self.sizes = sizes
+        self.payments_per_client = payments_per_client
+        self.repeat = repeat
+        self.loop_clients = loop_clients
+        self.lookups = lookups
+        self.seed = seed
+        self.results = []
+
+    def record(self, size, stage, seconds, rows, **extra):
+        """Agrega una medición (rows = filas procesadas por la etapa)"""
+        entry = {
+            'size': size,
+            'stage': stage,
+            'seconds': round(seconds, 6),
+            'rows': int(rows),
+            'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None,
+            **extra
+        }
+        self.results.append(entry)
+        logger.info(f"  {stage:32s} {seconds:10.3f} s  ({rows:,} filas)")
+
+    def run(self):
+        """Ejecuta todas las etapas para cada tamaño"""
+        for size in self.sizes:
+            logger.info(f"\n[{size:,} clientes]")
+            self.run_size(size)
+        return self.results
+
+    def run_size(self, size):
+        """Etapas para un portafolio de `size` clientes"""
+        seconds, data = timed(
+            lambda: generate_portfolio_data(size, self.payments_per_client, seed=self.seed)
+        )
+        clients, payments_df, payment_plans_df, active_loans_df, reference_date = data
+        self.record(size, 'generate_portfolio_data', seconds, len(payments_df),
+                    payments=len(payments_df), payment_plans=len(payment_plans_df))
+
+        seconds, store = timed(lambda: PaymentStore(payments_df, payment_plans_df), self.repeat)
+        self.record(size, 'payment_store', seconds, len(payments_df) + len(payment_plans_df))
+
+        # Cliente a cliente: muestra de loop_clients (tiempo por cliente en per_client),
+        # cada componente por separado y el score completo
+        sample = clients.head(self.loop_clients).to_dict('records')
+        components = [
+            ('calculate_payment_performance', lambda client: calculate_payment_performance(
+                store, client['client_id'], client['months_as_client'], reference_date)),
+            ('calculate_payment_plan_score', lambda client: calculate_payment_plan_score(
+                store, client['client_id'], reference_date)),
+            ('calculate_deterioration_velocity', lambda client: calculate_deterioration_velocity(
+                store, client['client_id'], reference_date)),
+        ]
+        for stage, component in components:
+            seconds, _ = timed(lambda: [component(client) for client in sample], self.repeat)
+            self.record(size, stage, seconds, len(sample),
+                        per_client=round(seconds / max(len(sample), 1), 9))
+
+        seconds, _ = timed(lambda: [
+            calculate_credit_score(client, store, store, reference_date=reference_date)
+            for client in sample
+        ], self.repeat)
+        self.record(size, 'calculate_credit_score', seconds, len(sample),
+                    per_client=round(seconds / max(len(sample), 1), 9))
+
+        seconds, scores_df = timed(
+            lambda: calculate_credit_scores_batch(clients, store, store, reference_date), self.repeat
+        )
+        self.record(size, 'calculate_credit_scores_batch', seconds, len(clients))
+
+        # Entrada del híbrido: score PLATAM + HCPN, como SCORES_V2_ANALISIS_COMPLETO.csv
+        hybrid_input = pd.DataFrame({
+            'cedula': clients['cedula'],
+            'client_name': clients['client_name'],
+            'platam_score': scores_df['total_score'],
+            'experian_score_normalized': clients['experian_score_normalized'],
+            'months_as_client': clients['months_as_client'],
+            'payment_id_count': scores_df['payment_count'],
+        })
+        seconds, hybrid_df = timed(lambda: calculate_hybrid_scores_batch(hybrid_input), self.repeat)
+        self.record(size, 'calculate_hybrid_scores_batch', seconds, len(hybrid_input))
+
+        seconds, alerts_df = timed(
+            lambda: generate_dpd_alert_report(active_loans_df, store, reference_date), self.repeat
+        )
+        self.record(size, 'generate_dpd_alert_report', seconds, len(active_loans_df),
+                    alerts=len(alerts_df))
+
+        self.run_cedula_lookup(size, hybrid_df)
+
+    def run_cedula_lookup(self, size, hybrid_df):
+        """
+        Latencia de la búsqueda por cédula de las APIs sobre cédulas al azar
+        del portafolio: CedulaIndex (API auto-update) y ClientSnapshot (API
+        por cédula), sin importar los módulos de las APIs
+        """
+        clientes_df = hybrid_df.assign(cedula=hybrid_df['cedula'].astype(str))
+        rng = np.random.default_rng(self.seed)
+        cedulas = rng.choice(clientes_df['cedula'].to_numpy(), size=self.lookups)
+
+        seconds, index = timed(lambda: CedulaIndex(clientes_df), self.repeat)
+        self.record(size, 'cedula_index_build', seconds, len(clientes_df))
+        seconds, _ = timed(lambda: [index.get(c) for c in cedulas], self.repeat)
+        self.record(size, 'cedula_index_get', seconds, len(cedulas),
+                    per_lookup=round(seconds / max(len(cedulas), 1), 9))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'clientes.snapshot'
+            seconds, _ = timed(lambda: write_snapshot(clientes_df, path))
+            self.record(size, 'client_snapshot_write', seconds, len(clientes_df))
+            snapshot = ClientSnapshot(path)
+            seconds, _ = timed(lambda: [snapshot.get(c) for c in cedulas], self.repeat)
+            self.record(size, 'client_snapshot_get', seconds, len(cedulas),
+                        per_lookup=round(seconds / max(len(cedulas), 1), 9))
+
+
+def environment_info():
+    """Versión del código y entorno de la corrida"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def save_results(report):
+    """Guarda el reporte con timestamp y como versión latest"""
+    BENCHMARK_DIR.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_file = BENCHMARK_DIR / f'benchmark_{timestamp}.json'
+
+    for path in (output_file, BENCHMARK_DIR / 'benchmark_latest.json'):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"  ✓ Guardado: {path}")
+
+    return output_file
+
+
+def load_baseline(baseline_file):
+    """Reporte anterior (se lee antes de guardar, por si es benchmark_latest.json)"""
+    with open(baseline_file) as f:
+        return json.load(f)
+
+
+def compare_results(results, baseline, baseline_file):
+    """Speedup por etapa y tamaño contra un reporte anterior"""
+    previous = {(r['size'], r['stage']): r['seconds'] for r in baseline['results']}
+
+    logger.info("\n" + "="*60)
+    logger.info(f"COMPARACIÓN CONTRA {baseline_file} ({baseline['environment'].get('git_commit')})")
+    logger.info("="*60)
+    for r in results:
+        before = previous.get((r['size'], r['stage']))
+        if before is None:
+            continue
+        speedup = before / r['seconds'] if r['seconds'] > 0 else float('inf')
+        logger.info(
+            f"  {r['size']:>9,} {r['stage']:32s} {before:9.3f} s → {r['seconds']:9.3f} s  ({speedup:5.2f}x)"
+        )
+
+
+def parse_args():
+    """Argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Benchmark del scoring con portafolios sintéticos')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000],
+                        help='Tamaños de portafolio en clientes (default: 10000 100000)')
+    parser.add_argument('--payments-per-client', type=float, default=10.0,
+                        help='Pagos promedio por cliente (default: 10)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Repeticiones por etapa, se reporta la mejor (default: 1)')
+    parser.add_argument('--loop-clients', type=int, default=1000,
+                        help='Clientes para calculate_credit_score cliente a cliente (default: 1000)')
+    parser.add_argument('--lookups', type=int, default=1000,
+                        help='Búsquedas por cédula por índice (default: 1000)')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla del generador (default: 42)')
+    parser.add_argument('--compare', type=Path, help='Reporte JSON anterior para comparar')
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    args = parse_args()
+    baseline = load_baseline(args.compare) if args.compare else None
+
+    logger.info("="*60)
+    logger.info("BENCHMARK DE SCORING")
+    logger.info("="*60)
+
+    benchmark = ScoringBenchmark(
+        args.sizes, args.payments_per_client, args.repeat,
+        args.loop_clients, args.lookups, args.seed
+    )
+    results = benchmark.run()
+
+    report = {
+        'environment': environment_info(),
+        'parameters': {
+            'sizes': args.sizes,
+            'payments_per_client': args.payments_per_client,
+            'repeat': args.repeat,
+            'loop_clients': args.loop_clients,
+            'lookups': args.lookups,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    output_file = save_results(report)
+
+    if baseline is not None:
+        compare_results(results, baseline, args.compare)
+
+    logger.info("\n" + "="*60)
+    logger.info("✅ BENCHMARK COMPLETADO")
+    logger.info("="*60)
+    logger.info(f"\nResultados guardados en:")
+    logger.info(f"  {output_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,8 @@
 Script para calcular scoring de clientes usando datos reales
 
 Carga CSVs de data/raw/ y calcula scores usando el nuevo sistema de 3 componentes.
+Cada tabla puede venir en CSV, Parquet o Feather (dependencias en
+requirements-scripts.txt; Parquet y Feather requieren pyarrow).
 
 Sistema actualizado:
 - Payment Performance: 600 pts (60%)
@@ -11,26 +13,35 @@ Sistema actualizado:
 
 Usage:
     python scripts/calculate_scores.py
+    python scripts/calculate_scores.py --previous-date 2024-11-30
+    python scripts/calculate_scores.py --workers 0   # todos los núcleos
+    python scripts/calculate_scores.py --incremental # solo clientes con cambios
+    python scripts/calculate_scores.py --profile     # tiempos por etapa (JSON)
 """
 
 import os
 import sys
+import argparse
+import importlib.util
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import logging
 
 # Importar funciones del código de scoring actualizado
 sys.path.append(str(Path(__file__).parent.parent))
 from internal_credit_score import (
-    calculate_payment_performance,
-    calculate_payment_plan_score,
-    calculate_deterioration_velocity,
-    get_credit_rating,
-    calculate_limit_actions,
-    check_dpd_alerts,
-    generate_dpd_alert_report
+    calculate_credit_scores_batch,
+    calculate_score_panel,
+    PaymentStore,
+    calculate_limit_actions_batch,
+    limit_exposure_totals,
+    score_valid_until
 )
+from validate_data import SCHEMAS
+from stage_timing import enable, stage
 
 # Setup logging
 logging.basicConfig(
@@ -44,15 +55,123 @@ RAW_DIR = Path('data/raw')
 PROCESSED_DIR = Path('data/processed')
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
+# Columnas que usa el scoring por tabla (el resto nunca se carga)
+SCORING_COLUMNS = {
+    'clients': ['client_id', 'client_name', 'months_as_client', 'current_credit_limit'],
+    'payments': ['client_id', 'payment_date', 'days_past_due'],
+    'payment_plans': ['client_id', 'plan_start_date', 'plan_status'],
+}
+
+# Formatos de entrada en data/raw/<tabla>/
+TABLE_FORMATS = {'.parquet': 'parquet', '.feather': 'feather', '.csv': 'csv'}
+
+# Estado del modo incremental: último resultado y huella por cliente
+STATE_FILE = PROCESSED_DIR / 'scores_state.csv'
+
+# Parser CSV multihilo de Arrow si está instalado
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+
+def table_dtypes(table_name, columns):
+    """Dtypes de lectura según SCHEMAS: numéricas float64, resto texto (fechas se parsean después)"""
+    numeric = set(SCHEMAS[table_name]['numeric_columns'])
+    return {col: 'float64' if col in numeric else str for col in columns}
+
+def read_table_file(path, table_name):
+    """Lee solo las columnas de scoring de un archivo Parquet, Feather o CSV"""
+    wanted = SCORING_COLUMNS[table_name]
+    file_format = TABLE_FORMATS[path.suffix.lower()]
+
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        present = set(pq.read_schema(path).names)
+        df = pd.read_parquet(path, columns=[col for col in wanted if col in present])
+    elif file_format == 'feather':
+        import pyarrow.ipc as ipc
+        present = set(ipc.open_file(str(path)).schema.names)
+        df = pd.read_feather(path, columns=[col for col in wanted if col in present])
+    else:
+        present = set(pd.read_csv(path, nrows=0).columns)
+        columns = [col for col in wanted if col in present]
+        try:
+            df = pd.read_csv(
+                path, usecols=columns, dtype=table_dtypes(table_name, columns), engine=CSV_ENGINE
+            )
+        except (ValueError, TypeError):
+            # Valores no numéricos: leer como texto y dejarlos en NaN (como pd.to_numeric)
+            df = pd.read_csv(path, usecols=columns, dtype=str, engine=CSV_ENGINE)
+            for col in SCHEMAS[table_name]['numeric_columns']:
+                if col in df.columns:
+                    df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # client_id como texto en todos los formatos (para cruzar tablas)
+    df['client_id'] = df['client_id'].astype(str)
+    return df
+
+def client_shards(client_ids, workers):
+    """Shard de cada client_id (hash estable entre procesos y ejecuciones)"""
+    keys = pd.Series(client_ids).astype(str).to_numpy(dtype=object)
+    return (pd.util.hash_array(keys) % workers).astype(np.int64)
+
+def client_fingerprints(clients_df, payments_df, payment_plans_df):
+    """
+    Huella (hex) de cada cliente: months_as_client, límite y todas sus filas
+    de pagos y planes, en orden (client_id debe ser único en clients_df)
+    """
+    client_ids = pd.Index(clients_df['client_id'])
+    fingerprint = pd.util.hash_pandas_object(
+        clients_df[['client_id', 'months_as_client', 'current_credit_limit']], index=False
+    ).to_numpy()
+
+    for df, columns in ((payments_df, ['payment_date', 'days_past_due']),
+                        (payment_plans_df, ['plan_start_date', 'plan_status'])):
+        codes = client_ids.get_indexer(df['client_id'])
+        rows = pd.util.hash_pandas_object(df[['client_id'] + columns], index=False).to_numpy()
+        keep = np.flatnonzero(codes >= 0)
+        order = keep[np.argsort(codes[keep], kind='stable')]
+        if len(order) == 0:
+            continue
+
+        # Suma por cliente de hash(fila, posición): cambia con cualquier fila o su orden
+        codes, rows = codes[order], rows[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        position = np.arange(len(codes)) - np.repeat(starts, np.diff(np.r_[starts, len(codes)]))
+        rows = pd.util.hash_array(rows ^ position.astype(np.uint64))
+        fingerprint[codes[starts]] = pd.util.hash_array(
+            fingerprint[codes[starts]] ^ np.add.reduceat(rows, starts)
+        )
+
+    return np.array([f'{value:016x}' for value in fingerprint], dtype=object)
+
+def score_clients(clients_df, store, reference_date, previous_date=None):
+    """Componentes del score y score previo de un grupo de clientes"""
+    scores_df = calculate_credit_scores_batch(clients_df, store, store, reference_date)
+    if previous_date is None:
+        return scores_df, np.full(len(clients_df), None, dtype=object)
+
+    panel = calculate_score_panel(clients_df, store, store, [previous_date], reference_date)
+    previous = panel.set_index('client_id')['total_score']
+    return scores_df, clients_df['client_id'].map(previous).to_numpy(dtype=object)
+
+def _score_shard(clients_df, payments_df, payment_plans_df, reference_date, previous_date):
+    """Worker: arma el store solo con los pagos y planes de su shard"""
+    store = PaymentStore(payments_df, payment_plans_df)
+    return score_clients(clients_df, store, reference_date, previous_date)
+
 class ScoringCalculator:
-    def __init__(self, reference_date=None):
+    def __init__(self, reference_date=None, previous_date=None, workers=1, incremental=False):
         self.reference_date = reference_date or datetime.now()
+        self.previous_date = previous_date
+        self.workers = workers or os.cpu_count()
+        self.incremental = incremental
+        self.state_df = None
         self.clients_df = None
         self.payments_df = None
         self.payment_plans_df = None
+        self.payment_store = None
+        self.limit_exposure = None
 
     def load_data(self):
-        """Carga todos los CSVs"""
+        """Carga clients, payments y payment_plans (Parquet, Feather o CSV)"""
         logger.info("="*60)
         logger.info("PLATAM - Cálculo de Credit Scoring V2.0")
         logger.info("Sistema de 3 componentes")
@@ -69,7 +188,6 @@ class ScoringCalculator:
         self.payments_df = self._load_table(payments_path, 'payments', required=True)
         if self.payments_df is not None:
             self.payments_df['payment_date'] = pd.to_datetime(self.payments_df['payment_date'])
-            self.payments_df['due_date'] = pd.to_datetime(self.payments_df['due_date'], errors='coerce')
 
         # Payment plans (opcional)
         plans_path = RAW_DIR / 'payment_plans'
@@ -78,20 +196,28 @@ class ScoringCalculator:
             self.payment_plans_df['plan_start_date'] = pd.to_datetime(
                 self.payment_plans_df['plan_start_date']
             )
-            if 'plan_end_date' in self.payment_plans_df.columns:
-                self.payment_plans_df['plan_end_date'] = pd.to_datetime(
-                    self.payment_plans_df['plan_end_date'], errors='coerce'
-                )
         else:
             # Crear DataFrame vacío si no hay planes
-            self.payment_plans_df = pd.DataFrame(columns=[
-                'client_id', 'plan_start_date', 'plan_end_date', 'plan_status'
-            ])
+            self.payment_plans_df = pd.DataFrame(columns=SCORING_COLUMNS['payment_plans'])
+
+        # Store columnar tipado (fechas parseadas una sola vez) para el cálculo;
+        # en modo paralelo cada worker arma el de su shard, en modo incremental
+        # se arma solo con los clientes a recalcular
+        if self.workers > 1:
+            logger.info(f"  ℹ Modo paralelo: {self.workers} procesos (shards por hash de client_id)")
+        if self.incremental:
+            logger.info("  ℹ Modo incremental: se recalculan solo clientes con cambios")
+        if self.workers == 1 and not self.incremental:
+            self.payment_store = PaymentStore(self.payments_df, self.payment_plans_df)
+            logger.info(
+                f"  ✓ Store de pagos: {len(self.payment_store):,} pagos, "
+                f"{len(self.payment_store.client_ids):,} clientes"
+            )
 
         logger.info("\n✓ Datos cargados exitosamente")
 
     def _load_table(self, folder_path, table_name, required=True):
-        """Carga una tabla desde CSVs"""
+        """Carga una tabla desde sus archivos (en paralelo, solo columnas de scoring)"""
         if not folder_path.exists():
             if required:
                 logger.error(f"  ❌ Carpeta no encontrada: {folder_path}")
@@ -100,152 +226,257 @@ class ScoringCalculator:
                 logger.info(f"  ℹ {table_name}: No encontrado (opcional)")
                 return None
 
-        csv_files = list(folder_path.glob('*.csv'))
+        files = sorted(
+            path for path in folder_path.iterdir() if path.suffix.lower() in TABLE_FORMATS
+        )
 
-        if not csv_files:
+        if not files:
             if required:
-                logger.error(f"  ❌ No hay CSVs en {folder_path}")
+                logger.error(f"  ❌ No hay archivos CSV/Parquet/Feather en {folder_path}")
                 sys.exit(1)
             else:
-                logger.info(f"  ℹ {table_name}: Sin archivos CSV")
+                logger.info(f"  ℹ {table_name}: Sin archivos de datos")
                 return None
 
-        # Leer y concatenar todos los CSVs
-        dfs = []
-        for csv_file in csv_files:
+        def read(path):
             try:
-                df = pd.read_csv(csv_file)
-                dfs.append(df)
+                return read_table_file(path, table_name), None
             except Exception as e:
-                logger.error(f"  ❌ Error leyendo {csv_file}: {e}")
+                return None, e
+
+        # Leer todos los archivos en paralelo (orden de archivos preservado)
+        with ThreadPoolExecutor(max_workers=min(len(files), os.cpu_count() or 1)) as pool:
+            loaded = list(pool.map(read, files))
+
+        dfs = []
+        for path, (df, error) in zip(files, loaded):
+            if error is not None:
+                logger.error(f"  ❌ Error leyendo {path}: {error}")
                 if required:
                     sys.exit(1)
+            else:
+                dfs.append(df)
 
         if not dfs:
             return None
 
         df = pd.concat(dfs, ignore_index=True)
-        logger.info(f"  ✓ {table_name}: {len(df):,} registros de {len(csv_files)} archivo(s)")
+        logger.info(f"  ✓ {table_name}: {len(df):,} registros de {len(files)} archivo(s)")
 
         return df
 
     def calculate_scores(self):
-        """Calcula scores para todos los clientes"""
+        """Calcula scores para todos los clientes (una sola pasada sobre pagos y planes)"""
         logger.info("\n[2/4] Calculando scores con sistema de 3 componentes...")
 
-        results = []
-        total_clients = len(self.clients_df)
-
-        for idx, client_row in self.clients_df.iterrows():
-            client_id = client_row['client_id']
-
-            logger.info(f"\n  [{idx+1}/{total_clients}] Calculando score para: {client_id}")
+        clients_df = self._prepare_clients()
+        logger.info(f"  Clientes a calcular: {len(clients_df):,}")
 
-            try:
-                # Preparar datos del cliente
-                client_data = {
-                    'client_id': client_id,
-                    'client_name': client_row.get('client_name', ''),
-                    'months_as_client': int(client_row['months_as_client']),
-                    'current_credit_limit': float(client_row['current_credit_limit']),
-                    'current_outstanding': float(client_row.get('current_outstanding', 0))
-                }
-
-                # Calcular los 3 componentes del score
-                payment_perf = calculate_payment_performance(
-                    self.payments_df,
-                    client_id,
-                    client_data['months_as_client'],
-                    self.reference_date
-                )
-
-                payment_plan = calculate_payment_plan_score(
-                    self.payment_plans_df,
-                    client_id,
-                    self.reference_date
-                )
-
-                deterioration = calculate_deterioration_velocity(
-                    self.payments_df,
-                    client_id,
-                    self.reference_date
-                )
+        # Los 3 componentes del score (y el score previo) para todo el portafolio
+        if self.incremental:
+            scores_df, previous_scores = self._score_incremental(clients_df)
+        else:
+            scores_df, previous_scores = self._score(
+                clients_df, self.payments_df, self.payment_plans_df
+            )
+        if self.previous_date is not None:
+            logger.info(
+                f"  ✓ Score previo al {self.previous_date.date()}: "
+                f"{pd.notna(previous_scores).sum():,} clientes"
+            )
 
-                # Total score (suma de 3 componentes = 1000 puntos)
-                total_score = (
-                    payment_perf['total'] +
-                    payment_plan['total'] +
-                    deterioration['total']
-                )
+        # Limit actions de todo el portafolio (previous_score None sin fecha previa)
+        limit_df = calculate_limit_actions_batch(
+            scores_df['total_score'],
+            previous_scores,
+            scores_df['deterioration_velocity'],
+            clients_df['current_credit_limit'],
+            scores_df['active_plans'] > 0
+        )
+        self.limit_exposure = limit_exposure_totals(limit_df)
+
+        # final_reduction_pct or suggested_increase_pct, como el bucle por cliente:
+        # ahí NO_CHANGE (y una reducción de 0%) daba el int 0, así que la columna
+        # queda int64 si ninguna fila tiene reducción ni aumento sugerido
+        limit_change_pct = limit_df['final_reduction_pct'].where(
+            limit_df['final_reduction_pct'] != 0, limit_df['suggested_increase_pct']
+        )
+        if not (limit_change_pct != 0).any() and not (limit_df['action_type'] == 'INCREASE_SUGGESTED').any():
+            limit_change_pct = limit_change_pct.astype(np.int64)
+
+        results = pd.DataFrame({
+            'client_id': clients_df['client_id'],
+            'client_name': clients_df['client_name'],
+            'calculation_date': self.reference_date.date(),
+            'months_as_client': clients_df['months_as_client'],
+
+            # Component scores (3 componentes)
+            'payment_performance': scores_df['payment_performance'],
+            'payment_plan_history': scores_df['payment_plan_history'],
+            'deterioration_velocity': scores_df['deterioration_velocity'],
+
+            # Total
+            'total_score': scores_df['total_score'],
+            'credit_rating': scores_df['credit_rating'],
+
+            # Limit actions
+            'current_credit_limit': clients_df['current_credit_limit'],
+            'action_type': limit_df['action_type'],
+            'recommended_credit_limit': limit_df['new_credit_limit'],
+            'limit_change_pct': limit_change_pct,
+            'is_frozen': limit_df['is_frozen'],
+
+            # Key metrics - Payment Performance
+            'payment_count': scores_df['payment_count'],
+            'timeliness_score': scores_df['timeliness_score'],
+            'pattern_score': scores_df['pattern_score'],
+            'timeliness_weight': scores_df['timeliness_weight'],
+            'pattern_weight': scores_df['pattern_weight'],
+
+            # Key metrics - Deterioration Velocity
+            'dpd_1mo': scores_df['dpd_1mo'],
+            'dpd_6mo': scores_df['dpd_6mo'],
+            'trend_delta': scores_df['trend_delta'],
+            'payments_1mo': scores_df['payments_1mo'],
+            'payments_6mo': scores_df['payments_6mo'],
+
+            # Key metrics - Payment Plans
+            'active_plans': scores_df['active_plans'],
+            'completed_plans_12mo': scores_df['completed_plans_12mo'],
+            'defaulted_plans': scores_df['defaulted_plans'],
+            'months_since_last_plan': scores_df['months_since_last_plan'],
+        })
+
+        logger.info(f"  ✓ {len(results):,} scores calculados")
+
+        return results
+
+    def _score(self, clients_df, payments_df, payment_plans_df):
+        """Componentes y score previo: por shards en paralelo o con un solo store"""
+        if self.workers > 1:
+            return self._score_sharded(clients_df, payments_df, payment_plans_df)
+
+        store = self.payment_store or PaymentStore(payments_df, payment_plans_df)
+        return score_clients(clients_df, store, self.reference_date, self.previous_date)
+
+    def _score_incremental(self, clients_df):
+        """
+        Reutiliza el último resultado de los clientes cuya huella no cambió y
+        cuyo resultado sigue vigente a la fecha de cálculo (ver
+        score_valid_until); recalcula solo el resto
+        """
+        if clients_df['client_id'].duplicated().any():
+            logger.warning("  ⚠ client_id duplicados: se recalcula todo (sin estado incremental)")
+            return self._score(clients_df, self.payments_df, self.payment_plans_df)
+
+        fingerprints = client_fingerprints(clients_df, self.payments_df, self.payment_plans_df)
+        ref_day = pd.Timestamp(self.reference_date).value // 86_400_000_000_000
+        previous_key = self.previous_date.strftime('%Y-%m-%d') if self.previous_date else ''
+
+        state = self._load_state()
+        reuse = np.zeros(len(clients_df), dtype=bool)
+        if state is not None:
+            cached = state.reindex(clients_df['client_id'])
+            reuse = (
+                (cached['fingerprint'].to_numpy() == fingerprints) &
+                (cached['state_day'].to_numpy() <= ref_day) &
+                (cached['valid_until'].to_numpy() >= ref_day) &
+                (cached['previous_date'].to_numpy() == previous_key)
+            )
+        logger.info(
+            f"  Incremental: {reuse.sum():,} clientes sin cambios (reutilizados), "
+            f"{(~reuse).sum():,} a recalcular"
+        )
+
+        # Recalcular solo los clientes con cambios, con sus pagos y planes
+        changed = clients_df[~reuse].reset_index(drop=True)
+        payments_df = self.payments_df[self.payments_df['client_id'].isin(changed['client_id'])]
+        payment_plans_df = self.payment_plans_df[
+            self.payment_plans_df['client_id'].isin(changed['client_id'])
+        ]
+        new_scores, new_previous = self._score(changed, payments_df, payment_plans_df)
+
+        new_state = new_scores.assign(
+            fingerprint=fingerprints[~reuse],
+            state_day=ref_day,
+            valid_until=score_valid_until(changed, payments_df, payment_plans_df, self.reference_date),
+            previous_date=previous_key,
+            previous_score=new_previous
+        )
+        parts = [new_state]
+        if reuse.any():
+            parts.insert(0, state.loc[clients_df['client_id'][reuse]].reset_index(drop=True))
+
+        # Merge en el orden de clients_df
+        order = np.argsort(np.r_[np.flatnonzero(reuse), np.flatnonzero(~reuse)], kind='stable')
+        self.state_df = pd.concat(parts, ignore_index=True).iloc[order].reset_index(drop=True)
+
+        scores_df = self.state_df[new_scores.columns]
+        return scores_df, self.state_df['previous_score'].to_numpy(dtype=object)
+
+    def _load_state(self):
+        """Estado de la última ejecución incremental (None si no existe)"""
+        if not STATE_FILE.exists():
+            logger.info("  ℹ Sin estado incremental previo: se calculan todos los clientes")
+            return None
 
-                # Rating
-                rating = get_credit_rating(total_score)
-
-                # Limit actions (pasa previous_score como None para primera ejecución)
-                has_active_plan = payment_plan['active_plans'] > 0
-                limit_actions = calculate_limit_actions(
-                    total_score,
-                    None,  # previous_score - ajustar si tienes histórico
-                    deterioration['total'],
-                    client_data['current_credit_limit'],
-                    has_active_plan
+        state = pd.read_csv(
+            STATE_FILE,
+            dtype={'client_id': str, 'credit_rating': str, 'fingerprint': str, 'previous_date': str},
+            keep_default_na=False,
+            na_values={col: [''] for col in ('months_since_last_plan', 'previous_score')}
+        )
+        return state.set_index('client_id', drop=False)
+
+    def _score_sharded(self, clients_df, payments_df, payment_plans_df):
+        """Reparte clientes, pagos y planes por shard en un pool de procesos"""
+        shards = client_shards(clients_df['client_id'], self.workers)
+        payment_shards = client_shards(payments_df['client_id'], self.workers)
+        plan_shards = client_shards(payment_plans_df['client_id'], self.workers)
+
+        used = [k for k in range(self.workers) if (shards == k).any()]
+        if not used:
+            store = PaymentStore(payments_df, payment_plans_df)
+            return score_clients(clients_df, store, self.reference_date, self.previous_date)
+
+        with ProcessPoolExecutor(max_workers=len(used)) as pool:
+            futures = [
+                pool.submit(
+                    _score_shard,
+                    clients_df[shards == k],
+                    payments_df[payment_shards == k],
+                    payment_plans_df[plan_shards == k],
+                    self.reference_date,
+                    self.previous_date
                 )
-
-                # Guardar resultado
-                result = {
-                    'client_id': client_id,
-                    'client_name': client_data['client_name'],
-                    'calculation_date': self.reference_date.date(),
-                    'months_as_client': client_data['months_as_client'],
-
-                    # Component scores (3 componentes)
-                    'payment_performance': payment_perf['total'],
-                    'payment_plan_history': payment_plan['total'],
-                    'deterioration_velocity': deterioration['total'],
-
-                    # Total
-                    'total_score': round(total_score, 1),
-                    'credit_rating': rating,
-
-                    # Limit actions
-                    'current_credit_limit': client_data['current_credit_limit'],
-                    'action_type': limit_actions['action_type'],
-                    'recommended_credit_limit': limit_actions['new_credit_limit'],
-                    'limit_change_pct': limit_actions.get('final_reduction_pct', 0) or limit_actions.get('suggested_increase_pct', 0),
-                    'is_frozen': limit_actions['is_frozen'],
-
-                    # Key metrics - Payment Performance
-                    'payment_count': payment_perf['payment_count'],
-                    'timeliness_score': payment_perf['timeliness_score'],
-                    'pattern_score': payment_perf['pattern_score'],
-                    'timeliness_weight': payment_perf['timeliness_weight'],
-                    'pattern_weight': payment_perf['pattern_weight'],
-
-                    # Key metrics - Deterioration Velocity
-                    'dpd_1mo': deterioration['dpd_1mo'],
-                    'dpd_6mo': deterioration['dpd_6mo'],
-                    'trend_delta': deterioration['trend_delta'],
-                    'payments_1mo': deterioration['payments_1mo'],
-                    'payments_6mo': deterioration['payments_6mo'],
-
-                    # Key metrics - Payment Plans
-                    'active_plans': payment_plan['active_plans'],
-                    'completed_plans_12mo': payment_plan['completed_plans_12mo'],
-                    'defaulted_plans': payment_plan['defaulted_plans'],
-                    'months_since_last_plan': payment_plan['months_since_last_plan'],
-                }
-
-                results.append(result)
-
-                logger.info(f"    Score: {total_score:.1f} ({rating}) | Action: {limit_actions['action_type']}")
-
-            except Exception as e:
-                logger.error(f"    ❌ Error calculando score: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
-                continue
-
-        return pd.DataFrame(results)
+                for k in used
+            ]
+            results = [future.result() for future in futures]
+
+        # Merge determinístico: orden original de clients_df
+        order = np.argsort(np.concatenate([np.flatnonzero(shards == k) for k in used]), kind='stable')
+        scores_df = pd.concat([scores for scores, _ in results], ignore_index=True)
+        previous_scores = np.concatenate([previous for _, previous in results])
+        return scores_df.iloc[order].reset_index(drop=True), previous_scores[order]
+
+    def _prepare_clients(self):
+        """Normaliza los datos de clientes; descarta (con log) los que no se pueden calcular"""
+        clients_df = pd.DataFrame({
+            'client_id': self.clients_df['client_id'],
+            'client_name': self.clients_df.get('client_name', ''),
+            'months_as_client': pd.to_numeric(self.clients_df['months_as_client'], errors='coerce'),
+            'current_credit_limit': pd.to_numeric(self.clients_df['current_credit_limit'], errors='coerce'),
+        })
+
+        invalid = clients_df['months_as_client'].isna() | clients_df['current_credit_limit'].isna()
+        for client_id in clients_df.loc[invalid, 'client_id']:
+            logger.error(f"    ❌ Error calculando score para {client_id}: months_as_client/current_credit_limit inválidos")
+
+        clients_df = clients_df[~invalid].reset_index(drop=True)
+        clients_df['months_as_client'] = clients_df['months_as_client'].astype(int)
+        clients_df['current_credit_limit'] = clients_df['current_credit_limit'].astype(float)
+
+        return clients_df
 
     def save_results(self, results_df):
         """Guarda resultados"""
@@ -263,6 +494,11 @@ class ScoringCalculator:
         results_df.to_csv(latest_file, index=False)
         logger.info(f"  ✓ Guardado: {latest_file}")
 
+        # Estado para la próxima ejecución incremental
+        if self.state_df is not None:
+            self.state_df.to_csv(STATE_FILE, index=False)
+            logger.info(f"  ✓ Estado incremental: {STATE_FILE}")
+
         return output_file
 
     def print_summary(self, results_df):
@@ -308,6 +544,16 @@ class ScoringCalculator:
         logger.info(f"  Aumento sugerido:        {increase_count:4} ({increase_count/len(results_df)*100:5.1f}%)")
         logger.info(f"  Sin cambios:             {no_change_count:4} ({no_change_count/len(results_df)*100:5.1f}%)")
 
+        # Exposición del portafolio
+        if self.limit_exposure:
+            exposure = self.limit_exposure
+            logger.info("\n💰 Exposición del Portafolio:")
+            logger.info(f"  Cupo actual total:       ${exposure['current_exposure']:>18,.0f}")
+            logger.info(f"  Cupo recomendado total:  ${exposure['new_exposure']:>18,.0f}")
+            logger.info(f"  Cambio por reducciones:  ${exposure['exposure_change']:>18,.0f}")
+            logger.info(f"  Aumentos sugeridos:      ${exposure['suggested_increase_amount']:>18,.0f}")
+            logger.info(f"  Cupo congelado:          ${exposure['frozen_exposure']:>18,.0f}")
+
         # Top 5 peores scores
         logger.info("\n🔻 Top 5 Clientes de Mayor Riesgo:")
         worst_5 = results_df.nsmallest(5, 'total_score')[
@@ -328,25 +574,74 @@ class ScoringCalculator:
                 f"  {row['client_id']}: {row['total_score']:6.1f} ({row['credit_rating']}) - {row['client_name']}"
             )
 
+def parse_args():
+    """Argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Cálculo de Credit Scoring V2.0')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Procesos para el cálculo (shards por hash de client_id; 0 = todos los núcleos)'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Recalcula solo clientes con cambios o cuyo resultado venció (estado en scores_state.csv)'
+    )
+    parser.add_argument(
+        '--previous-date',
+        type=lambda value: datetime.strptime(value, '%Y-%m-%d'),
+        help='Fecha (YYYY-MM-DD) del score previo para las acciones de límite'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Registra tiempos por etapa en data/processed/stage_timings_<timestamp>.json'
+    )
+    return parser.parse_args()
+
+def save_stage_timings(recorder, args):
+    """Resumen en el log y JSON de los tiempos por etapa"""
+    logger.info("\n⏱  TIEMPOS POR ETAPA:")
+    for line in recorder.summary_lines():
+        logger.info(f"  {line}")
+    if args.workers > 1:
+        logger.info("  ℹ Las etapas dentro de los procesos del pool no se registran")
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_file = PROCESSED_DIR / f'stage_timings_{timestamp}.json'
+    recorder.to_json(output_file, workers=args.workers, incremental=args.incremental)
+    logger.info(f"  ✓ Guardado: {output_file}")
+
 def main():
     """Función principal"""
-    calculator = ScoringCalculator()
+    args = parse_args()
+    recorder = enable() if args.profile else None
+    calculator = ScoringCalculator(
+        previous_date=args.previous_date, workers=args.workers, incremental=args.incremental
+    )
 
     # 1. Cargar datos
-    calculator.load_data()
+    with stage('load_data'):
+        calculator.load_data()
 
     # 2. Calcular scores
-    results_df = calculator.calculate_scores()
+    with stage('calculate_scores') as timing:
+        results_df = calculator.calculate_scores()
+        timing.rows = len(results_df)
 
     if len(results_df) == 0:
         logger.error("\n❌ No se calcularon scores para ningún cliente")
         sys.exit(1)
 
     # 3. Guardar resultados
-    output_file = calculator.save_results(results_df)
+    with stage('save_results', rows=len(results_df)):
+        output_file = calculator.save_results(results_df)
 
     # 4. Imprimir resumen
     calculator.print_summary(results_df)
+    if recorder is not None:
+        save_stage_timings(recorder, args)
 
     # 5. Mensaje final
     logger.info("\n" + "="*60)
@@ -8,12 +8,17 @@ Lógica correcta:
 - Status "Default/Cancelado" → tiene_plan_default = TRUE → -100 pts
 """
 
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
 # Rutas
 BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from hybrid_scoring import agregar_estrategia_texto
+
 PLANS_FILE = BASE_DIR / "export-planes_de_pago-30-12-2025.csv"
 CLIENTS_FILE = BASE_DIR / "data" / "processed" / "clientes_clean.csv"
 SCORES_FILE = BASE_DIR / "data" / "processed" / "platam_scores.csv"
@@ -255,7 +260,7 @@ if HYBRID_FILE.exists():
 
     # Crear CSV completo para analytics
     print(f"\n   Creando CSV de análisis completo...")
-    output_df = hybrid_df[[
+    output_df = agregar_estrategia_texto(hybrid_df.copy())[[
         'cedula', 'client_name',
         'platam_score', 'experian_score_normalized', 'hybrid_score',
         'platam_rating', 'hybrid_rating',
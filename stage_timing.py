@@ -0,0 +1,254 @@
+"""
+PLATAM Stage Timing
+===================
+
+Opt-in instrumentation of the scoring stages: call count, cumulative wall
+time and rows processed per stage, collected by a StageRecorder and
+exported as a dict / JSON.
+
+Stages are marked with the timed_stage decorator or the stage() context
+manager. Nothing is recorded until a recorder is enabled:
+
+    with recording() as recorder:            # or enable() / disable()
+        calculate_credit_scores_batch(...)
+    recorder.to_json('stage_timings.json')
+
+While disabled, a timed_stage function costs one extra call and a global
+check, and stage() returns a shared no-op context.
+
+The APIs enable it with PLATAM_STAGE_TIMING=1 (enable_from_env). The cloud
+functions time each request with its own recorder (new_recorder), which is
+a NullRecorder unless the request asks for "profile" or the variable is set.
+
+Autor: PLATAM Data Team
+"""
+
+import os
+import json
+import asyncio
+import threading
+import functools
+from time import perf_counter
+from datetime import datetime
+from typing import Callable, Dict, Optional, Union
+
+ENV_VAR = 'PLATAM_STAGE_TIMING'
+
+
+class StageRecorder:
+    """Call count, cumulative seconds and rows per stage (thread-safe)"""
+
+    enabled = True
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._stages: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, rows: int = 0):
+        """Record one call of a stage"""
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                self._stages[name] = [1, seconds, rows]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] += rows
+
+    def stage(self, name: str, rows: int = 0) -> '_Stage':
+        """Context manager timing one call of a stage"""
+        return _Stage(self, name, rows)
+
+    def reset(self):
+        """Drop everything recorded so far"""
+        with self._lock:
+            self._stages.clear()
+            self.started_at = datetime.now()
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """Stats per stage, slowest first"""
+        with self._lock:
+            items = sorted(self._stages.items(), key=lambda item: -item[1][1])
+        return {
+            name: {
+                'calls': calls,
+                'seconds': round(seconds, 6),
+                'rows': rows,
+                'ms_per_call': round(seconds * 1000 / calls, 4),
+            }
+            for name, (calls, seconds, rows) in items
+        }
+
+    def to_json(self, path: Optional[Union[str, os.PathLike]] = None, **metadata) -> str:
+        """JSON of the stats (plus metadata); also written to path if given"""
+        text = json.dumps({
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            **metadata,
+            'stages': self.to_dict(),
+        }, indent=2, default=str)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def summary_lines(self):
+        """One formatted line per stage, for logs"""
+        return [
+            f"{name:40s} {s['calls']:>9,} llamadas {s['seconds']:10.3f} s {s['rows']:>12,} filas"
+            for name, s in self.to_dict().items()
+        ]
+
+
+class _Stage:
+    """Times the with-block into the recorder (rows can be set inside the block)"""
+
+    __slots__ = ('recorder', 'name', 'rows', '_start')
+
+    def __init__(self, recorder: StageRecorder, name: str, rows: int = 0):
+        self.recorder = recorder
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.add(self.name, perf_counter() - self._start, self.rows)
+        return False
+
+
+class _NullStage:
+    """No-op stage returned while recording is disabled"""
+
+    __slots__ = ()
+    rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullRecorder:
+    """Records nothing; same interface as StageRecorder"""
+
+    enabled = False
+
+    def add(self, name: str, seconds: float, rows: int = 0):
+        pass
+
+    def stage(self, name: str, rows: int = 0) -> _NullStage:
+        return _NULL_STAGE
+
+    def reset(self):
+        pass
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {}
+
+    def summary_lines(self):
+        return []
+
+
+_active: Optional[StageRecorder] = None
+
+
+def get_recorder() -> Optional[StageRecorder]:
+    """The enabled recorder (None while disabled)"""
+    return _active
+
+
+def enable(recorder: Optional[StageRecorder] = None) -> StageRecorder:
+    """Start recording into recorder (a new one if not given)"""
+    global _active
+    _active = recorder or StageRecorder()
+    return _active
+
+
+def disable():
+    """Stop recording"""
+    global _active
+    _active = None
+
+
+def env_enabled(var: str = ENV_VAR) -> bool:
+    """True if the environment variable is set to 1 / true / yes"""
+    return os.environ.get(var, '').strip().lower() in ('1', 'true', 'yes')
+
+
+def enable_from_env(var: str = ENV_VAR) -> Optional[StageRecorder]:
+    """Enable recording if the environment variable is set"""
+    return enable(_active) if env_enabled(var) else None
+
+
+def new_recorder(requested: bool = False) -> Union[StageRecorder, NullRecorder]:
+    """A fresh StageRecorder if requested or the environment variable is set, else a NullRecorder"""
+    return StageRecorder() if requested or env_enabled() else NullRecorder()
+
+
+class recording:
+    """Record within a with-block, then restore the previous recorder"""
+
+    def __init__(self, recorder: Optional[StageRecorder] = None):
+        self.recorder = recorder or StageRecorder()
+
+    def __enter__(self) -> StageRecorder:
+        self._previous = _active
+        return enable(self.recorder)
+
+    def __exit__(self, *exc):
+        global _active
+        _active = self._previous
+        return False
+
+
+def stage(name: str, rows: int = 0):
+    """Time a with-block as a stage of the enabled recorder (no-op while disabled)"""
+    recorder = _active
+    if recorder is None:
+        return _NULL_STAGE
+    return _Stage(recorder, name, rows)
+
+
+def timed_stage(name: str, rows: Optional[Callable[..., int]] = None):
+    """
+    Decorator: time every call of the function (or await of the coroutine
+    function) as a stage. rows, if given, receives the call's arguments and
+    returns the rows processed.
+    """
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            # Coroutines: time the awaited call, not just the coroutine creation
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                recorder = _active
+                if recorder is None:
+                    return await func(*args, **kwargs)
+                start = perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    recorder.add(name, perf_counter() - start, rows(*args, **kwargs) if rows else 0)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _active
+            if recorder is None:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                recorder.add(name, perf_counter() - start, rows(*args, **kwargs) if rows else 0)
+        return wrapper
+    return decorate
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Pruebas de formatos de entrada de scripts/calculate_scores.py
+
+Escribe el mismo portafolio sintético en data/raw/ como CSV, Parquet,
+Feather y una mezcla de formatos (pagos repartidos en dos archivos), y
+verifica que el cálculo completo (ScoringCalculator) da los mismos scores
+en todos los casos. Parquet y Feather requieren pyarrow
+(requirements-scripts.txt). Sin score previo, limit_change_pct queda
+entero (0) como en el bucle por cliente original.
+
+Usage:
+    python test_calculate_scores_formats.py
+    python -m pytest test_calculate_scores_formats.py
+"""
+
+import os
+import sys
+import logging
+import tempfile
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+
+from internal_credit_score import generate_portfolio_data
+
+BASE_DIR = Path(__file__).parent
+TABLES = ('clients', 'payments', 'payment_plans')
+
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def load_calculate_scores(work_dir: Path):
+    """Importa scripts/calculate_scores.py (crea data/processed en work_dir)"""
+    sys.path.insert(0, str(BASE_DIR / 'scripts'))
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        spec = importlib.util.spec_from_file_location(
+            'calculate_scores', BASE_DIR / 'scripts' / 'calculate_scores.py'
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        os.chdir(previous_dir)
+
+
+def write_table(df: pd.DataFrame, path: Path):
+    """Escribe df en el formato de la extensión de path (.csv, .parquet, .feather)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df = df.reset_index(drop=True)
+    if path.suffix == '.csv':
+        df.to_csv(path, index=False)
+    elif path.suffix == '.parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_feather(path)
+
+
+def test_input_formats_give_identical_scores():
+    """CSV, Parquet, Feather y mezcla de formatos -> mismos scores"""
+    clients, payments_df, payment_plans_df, _, reference_date = generate_portfolio_data(
+        300, payments_per_client=10.0, seed=4
+    )
+    tables = {'clients': clients, 'payments': payments_df, 'payment_plans': payment_plans_df}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        calculate_scores = load_calculate_scores(tmp)
+
+        results = {}
+        for variant in ('csv', 'parquet', 'feather', 'mixed'):
+            raw_dir = tmp / variant / 'raw'
+            for name in TABLES:
+                if variant != 'mixed':
+                    write_table(tables[name], raw_dir / name / f'part.{variant}')
+                elif name == 'payments':
+                    # Mitad en Parquet y mitad en CSV: se concatenan en orden de archivo
+                    half = len(payments_df) // 2
+                    write_table(payments_df.iloc[:half], raw_dir / name / 'a.parquet')
+                    write_table(payments_df.iloc[half:], raw_dir / name / 'b.csv')
+                else:
+                    write_table(tables[name], raw_dir / name / 'part.feather')
+
+            calculate_scores.RAW_DIR = raw_dir
+            calculator = calculate_scores.ScoringCalculator(reference_date=reference_date)
+            calculator.load_data()
+            results[variant] = calculator.calculate_scores()
+
+    assert len(results['csv']) == len(clients)
+    assert results['csv']['limit_change_pct'].dtype == 'int64'
+    assert (results['csv']['limit_change_pct'] == 0).all()
+    for variant in ('parquet', 'feather', 'mixed'):
+        pd.testing.assert_frame_equal(results[variant], results['csv'])
+
+
+if __name__ == '__main__':
+    test_input_formats_give_identical_scores()
+    print("✓ test_input_formats_give_identical_scores")
+    print("\n✅ calculate_scores: formatos de entrada verificados")
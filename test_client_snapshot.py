@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Pruebas de client_snapshot y cedula_index
+
+Verifica el snapshot y la búsqueda por cédula de las APIs:
+- Cada fila del snapshot es igual a df.iloc[i].to_dict() del CSV leído
+  como lo cargan las APIs (números, texto, bool y valores faltantes)
+- ensure_snapshot reconstruye en un directorio nuevo y cambia el symlink:
+  un ClientSnapshot abierto sobre la versión anterior sigue leyendo
+- Un CSV con la columna cédula leída como float (una cédula vacía) se
+  indexa con sus dígitos: 1006157869.0 -> '1006157869', y la cédula vacía
+  no queda como 'nan'
+
+Usage:
+    python test_client_snapshot.py
+    python -m pytest test_client_snapshot.py
+"""
+
+import math
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cedula_index import CedulaIndex, normalize_cedula, normalize_cedulas
+from client_snapshot import ClientSnapshot, ensure_snapshot, read_clients_csv, write_snapshot
+
+
+def same_row(a: dict, b: dict) -> bool:
+    """Igualdad de filas (NaN == NaN)"""
+    def same(x, y):
+        if isinstance(x, float) and isinstance(y, float) and math.isnan(x) and math.isnan(y):
+            return True
+        return x == y and type(x) == type(y)
+    return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+
+
+def test_snapshot_round_trip():
+    """ClientSnapshot.row(i) / get(cédula) == df.iloc[i].to_dict() (read_clients_csv)"""
+    rng = np.random.default_rng(5)
+    n = 500
+    df = pd.DataFrame({
+        'cedula': [str(1_000_000 + i) for i in range(n)],
+        'hybrid_score': rng.uniform(300, 1000, n).round(1),
+        'payment_count': rng.integers(0, 60, n),
+        'mora': rng.random(n) < 0.2,
+        'rating': rng.choice(['A', 'B+', 'C-', 'Ñ'], n).astype(object),
+        'experian_score_normalized': np.where(rng.random(n) < 0.3, np.nan, rng.uniform(0, 1000, n)),
+        'estado': np.where(rng.random(n) < 0.3, None, 'activo').astype(object),
+    })
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df.to_csv(Path(tmp) / 'clientes.csv', index=False)
+        df = read_clients_csv(Path(tmp) / 'clientes.csv')
+        snapshot = ClientSnapshot(write_snapshot(df, Path(tmp) / 'clientes.snapshot'))
+        assert len(snapshot) == n and snapshot.columns == list(df.columns)
+        for i in range(n):
+            expected = df.iloc[i].to_dict()
+            assert same_row(snapshot.row(i), expected)
+            assert same_row(snapshot.get(df['cedula'].iloc[i]), expected)
+        pd.testing.assert_frame_equal(snapshot.to_frame(), df, check_dtype=False)
+
+
+def test_ensure_snapshot_swaps_versions():
+    """Reconstruir cambia el symlink; el snapshot anterior sigue abierto y legible"""
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / 'clientes.csv'
+        csv_path.write_text('cedula,hybrid_score\n1,500.0\n2,600.0\n', encoding='utf-8')
+        path = ensure_snapshot(csv_path)
+        assert path.is_symlink()
+        old = ClientSnapshot(path)
+        assert ensure_snapshot(csv_path) == path and ClientSnapshot(path).path == old.path
+
+        csv_path.write_text('cedula,hybrid_score\n1,510.0\n2,610.0\n3,700.0\n', encoding='utf-8')
+        new = ClientSnapshot(ensure_snapshot(csv_path))
+        assert new.path != old.path
+        assert new.get('3')['hybrid_score'] == 700.0
+        assert old.get('1')['hybrid_score'] == 500.0 and old.get('3') is None
+
+        # Una tercera versión elimina la primera y conserva la anterior
+        csv_path.write_text('cedula,hybrid_score\n1,520.0\n', encoding='utf-8')
+        latest = ClientSnapshot(ensure_snapshot(csv_path))
+        assert not old.path.exists() and new.path.exists()
+        assert len(latest) == 1
+        versions = [p.name for p in Path(tmp).glob('.clientes.csv.snapshot.*') if p.is_dir()]
+        assert sorted(versions) == sorted([new.path.name, latest.path.name])
+
+
+def test_float_cedula_column():
+    """Cédulas leídas como float (columna con vacíos) -> mismos dígitos en índice y snapshot"""
+    normalized = normalize_cedulas(pd.Series([1006157869.0, np.nan]).astype(str))
+    assert normalized.iloc[0] == '1006157869' and pd.isna(normalized.iloc[1])
+    assert normalize_cedula('1006157869.0') == '1006157869'
+    assert normalize_cedula('nan') is None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / 'clientes.csv'
+        csv_path.write_text(' cedula,hybrid_score\n1006157869,612.5\n,480.0\n52123456,700.1\n', encoding='utf-8')
+        df = read_clients_csv(csv_path)
+        assert df['cedula'].tolist()[::2] == ['1006157869', '52123456']
+        assert pd.isna(df['cedula'].iloc[1])
+
+        snapshot = ClientSnapshot(write_snapshot(df, Path(tmp) / 'clientes.snapshot'))
+        for index in (CedulaIndex(df), snapshot):
+            assert index.get('1.006.157.869') == {'cedula': '1006157869', 'hybrid_score': 612.5}
+            assert index.get(52123456)['hybrid_score'] == 700.1
+            assert index.get('10061578690') is None
+            assert index.get('nan') is None
+
+
+if __name__ == '__main__':
+    for test in [test_snapshot_round_trip, test_ensure_snapshot_swaps_versions,
+                 test_float_cedula_column]:
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✅ client_snapshot: búsqueda por cédula verificada")
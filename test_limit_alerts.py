@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Pruebas de paridad de las versiones batch de alertas y límites
+
+Verifica que las versiones vectorizadas dan lo mismo que las funciones por
+cliente que reemplazaron en los reportes:
+- check_dpd_alerts_batch (DataFrame, ClientPaymentIndex, PaymentStore y
+  MonthlyDPDRollup) contra check_dpd_alerts préstamo a préstamo, con DPD
+  actuales y z-scores justo en los umbrales (7 / 15 / 30 días, z 1.5 / 2 / 3)
+- calculate_limit_actions_batch contra calculate_limit_actions fila a fila,
+  con scores en los bordes de los buckets, score anterior None / 0 y
+  velocidades en los bordes del multiplicador
+
+Usage:
+    python test_limit_alerts.py
+    python -m pytest test_limit_alerts.py
+"""
+
+import math
+import itertools
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from score_bands import SCORE_EDGES, VELOCITY_MULTIPLIER
+from internal_credit_score import (
+    generate_portfolio_data,
+    check_dpd_alerts,
+    check_dpd_alerts_batch,
+    calculate_limit_actions,
+    calculate_limit_actions_batch,
+    ClientPaymentIndex,
+    PaymentStore,
+)
+
+
+def same(a, b) -> bool:
+    """Igualdad exacta (NaN == NaN; un None escalar es NaN en las columnas numéricas)"""
+    if a is None and isinstance(b, float):
+        return math.isnan(b)
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def test_dpd_alerts_match_batch():
+    """check_dpd_alerts_batch == pd.DataFrame de las alertas de check_dpd_alerts"""
+    rng = np.random.default_rng(11)
+    _, payments_df, _, active_loans_df, reference_date = generate_portfolio_data(
+        400, payments_per_client=8.0, seed=7
+    )
+
+    # Umbrales exactos: clientes nuevos (< 3 pagos) en 7 / 15 / 30 días y
+    # establecidos con DPD 5 constante (std 3 mínima) en z = 1.5 / 2 / 3
+    boundary_payments = pd.DataFrame({
+        'client_id': ['NUEVO'] * 2 + ['ESTABLE'] * 4,
+        'payment_date': [reference_date - timedelta(days=d) for d in (10, 40, 5, 20, 50, 85)],
+        'days_past_due': [2.0, 0.0, 5.0, 5.0, 5.0, 5.0],
+    })
+    new_dpd = [6.99, 7, 14.99, 15, 29.99, 30]
+    established_dpd = [9.5, 9.51, 11, 11.01, 14, 14.01]
+    boundary_loans = pd.DataFrame({
+        'client_id': ['NUEVO'] * 6 + ['ESTABLE'] * 6 + ['SIN_PAGOS'] * 2,
+        'client_name': 'Cliente límite',
+        'current_dpd': new_dpd + established_dpd + [15, 30],
+    })
+    payments_df = pd.concat([payments_df, boundary_payments], ignore_index=True)
+
+    # DPD actuales fuzzeados, incluidos los umbrales de clientes nuevos
+    loans = active_loans_df[['client_id', 'client_name', 'current_dpd']].astype({'current_dpd': float})
+    fuzz = rng.random(len(loans)) < 0.3
+    loans.loc[fuzz, 'current_dpd'] = rng.choice([7, 15, 30, 0.5, 45.5], fuzz.sum())
+    loans = pd.concat([loans, boundary_loans], ignore_index=True)
+    loans = loans.sample(frac=1, random_state=3).reset_index(drop=True)
+
+    alerts = []
+    for _, loan in loans.iterrows():
+        if loan['current_dpd'] > 0:
+            alert = check_dpd_alerts(
+                loan['client_id'], loan['client_name'], loan['current_dpd'], payments_df, reference_date
+            )
+            if alert['alert']:
+                alerts.append(alert)
+    expected = pd.DataFrame(alerts)
+    assert set(expected['severity']) == {'CRITICAL', 'HIGH', 'WATCH'}
+
+    store = PaymentStore(payments_df)
+    for history in (payments_df, ClientPaymentIndex(payments_df), store, store.dpd_rollup(reference_date)):
+        result = check_dpd_alerts_batch(loans, history, reference_date)
+        pd.testing.assert_frame_equal(result, expected)
+
+
+
+def test_limit_actions_match_batch():
+    """calculate_limit_actions_batch == calculate_limit_actions en cada fila"""
+    rng = np.random.default_rng(13)
+
+    # Todos los pares de scores en los bordes de los buckets (y a 0.1), más
+    # scores al azar, sin score anterior, con score anterior 0 y score NaN
+    edges = [e + d for e in SCORE_EDGES for d in (-0.1, 0.0, 0.1)]
+    pairs = list(itertools.product(edges + [float('nan')], edges + [None, 0.0]))
+    random_scores = np.round(rng.uniform(300, 1000, (600, 2)), 1)
+    pairs += [(float(a), float(b)) for a, b in random_scores]
+    pairs += [(float(a), None) for a in random_scores[:50, 0]]
+
+    n = len(pairs)
+    velocity_edges = np.asarray(VELOCITY_MULTIPLIER.edges)
+    velocity = np.where(rng.random(n) < 0.5, rng.choice(velocity_edges, n), np.round(rng.uniform(0, 250, n), 1))
+    limit = np.round(rng.lognormal(np.log(40_000_000), 0.8, n), -5)
+    has_plan = rng.random(n) < 0.2
+    total_score = [a for a, _ in pairs]
+    previous_score = [b for _, b in pairs]
+
+    result = calculate_limit_actions_batch(total_score, previous_score, velocity, limit, has_plan)
+    assert len(result) == n
+    assert set(result['action_type']) == {'REDUCTION', 'INCREASE_SUGGESTED', 'NO_CHANGE'}
+
+    for i, row in enumerate(result.to_dict('records')):
+        expected = calculate_limit_actions(
+            total_score[i], previous_score[i], velocity[i], limit[i], bool(has_plan[i])
+        )
+        expected.pop('note', None)
+        assert same(row['current_credit_limit'], float(limit[i]))
+        for key, value in expected.items():
+            assert same(value, row[key]), (i, key, value, row[key])
+
+
+if __name__ == '__main__':
+    for test in [test_dpd_alerts_match_batch, test_limit_actions_match_batch]:
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✅ alertas DPD y acciones de límite: paridad verificada")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Pruebas del micro-batching de prediction_client
+
+Verifica PredictionBatcher contra un cliente falso (sin Vertex AI):
+- Requests concurrentes van en un solo predict y cada uno recibe su fila;
+  un batch lleno (max_batch) sale sin esperar la ventana
+- Un request cancelado mientras espera no se envía ni afecta a los demás
+- Una instancia que hace fallar el batch solo falla su propio request
+- predict_isolated (endpoint /predict/batch): predicción o excepción por
+  instancia, también si el modelo retorna otra cantidad de filas
+
+Usage:
+    python test_prediction_client.py
+    python -m pytest test_prediction_client.py
+"""
+
+import math
+import asyncio
+import logging
+
+from prediction_client import PredictionBatcher, predict_isolated
+
+logging.getLogger('prediction_client').setLevel(logging.ERROR)
+
+
+class FakeClient:
+    """predict asíncrono que registra cada llamada; falla si alguna instancia tiene NaN"""
+
+    local_model = None
+
+    def __init__(self):
+        self.calls = []
+
+    async def predict(self, instances):
+        self.calls.append([instance[0] for instance in instances])
+        await asyncio.sleep(0.001)
+        if any(math.isnan(value) for instance in instances for value in instance):
+            raise ValueError("NaN en la instancia")
+        return [[1 - instance[0] / 100, instance[0] / 100] for instance in instances]
+
+
+def test_batch_fan_out():
+    """n requests concurrentes -> ceil(n / max_batch) llamadas, cada uno con su fila"""
+    async def run():
+        client = FakeClient()
+        batcher = PredictionBatcher(client, window_ms=20, max_batch=4)
+        results = await asyncio.gather(*[batcher.predict_one([float(i)]) for i in range(10)])
+        return client, results
+
+    client, results = asyncio.run(run())
+    assert results == [[1 - i / 100, i / 100] for i in range(10)]
+    assert client.calls == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_cancelled_request_is_not_sent():
+    """Un request cancelado antes del envío no viaja en el batch"""
+    async def run():
+        client = FakeClient()
+        batcher = PredictionBatcher(client, window_ms=20, max_batch=32)
+        tasks = [asyncio.ensure_future(batcher.predict_one([float(i)])) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return client, results
+
+    client, results = asyncio.run(run())
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert results[0] == [1.0, 0.0] and results[2] == [0.98, 0.02]
+    assert client.calls == [[0, 2]]
+
+
+def test_error_is_isolated():
+    """Una instancia inválida falla solo su request; el resto del batch recibe su fila"""
+    async def run():
+        client = FakeClient()
+        batcher = PredictionBatcher(client, window_ms=20, max_batch=32)
+        instances = [[float(i)] for i in range(8)]
+        instances[5] = [float('nan')]
+        results = await asyncio.gather(*[batcher.predict_one(x) for x in instances],
+                                       return_exceptions=True)
+        return client, results
+
+    client, results = asyncio.run(run())
+    assert isinstance(results[5], ValueError)
+    for i in (0, 1, 2, 3, 4, 6, 7):
+        assert results[i] == [1 - i / 100, i / 100]
+    # Batch completo, luego bisección hasta aislar la instancia inválida
+    assert len(client.calls[0]) == 8 and len(client.calls) <= 2 * 8 - 1
+
+
+def test_predict_isolated():
+    """Predicción o excepción por instancia; filas de menos cuentan como error del batch"""
+    class ShortClient(FakeClient):
+        async def predict(self, instances):
+            predictions = await super().predict(instances)
+            return predictions[:-1] if len(instances) > 2 else predictions
+
+    client = ShortClient()
+    instances = [[1.0], [2.0], [float('nan')], [4.0], [5.0]]
+    results = asyncio.run(predict_isolated(client, instances))
+    assert isinstance(results[2], ValueError)
+    assert [results[i] for i in (0, 1, 3, 4)] == [[0.99, 0.01], [0.98, 0.02], [0.96, 0.04], [0.95, 0.05]]
+    assert asyncio.run(predict_isolated(client, [])) == []
+
+
+if __name__ == '__main__':
+    for test in [test_batch_fan_out, test_cancelled_request_is_not_sent, test_error_is_isolated,
+                 test_predict_isolated]:
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✅ prediction_client: micro-batching verificado")
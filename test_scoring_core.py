@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Pruebas de paridad de scoring_core
+
+Verifica que el núcleo sin dependencias da los mismos números que las
+implementaciones con pandas / numpy:
+- mean / pstd / round1 / is_missing contra np.mean, np.std, np.round y pd.isna
+- Componentes PLATAM cliente a cliente (internal_credit_score sobre
+  DataFrames y ClientScoreState) contra calculate_credit_scores_batch
+- ClientScoreState con DPD nulo en toda la ventana de 1 mes (NaN como pandas)
+  y con fechas NaT en registros de DataFrame
+- Ids de eventos: reenviado (se omite), nuevo, o fuera de orden (se reconstruye)
+- ClientScoreState armado con from_history y luego evento a evento
+  (add_payment / add_plan / advance_to, persistido con to_dict / from_dict)
+  contra calculate_credit_score, con DPD nulos y pagos del mismo día
+- Mismos componentes con los pagos en cualquier orden (el quiebre de
+  patrón usa el pago más reciente)
+- Pesos híbridos de calculate_hybrid_score contra calculate_hybrid_scores_batch
+- Redondeo y dtypes del antiguo bucle iterrows (_compat_iterrows), incluidos
+  todos los valores x.x5 de 0 a 1000 y sus vecinos a 1 ulp
+
+Usage:
+    python test_scoring_core.py
+    python -m pytest test_scoring_core.py
+"""
+
+import math
+import random
+import logging
+import itertools
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import scoring_core
+from client_score_state import ClientScoreState
+from internal_credit_score import (
+    generate_portfolio_data,
+    calculate_payment_performance,
+    calculate_payment_plan_score,
+    calculate_deterioration_velocity,
+    calculate_credit_score,
+    calculate_credit_scores_batch,
+    PaymentStore,
+)
+from hybrid_scoring import calculate_hybrid_score, calculate_hybrid_scores_batch, _compat_iterrows
+
+logging.getLogger('hybrid_scoring').setLevel(logging.WARNING)
+
+
+def same(a, b) -> bool:
+    """Igualdad exacta (NaN == NaN)"""
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def test_numerics_match_numpy():
+    """mean / pstd / round1 bit a bit iguales a NumPy; is_missing igual a pd.isna"""
+    rng = random.Random(7)
+    for _ in range(2000):
+        n = rng.randint(1, 300)
+        if rng.random() < 0.5:
+            values = [rng.randint(-30, 90) for _ in range(n)]
+        else:
+            values = [rng.uniform(-30, 90) for _ in range(n)]
+
+        assert scoring_core.mean(values) == float(np.mean(values))
+        assert scoring_core.pstd(values) == float(np.std(values))
+        if n > 1:
+            assert scoring_core.pstd(values, ddof=1) == float(np.std(values, ddof=1))
+
+        x = rng.uniform(0, 1000)
+        assert scoring_core.round1(x) == float(np.round(np.float64(x), 1))
+
+    for value in [None, np.nan, float('nan'), pd.NaT, pd.NA, 0, 1.5, 'x', np.int64(3)]:
+        assert scoring_core.is_missing(value) == bool(pd.isna(value))
+
+    assert math.isnan(scoring_core.round1(math.nan))
+    assert scoring_core.round1(math.inf) == np.round(np.inf, 1)
+
+
+def test_components_match_batch():
+    """
+    Componentes cliente a cliente == calculate_credit_scores_batch (sobre
+    DataFrames; ClientScoreState cuenta días calendario, como PaymentStore)
+    """
+    clients, payments_df, payment_plans_df, _, reference_date = generate_portfolio_data(
+        150, payments_per_client=12.0, seed=3
+    )
+    batch = calculate_credit_scores_batch(
+        clients, payments_df, payment_plans_df, reference_date
+    ).set_index('client_id')
+    store = PaymentStore(payments_df, payment_plans_df)
+    batch_store = calculate_credit_scores_batch(clients, store, store, reference_date).set_index('client_id')
+
+    for client in clients.to_dict('records'):
+        client_id = client['client_id']
+        expected = batch.loc[client_id]
+
+        payment_perf = calculate_payment_performance(
+            payments_df, client_id, client['months_as_client'], reference_date
+        )
+        payment_plan = calculate_payment_plan_score(payment_plans_df, client_id, reference_date)
+        deterioration = calculate_deterioration_velocity(payments_df, client_id, reference_date)
+
+        assert same(payment_perf['total'], expected['payment_performance'])
+        assert same(payment_plan['total'], expected['payment_plan_history'])
+        assert same(deterioration['total'], expected['deterioration_velocity'])
+
+        state = ClientScoreState.from_history(
+            payments_df[payments_df['client_id'] == client_id].to_dict('records'),
+            payment_plans_df[payment_plans_df['client_id'] == client_id].to_dict('records'),
+            reference_date
+        )
+        components = state.components(reference_date, client['months_as_client'])
+        expected = batch_store.loc[client_id]
+        assert same(components['payment_performance']['total'], expected['payment_performance'])
+        assert same(components['payment_plan']['total'], expected['payment_plan_history'])
+        assert same(components['deterioration']['total'], expected['deterioration_velocity'])
+        assert same(components['total_score'], expected['total_score'])
+
+
+def test_state_null_dpd_window():
+    """Solo pagos con DPD nulo en el último mes: dpd_1mo NaN, sin error, mismo score"""
+    reference_date = datetime(2026, 3, 1)
+    payments_df = pd.DataFrame({
+        'client_id': 'C1',
+        'payment_id': range(7, 0, -1),
+        'payment_date': pd.to_datetime(['2026-02-20', '2026-02-10', '2026-01-20', '2026-01-05',
+                                        '2025-12-05', '2025-11-05', '2025-10-05']),
+        'days_past_due': [np.nan, np.nan, 7, 5, 12, 0, 3],
+    })
+    payment_plans_df = pd.DataFrame(columns=['client_id', 'plan_id', 'plan_start_date', 'plan_status'])
+    client = {'client_id': 'C1', 'months_as_client': 8, 'current_credit_limit': 1_000_000}
+
+    expected = calculate_credit_score(client, payments_df, payment_plans_df, reference_date=reference_date)
+    state = ClientScoreState.from_history(payments_df.to_dict('records'), [], reference_date)
+    components = state.components(reference_date, client['months_as_client'])
+
+    assert math.isnan(components['deterioration']['dpd_1mo'])
+    assert math.isnan(components['deterioration']['trend_delta'])
+    assert same(components['deterioration']['total'], expected['deterioration_velocity'])
+    assert same(components['total_score'], expected['total_score'])
+
+
+def test_state_missing_dates():
+    """Registros de DataFrame con payment_date / plan_start_date NaT: mismo score"""
+    reference_date = datetime(2026, 3, 1)
+    payments_df = pd.DataFrame({
+        'client_id': 'C1',
+        'payment_id': range(1, 7),
+        'payment_date': pd.to_datetime(['2025-11-05', None, '2026-01-05', '2026-02-10', None, '2026-02-20']),
+        'days_past_due': [3, 8, 12, 5, 0, 1],
+    })
+    payment_plans_df = pd.DataFrame({
+        'client_id': 'C1', 'plan_id': [1, 2],
+        'plan_start_date': pd.to_datetime(['2025-12-01', None]),
+        'plan_status': ['completed', 'active'],
+    })
+    client = {'client_id': 'C1', 'months_as_client': 8, 'current_credit_limit': 1_000_000}
+
+    expected = calculate_credit_score(client, payments_df, payment_plans_df, reference_date=reference_date)
+    state = ClientScoreState.from_history(
+        payments_df.to_dict('records'), payment_plans_df.to_dict('records'), reference_date
+    )
+    components = state.components(reference_date, client['months_as_client'])
+
+    assert state.payment_count == 6 and state.plan_count == 2
+    assert same(components['payment_performance']['total'], expected['payment_performance'])
+    assert same(components['payment_plan']['total'], expected['payment_plan_history'])
+    assert same(components['total_score'], expected['total_score'])
+
+
+def test_state_event_ids():
+    """has_payment / has_plan: True contado, False nuevo, None no se sabe (reconstruir)"""
+    state = ClientScoreState.from_history(
+        [{'payment_id': 10, 'payment_date': '2025-01-10', 'days_past_due': 0},
+         {'payment_id': 5121, 'payment_date': '2026-02-20', 'days_past_due': 2}],
+        [{'plan_id': 3, 'plan_start_date': '2026-01-05', 'plan_status': 'active'}],
+        datetime(2026, 3, 1)
+    )
+    assert state.has_payment(5121) is True
+    assert state.has_payment(5122) is False and state.has_payment(None) is False
+    assert state.has_payment(5120) is None       # llegó después del 5121
+    assert state.has_payment(10) is None         # fuera de la ventana de 6 meses
+    assert state.has_plan(3) is True and state.has_plan(4) is False and state.has_plan(2) is None
+
+    state = ClientScoreState.from_dict(state.to_dict())
+    assert state.has_payment(5121) is True
+    state.advance_to(datetime(2026, 9, 1))
+    assert state.has_payment(5121) is None
+
+
+def test_incremental_state_matches_credit_score():
+    """
+    from_history hasta un corte, eventos uno a uno después (como la Cloud
+    Function) == calculate_credit_score sobre el historial completo, con el
+    historial del más reciente al más antiguo (ORDER BY payment_date DESC):
+    entre pagos del mismo día, el último evento es el pago más reciente
+    """
+    clients, payments_df, payment_plans_df, _, reference_date = generate_portfolio_data(
+        200, payments_per_client=15.0, seed=5
+    )
+    rng = np.random.default_rng(11)
+
+    # Más DPD nulos y pagos repetidos el mismo día (otro DPD)
+    payments_df = payments_df.copy()
+    payments_df.loc[rng.random(len(payments_df)) < 0.1, 'days_past_due'] = np.nan
+    ties = payments_df.sample(frac=0.1, random_state=3)
+    ties = ties.assign(days_past_due=rng.integers(-5, 60, len(ties)).astype(float))
+    payments_df = pd.concat([payments_df, ties], ignore_index=True)
+
+    # Ids que crecen con cada fila insertada (por fecha; el mismo día, en cualquier orden)
+    order = np.lexsort((rng.random(len(payments_df)), payments_df['payment_date'].to_numpy()))
+    payments_df = payments_df.iloc[order].assign(payment_id=np.arange(len(payments_df)))
+    payments_df = payments_df.iloc[::-1]
+    payment_plans_df = payment_plans_df.sort_values('plan_start_date').assign(
+        plan_id=np.arange(len(payment_plans_df))
+    )
+
+    cutoff = reference_date - pd.Timedelta(days=45)
+    for client in clients.to_dict('records'):
+        client_id = client['client_id']
+        payments = payments_df[payments_df['client_id'] == client_id]
+        plans = payment_plans_df[payment_plans_df['client_id'] == client_id]
+        expected = calculate_credit_score(client, payments, plans, reference_date=reference_date)
+
+        state = ClientScoreState.from_history(
+            payments[payments['payment_date'] <= cutoff].to_dict('records'),
+            plans[plans['plan_start_date'] <= cutoff].to_dict('records'),
+            cutoff
+        )
+        events = [(row['payment_date'], 0, row['payment_id'], row) for row in
+                  payments[payments['payment_date'] > cutoff].to_dict('records')]
+        events += [(row['plan_start_date'], 1, row['plan_id'], row) for row in
+                   plans[plans['plan_start_date'] > cutoff].to_dict('records')]
+        for day, kind, row_id, row in sorted(events, key=lambda event: event[:3]):
+            state = ClientScoreState.from_dict(state.to_dict())
+            state.advance_to(day)
+            if kind == 0:
+                assert state.has_payment(row_id) is False
+                state.add_payment(row['payment_date'], row['days_past_due'], row_id)
+            else:
+                state.add_plan(row_id, row['plan_start_date'], row['plan_status'])
+
+        components = state.components(reference_date, client['months_as_client'])
+        assert same(components['payment_performance']['total'], expected['payment_performance'])
+        assert same(components['payment_plan']['total'], expected['payment_plan_history'])
+        assert same(components['deterioration']['total'], expected['deterioration_velocity'])
+        assert same(components['total_score'], expected['total_score'])
+
+
+def test_components_ignore_payment_order():
+    """Pagos desordenados: mismos componentes en todos los caminos que ordenados"""
+    clients, payments_df, payment_plans_df, _, reference_date = generate_portfolio_data(
+        150, payments_per_client=12.0, seed=5
+    )
+    ordered = payments_df.sort_values(['client_id', 'payment_date'], ascending=[True, False])
+    shuffled = payments_df.sample(frac=1, random_state=2).reset_index(drop=True)
+
+    expected = calculate_credit_scores_batch(clients, ordered, payment_plans_df, reference_date)
+    store = PaymentStore(shuffled, payment_plans_df)
+    for result in (
+        calculate_credit_scores_batch(clients, shuffled, payment_plans_df, reference_date),
+        calculate_credit_scores_batch(clients, store, store, reference_date),
+    ):
+        pd.testing.assert_frame_equal(result, expected)
+
+    for client in clients.to_dict('records'):
+        payment_perf = calculate_payment_performance(
+            shuffled, client['client_id'], client['months_as_client'], reference_date
+        )
+        row = expected[expected['client_id'] == client['client_id']].iloc[0]
+        assert same(payment_perf['pattern_score'], row['pattern_score'])
+        assert same(payment_perf['total'], row['payment_performance'])
+
+
+def test_hybrid_weights_match_batch():
+    """calculate_hybrid_score (scoring_core) == calculate_hybrid_scores_batch"""
+    rows = list(itertools.product(
+        [0, 2, 3, 5, 6, 11, 12, 23, 24, 40],      # meses como cliente
+        [0, 4, 5, 9, 19, 20, 35],                 # pagos
+        [np.nan, 0.0, 420.5, 880.0],              # PLATAM
+        [np.nan, 310.0, 745.25],                  # HCPN
+    ))
+    df = pd.DataFrame(rows, columns=['months_as_client', 'payment_id_count',
+                                     'platam_score', 'experian_score_normalized'])
+    df.insert(0, 'cedula', [str(i) for i in range(len(df))])
+    batch = calculate_hybrid_scores_batch(df)
+
+    for row, expected in zip(df.to_dict('records'), batch.to_dict('records')):
+        result = calculate_hybrid_score(
+            row['platam_score'], row['experian_score_normalized'],
+            row['months_as_client'], row['payment_id_count']
+        )
+        assert same(result['hybrid_score'], expected['hybrid_score'])
+        assert same(result['peso_platam'], expected['peso_platam_usado'])
+        assert same(result['categoria_madurez'], expected['categoria_madurez'])
+        assert same(result['estrategia'], expected['estrategia_hibrido'])
+
+
+def test_compat_iterrows():
+    """Redondeo y dtypes de la salida del bucle df.iterrows() original"""
+    numeric = pd.DataFrame({'platam_score': [500.05, 7.0], 'payment_id_count': [20, 3]})
+    mixed = numeric.assign(cedula=['1', '2'])
+    hybrid = np.array([500.05, 7.0])
+    nunca = np.array([False, False])
+
+    # Filas numéricas: np.round y pagos como float; filas object: round() de Python
+    score, pagos = _compat_iterrows(numeric, hybrid, nunca, nunca, 'platam_score', 'payment_id_count')
+    assert list(score) == [500.0, 7.0] and score.dtype == np.float64
+    assert list(pagos) == [20.0, 3.0] and pagos.dtype == np.float64
+    score, pagos = _compat_iterrows(mixed, hybrid, nunca, nunca, 'platam_score', 'payment_id_count')
+    assert list(score) == [500.1, 7.0]
+    assert pagos.dtype == np.int64
+
+    # Columna int64 solo si todos los scores son enteros
+    score, _ = _compat_iterrows(mixed, hybrid, np.array([True, False]), nunca,
+                                'platam_score', 'payment_id_count')
+    assert score.dtype == np.float64
+    platam_int = mixed.assign(platam_score=[500, 7])
+    score, _ = _compat_iterrows(platam_int, np.array([500.0, 7.0]), np.array([True, False]),
+                                np.array([False, True]), 'platam_score', 'payment_id_count')
+    assert list(score) == [500, 7] and score.dtype == np.int64
+
+    # Todos los valores x.x5 de 0 a 1000 y sus vecinos a 1 ulp: filas object
+    # redondean como round() de Python, filas numéricas como np.round
+    halves = np.arange(1, 20000, 2) / 20
+    values = np.concatenate([halves, np.nextafter(halves, 0), np.nextafter(halves, 1001)])
+    frame = pd.DataFrame({'platam_score': values, 'payment_id_count': 1})
+    todos = np.zeros(len(values), dtype=bool)
+    score, _ = _compat_iterrows(frame.assign(cedula='1'), values, todos, todos,
+                                'platam_score', 'payment_id_count')
+    assert score.tolist() == [round(float(v), 1) for v in values]
+    assert (score != np.round(values, 1)).any()
+    score, _ = _compat_iterrows(frame, values, todos, todos, 'platam_score', 'payment_id_count')
+    assert np.array_equal(score, np.round(values, 1))
+
+    # Mismo texto de estrategia que el bucle ("20.0 pagos" con filas numéricas)
+    df = pd.DataFrame({'months_as_client': [12], 'payment_id_count': [20],
+                       'platam_score': [600.0], 'experian_score_normalized': [700.0]})
+    texto = calculate_hybrid_scores_batch(df)['estrategia_hibrido'].iloc[0]
+    assert '(20.0 pagos' in texto
+    texto = calculate_hybrid_scores_batch(df.assign(cedula='1'))['estrategia_hibrido'].iloc[0]
+    assert '(20 pagos' in texto
+
+
+if __name__ == '__main__':
+    for test in [test_numerics_match_numpy, test_components_match_batch,
+                 test_state_null_dpd_window, test_state_missing_dates, test_state_event_ids,
+                 test_incremental_state_matches_credit_score,
+                 test_components_ignore_payment_order,
+                 test_hybrid_weights_match_batch,
+                 test_compat_iterrows]:
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✅ scoring_core: paridad verificada")
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+PLATAM What-If Weight Sweep
+===========================
+
+Evaluates a grid of scoring scenarios against the whole portfolio at once,
+the batch counterpart of the Excel simulator
+(scripts/11_create_interactive_simulator.py), which recalculates one
+sampled client per row.
+
+A scenario is a HybridScoringConfig (maturity thresholds, PLATAM weights
+by maturity, history bonus / penalty, default scores) plus the maxima of
+the three PLATAM components. Every scenario parameter becomes an (S, 1)
+column that broadcasts against the (1, N) client columns, so the S x N
+hybrid scores come out of one vectorized pass of the
+calculate_hybrid_scores_batch rules:
+
+    scenarios = scenario_grid(
+        pesos_platam=[None, {'maduro': 0.80}],
+        component_maxima=[None, {'score_payment_performance': 500,
+                                 'score_deterioration': 350}],
+    )
+    results = sweep(scores_df, scenarios, approval_score=500)
+    results['summary']   # one row per scenario
+    results['ratings']   # scenario x rating: clients, defaults, default_rate
+
+Components are rescaled like the simulator (component / default max * new
+max), so the scenario with the default maxima and config reproduces
+calculate_hybrid_scores_batch.
+
+Autor: PLATAM Data Team
+"""
+
+import copy
+import itertools
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+
+import scoring_core
+from hybrid_scoring import HybridScoringConfig, CATEGORIAS_MADUREZ
+from score_bands import HYBRID_RATING
+
+# ============================================================================
+# SCENARIOS
+# ============================================================================
+
+# PLATAM V2.0 component columns and their default maxima (sum 1000)
+COMPONENT_MAXIMA = {
+    'score_payment_performance': 600,
+    'score_payment_plan': 150,
+    'score_deterioration': 250,
+}
+
+# Scenarios evaluated together; bounds the (S, N) temporaries on large portfolios
+SCENARIOS_PER_CHUNK = 256
+
+
+def make_scenario(
+    name: str,
+    config: Optional[HybridScoringConfig] = None,
+    maxima: Optional[Dict[str, float]] = None
+) -> Dict:
+    """Scenario dict: name, HybridScoringConfig and component maxima (missing ones keep the default)"""
+    return {
+        'name': name,
+        'config': config or HybridScoringConfig(),
+        'maxima': {**COMPONENT_MAXIMA, **(maxima or {})},
+    }
+
+
+def scenario_grid(
+    pesos_platam: Sequence[Optional[Dict[str, float]]] = (None,),
+    component_maxima: Sequence[Optional[Dict[str, float]]] = (None,),
+    bonus: Sequence[Optional[float]] = (None,),
+    penalty: Sequence[Optional[float]] = (None,),
+    base_config: Optional[HybridScoringConfig] = None
+) -> List[Dict]:
+    """
+    Cartesian product of weight overrides. Each PLATAM weight override
+    updates only the categories it names, None keeps the base config value.
+    """
+    base_config = base_config or HybridScoringConfig()
+    scenarios = []
+    for pesos, maxima, bonus_, penalty_ in itertools.product(pesos_platam, component_maxima, bonus, penalty):
+        config = copy.copy(base_config)
+        config.PESOS_PLATAM = {**base_config.PESOS_PLATAM, **(pesos or {})}
+        if bonus_ is not None:
+            config.BONUS_HISTORIAL_AMPLIO = bonus_
+        if penalty_ is not None:
+            config.PENALIZACION_HISTORIAL_POCO = penalty_
+
+        parts = [f"{c}={config.PESOS_PLATAM[c]:.2f}" for c in (pesos or {})]
+        parts += [f"{c}={v:g}" for c, v in (maxima or {}).items()]
+        if bonus_ is not None:
+            parts.append(f"bonus={bonus_:+.2f}")
+        if penalty_ is not None:
+            parts.append(f"penalty={penalty_:+.2f}")
+        scenarios.append(make_scenario(', '.join(parts) or 'base', config, maxima))
+    return scenarios
+
+
+def _scenario_columns(scenarios: Sequence[Dict]) -> Dict[str, np.ndarray]:
+    """Scenario parameters as (S, 1) / (S, k) arrays"""
+    configs = [s['config'] for s in scenarios]
+
+    def column(values):
+        return np.array(values, dtype=float)[:, None]
+
+    return {
+        # Upper month bound of muy_nuevo, nuevo, intermedio, establecido
+        'months': np.array([[c.MADUREZ_NUEVO, c.MADUREZ_INTERMEDIO, c.MADUREZ_ESTABLECIDO,
+                             scoring_core.MATURITY_MONTHS[3]] for c in configs], dtype=float),
+        'mature_payments': column([c.MIN_PAGOS_MADUROS for c in configs]),
+        'min_reliable_payments': column([c.MIN_PAGOS_CONFIABLES for c in configs]),
+        'pesos': np.array([[c.PESOS_PLATAM[cat] for cat in CATEGORIAS_MADUREZ] for c in configs]),
+        'bonus': column([c.BONUS_HISTORIAL_AMPLIO for c in configs]),
+        'penalty': column([c.PENALIZACION_HISTORIAL_POCO for c in configs]),
+        'score_aplicacion': column([c.DEFAULT_SCORE_APLICACION for c in configs]),
+        'score_sin_datos': column([c.DEFAULT_SCORE_SIN_DATOS for c in configs]),
+        'scale': np.array([[s['maxima'][col] / base for col, base in COMPONENT_MAXIMA.items()]
+                           for s in scenarios]),
+    }
+
+
+# ============================================================================
+# BROADCASTED SCORING
+# ============================================================================
+
+def score_scenarios(
+    df: pd.DataFrame,
+    scenarios: Sequence[Dict],
+    hcpn_col: str = 'experian_score_normalized',
+    months_col: str = 'months_as_client',
+    payment_count_col: str = 'payment_count'
+) -> np.ndarray:
+    """
+    Hybrid score of every client under every scenario, shape (S, N): the
+    calculate_hybrid_scores_batch rules with per-scenario parameters
+    """
+    p = _scenario_columns(scenarios)
+
+    components = np.column_stack([
+        pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=float)
+        for col in COMPONENT_MAXIMA
+    ])
+    hcpn = pd.to_numeric(df[hcpn_col], errors='coerce').to_numpy(dtype=float)[None, :]
+    months = pd.to_numeric(df[months_col], errors='coerce').to_numpy(dtype=float)[None, :]
+    count = pd.to_numeric(df[payment_count_col], errors='coerce').to_numpy(dtype=float)[None, :]
+
+    # Rescaled PLATAM score: sum of component * new max / default max
+    platam = p['scale'] @ components.T
+
+    # Maturity category: 4 minus the month bounds the client is still below
+    # (NaN months -> maduro, as np.select), then one up / one down by payments
+    categoria = 4 - (months[:, None, :] < p['months'][:, :, None]).sum(axis=1)
+    categoria = np.where((count >= p['mature_payments'] * 2) & (categoria <= 1), categoria + 1, categoria)
+    categoria = np.where((count < p['min_reliable_payments']) & (categoria >= 3), categoria - 1, categoria)
+
+    tiene_hcpn = ~np.isnan(hcpn)
+    tiene_platam = platam > 0
+    caso = np.select([tiene_hcpn & tiene_platam, tiene_platam, tiene_hcpn], [1, 2, 3], 4)
+
+    peso_base = np.take_along_axis(p['pesos'], categoria, axis=1)
+    peso_ajuste = np.select(
+        [count >= scoring_core.WIDE_HISTORY_PAYMENTS, count < p['min_reliable_payments']],
+        [p['bonus'], p['penalty']], 0.0
+    )
+    peso = np.clip(peso_base + peso_ajuste, scoring_core.MIN_PLATAM_WEIGHT, scoring_core.MAX_PLATAM_WEIGHT)
+
+    with np.errstate(invalid='ignore'):
+        hybrid = np.select(
+            [caso == 1, caso == 2, caso == 3],
+            [platam * peso + hcpn * (1.0 - peso),
+             platam,
+             p['score_aplicacion'] * 0.20 + hcpn * 0.80],
+            p['score_sin_datos']
+        )
+    return np.round(np.clip(hybrid, 0, 1000), 1)
+
+
+# ============================================================================
+# SWEEP REPORT
+# ============================================================================
+
+def sweep(
+    df: pd.DataFrame,
+    scenarios: Sequence[Dict],
+    approval_score: float = 500,
+    default_col: str = 'default_flag',
+    **columns
+) -> Dict[str, pd.DataFrame]:
+    """
+    Evaluates every scenario over the portfolio.
+
+    Args:
+        df: One row per client with the component, HCPN, months, payment
+            count and default_flag columns (e.g. SCORES_V2_ANALISIS_COMPLETO.csv)
+        scenarios: make_scenario / scenario_grid dicts
+        approval_score: Minimum hybrid score to approve
+        default_col: 0/1 default column (missing counts as no default)
+        **columns: Column names for score_scenarios
+
+    Returns:
+        {'summary': one row per scenario (mean score, approvals, default
+         rates of approved / rejected, clients per rating),
+         'ratings': scenario x rating with clients, defaults and default_rate}
+    """
+    if not scenarios:
+        raise ValueError("sweep needs at least one scenario")
+
+    n = len(df)
+    labels = HYBRID_RATING.labels
+    n_bands = len(labels) + 1
+    defaults = pd.to_numeric(df[default_col], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    sums, approved, defaults_approved = [], [], []
+    band_clients, band_defaults = [], []
+    for start in range(0, len(scenarios), SCENARIOS_PER_CHUNK):
+        chunk = scenarios[start:start + SCENARIOS_PER_CHUNK]
+        hybrid = score_scenarios(df, chunk, **columns)
+
+        # Rating band of every (scenario, client), counted per scenario with one bincount
+        bands = HYBRID_RATING.index(hybrid).reshape(hybrid.shape)
+        keys = (bands + np.arange(len(chunk))[:, None] * n_bands).ravel()
+        size = len(chunk) * n_bands
+        band_clients.append(np.bincount(keys, minlength=size).reshape(len(chunk), n_bands))
+        band_defaults.append(np.bincount(keys, weights=np.tile(defaults, len(chunk)),
+                                         minlength=size).reshape(len(chunk), n_bands))
+
+        aprobado = hybrid >= approval_score
+        sums.append(hybrid.sum(axis=1))
+        approved.append(aprobado.sum(axis=1))
+        defaults_approved.append(aprobado @ defaults)
+
+    names = [s['name'] for s in scenarios]
+    # Drop the missing band: scores are clipped, never NaN
+    clients_by_band = np.concatenate(band_clients)[:, :len(labels)]
+    defaults_by_band = np.concatenate(band_defaults)[:, :len(labels)]
+    approved = np.concatenate(approved)
+    defaults_approved = np.concatenate(defaults_approved)
+    total_defaults = defaults.sum()
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        summary = pd.DataFrame({
+            'scenario': names,
+            'mean_hybrid_score': np.concatenate(sums) / n,
+            'approved': approved.astype(int),
+            'approval_rate': approved / n,
+            'defaults_approved': defaults_approved.astype(int),
+            'default_rate_approved': defaults_approved / approved,
+            'default_rate_rejected': (total_defaults - defaults_approved) / (n - approved),
+        })
+        for i, label in reversed(list(enumerate(labels))):
+            summary[f'rating_{label}'] = clients_by_band[:, i].astype(int)
+
+        ratings = pd.DataFrame({
+            'scenario': np.repeat(names, len(labels)),
+            'rating': np.tile(labels, len(names)),
+            'clients': clients_by_band.ravel().astype(int),
+            'defaults': defaults_by_band.ravel().astype(int),
+            'default_rate': (defaults_by_band / clients_by_band).ravel(),
+        })
+
+    return {'summary': summary, 'ratings': ratings}